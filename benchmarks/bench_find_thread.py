@@ -0,0 +1,112 @@
+"""`!close <post_id>` lookup cost on synthetic guilds of up to 100 forums × 1,000 threads.
+
+    python benchmarks/bench_find_thread.py [--forums 1,10,100] [--threads 1000]
+
+Compares the former scan (every ForumChannel, then `channel.threads`, which itself walks
+every cached thread of the guild) with `find_thread` (gateway cache, thread index, then
+one `fetch_channel`). Threads are real discord.Thread objects; half of each forum is
+archived, i.e. absent from the gateway cache and only reachable through `fetch_channel`,
+whose calls are counted.
+"""
+
+import argparse
+import asyncio
+
+import discord
+
+from common import load_bot, summary, timed
+
+
+class SyntheticGuild:
+    """Just enough of discord.Guild for ForumChannel/Thread objects and `find_thread`."""
+
+    def __init__(self, guild_id: int, forums: int, threads: int):
+        self.id = guild_id
+        self._channels = {}
+        self._threads = {}  # gateway cache: active threads only
+        self._archived = {}  # only visible through the REST API
+        self.fetches = 0
+        next_id = guild_id * 10_000_000
+        for f in range(forums):
+            next_id += 1
+            forum = discord.ForumChannel(state=None, guild=self, data={
+                'id': next_id, 'type': 15, 'name': f"forum-{f}", 'position': f, 'guild_id': guild_id,
+            })
+            self._channels[forum.id] = forum
+            for t in range(threads):
+                next_id += 1
+                archived = t % 2 == 1
+                thread = discord.Thread(guild=self, state=None, data={
+                    'id': next_id, 'parent_id': forum.id, 'owner_id': 1, 'name': f"post-{f}-{t}", 'type': 11,
+                    'message_count': 0, 'member_count': 0, 'rate_limit_per_user': 0,
+                    'thread_metadata': {
+                        'archived': archived, 'locked': False, 'auto_archive_duration': 1440,
+                        'archive_timestamp': "2026-01-01T00:00:00+00:00",
+                    },
+                })
+                (self._archived if archived else self._threads)[thread.id] = thread
+
+    @property
+    def channels(self):
+        return list(self._channels.values())
+
+    def get_channel(self, channel_id):
+        return self._channels.get(channel_id)
+
+    def get_thread(self, thread_id):
+        return self._threads.get(thread_id)
+
+    async def fetch_channel(self, channel_id):
+        self.fetches += 1
+        found = self._archived.get(channel_id) or self._threads.get(channel_id) or self._channels.get(channel_id)
+        if found is None:
+            raise discord.NotFound(_NotFoundResponse(), "Unknown Channel")
+        return found
+
+
+class _NotFoundResponse:
+    status = 404
+    reason = "Not Found"
+
+
+def scan_forums(guild, post_id):
+    """The lookup `close_thread` used before the thread index."""
+    for channel in guild.channels:
+        if isinstance(channel, discord.ForumChannel):
+            for t in channel.threads:
+                if t.id == post_id:
+                    return t
+    return None
+
+
+def main(args):
+    bot = load_bot()
+    loop = asyncio.new_event_loop()
+    print(f"{args.threads} posts par forum (moitié archivés), recherche du dernier post du dernier forum\n")
+    for forums in args.forums:
+        guild = SyntheticGuild(forums, forums, args.threads)
+        active_id = max(guild._threads)
+        archived_id = max(guild._archived)
+        label = f"{forums}×{args.threads}"
+
+        scan_repeat = 3 if forums * args.threads >= 50_000 else 10
+        print(summary(f"{label} scan, actif", timed(scan_forums, guild, active_id, repeat=scan_repeat)))
+        found = scan_forums(guild, archived_id)
+        print(summary(f"{label} scan, archivé ({'trouvé' if found else 'introuvable'})",
+                      timed(scan_forums, guild, archived_id, repeat=scan_repeat)))
+
+        def lookup(post_id):
+            assert loop.run_until_complete(bot.find_thread(guild, post_id)) is not None
+
+        print(summary(f"{label} find_thread, actif", timed(lookup, active_id, repeat=1000)))
+        guild.fetches = 0
+        print(summary(f"{label} find_thread, archivé", timed(lookup, archived_id, repeat=1000)))
+        print(f"{'':<42} fetch_channel par recherche: {guild.fetches / 1000:.0f}\n")
+    loop.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--forums", type=lambda v: [int(x) for x in v.split(",")], default=[1, 10, 100])
+    parser.add_argument("--threads", type=int, default=1000)
+    main(parser.parse_args())
@@ -0,0 +1,142 @@
+"""Latency of 50 concurrent `!pr` commands against a local GitHub stub server.
+
+    python benchmarks/bench_github.py [--concurrency 50] [--latency 0.1]
+
+The stub answers `GET /repos/<owner>/<repo>/pulls/<n>` after `--latency` seconds with an ETag.
+Scenarios run the real `pr` command of extensions/general.py through the shared GitHubClient:
+distinct PRs (connection pool + concurrency bound), one PR requested by everybody
+(in-flight coalescing) and the same PRs again (response cache). The event-loop lag column
+is the worst delay of a 5 ms ticker while the commands run: it stays near zero because
+no handler blocks the loop. The old handler (a blocking HTTP call on the loop) is
+measured last for comparison.
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+import urllib.request
+
+from aiohttp import web
+
+from common import FakeContext, load_bot, summary
+
+REPO = "bench/epitrello"
+
+
+def start_stub(latency: float):
+    """Serve the stub from its own thread and event loop, so a blocking client can't starve it."""
+    calls = {'count': 0}
+    ready = threading.Event()
+    state = {}
+
+    async def pull(request):
+        calls['count'] += 1
+        await asyncio.sleep(latency)
+        number = int(request.match_info['number'])
+        if request.headers.get("If-None-Match") == f'"pr-{number}"':
+            return web.Response(status=304)
+        return web.json_response(
+            {
+                'number': number, 'title': f"PR {number}", 'body': "stub", 'state': "open",
+                'html_url': f"https://github.com/{REPO}/pull/{number}", 'user': {'login': "bench"},
+            },
+            headers={'ETag': f'"pr-{number}"'},
+        )
+
+    async def serve():
+        app = web.Application()
+        app.router.add_get(f"/repos/{REPO}/pulls/{{number}}", pull)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        state['port'] = site._server.sockets[0].getsockname()[1]
+        state['stop'] = asyncio.Event()
+        ready.set()
+        await state['stop'].wait()
+        await runner.cleanup()
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_until_complete, args=(serve(),), daemon=True)
+    thread.start()
+    ready.wait()
+
+    def stop():
+        loop.call_soon_threadsafe(state['stop'].set)
+        thread.join()
+
+    return stop, f"http://127.0.0.1:{state['port']}", calls
+
+
+async def loop_lag(stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.005)
+        samples.append(time.perf_counter() - started - 0.005)
+
+
+async def run_commands(command, numbers):
+    """Invoke `!pr n` for every n concurrently; returns per-command latencies and the worst loop lag."""
+    stop, lag = asyncio.Event(), []
+    ticker = asyncio.create_task(loop_lag(stop, lag))
+
+    # latency is counted from the common start: a command stuck behind a blocked loop waits too
+    started = time.perf_counter()
+
+    async def one(number):
+        ctx = FakeContext()
+        await command(ctx, [number])
+        return ctx.sent_at - started
+
+    latencies = await asyncio.gather(*(one(n) for n in numbers))
+    wall = time.perf_counter() - started
+    stop.set()
+    await ticker
+    return latencies, wall, max(lag, default=0.0)
+
+
+async def main(args):
+    bot = load_bot(GITHUB_REPO=REPO)
+    from extensions import general
+
+    stop_stub, base_url, calls = start_stub(args.latency)
+    bot.github.API_URL = base_url
+    command = general.pr.callback
+    n = args.concurrency
+    scenarios = [
+        ("PR distinctes (à froid)", list(range(1, n + 1))),
+        ("même PR pour tous (coalescing)", [n + 1] * n),
+        ("PR distinctes (cache chaud)", list(range(1, n + 1))),
+    ]
+    try:
+        print(f"{n} commandes !pr concurrentes, latence du stub {args.latency * 1000:.0f} ms\n")
+        for label, numbers in scenarios:
+            before = calls['count']
+            latencies, wall, lag = await run_commands(command, numbers)
+            print(summary(label, latencies))
+            print(f"{'':<42} total={wall * 1000:.0f}ms appels stub={calls['count'] - before} lag boucle max={lag * 1000:.1f}ms")
+        cache = bot.github.cache
+        print(f"\ncache GitHub: hits={cache.hits} misses={cache.misses} revalidations={cache.revalidations} "
+              f"coalescées={bot.github.coalesced}")
+
+        async def blocking_pr(ctx, numbers):
+            # the handler before the async client: a blocking HTTP call (requests.get) on the event loop
+            with urllib.request.urlopen(f"{base_url}/repos/{REPO}/pulls/{numbers[0]}", timeout=10) as r:
+                await ctx.send(json.loads(r.read())['title'])
+
+        latencies, wall, lag = await run_commands(blocking_pr, list(range(1, n + 1)))
+        print()
+        print(summary("requests.get bloquant (avant)", latencies))
+        print(f"{'':<42} total={wall * 1000:.0f}ms lag boucle max={lag * 1000:.1f}ms")
+    finally:
+        await bot.github.close()
+        stop_stub()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.1, help="temps de réponse du stub (s)")
+    asyncio.run(main(parser.parse_args()))
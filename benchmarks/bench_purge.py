@@ -0,0 +1,104 @@
+"""Purge of 10k closed threads: journaled store vs the former whole-file rewrite per deletion.
+
+    python benchmarks/bench_purge.py [--entries 10000] [--baseline 1000]
+
+Runs the real `purge_closed_threads` pass on a PurgeScheduler holding `--entries` due
+threads. No token is configured and no guild is cached, so every thread takes the
+"missing" path and only the bookkeeping is measured: one journal line per deletion,
+written off the event loop by the store writer. The baseline replays what
+`save_closed_threads()` did before: `json.dump` of the whole file after every deletion,
+on the event loop.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from common import load_bot
+
+
+def fill(bot, entries: int) -> list:
+    closed_at = datetime.now(timezone.utc) - timedelta(days=8)
+    items = []
+    for i in range(entries):
+        tid = 1_000_000_000_000_000 + i
+        bot.closed_threads_store.set(str(tid), (closed_at + timedelta(seconds=i)).isoformat())
+        items.append((tid, None, closed_at))
+    bot.closed_threads_store.compact()
+    bot._store_writer.flush()
+    return items
+
+
+def count_writes(store) -> dict:
+    """Wrap the store's file writes to count the bytes they produce."""
+    written = {'bytes': 0, 'writes': 0}
+    append, write_snapshot = store._append, store._write_snapshot
+
+    def _append(line):
+        written['bytes'] += len(line.encode())
+        written['writes'] += 1
+        append(line)
+
+    def _write_snapshot(snapshot):
+        write_snapshot(snapshot)
+        written['bytes'] += os.path.getsize(store.path)
+        written['writes'] += 1
+
+    store._append, store._write_snapshot = _append, _write_snapshot
+    return written
+
+
+def old_purge(data: dict, path: str) -> dict:
+    """Delete every entry, rewriting the whole JSON file after each one (the former behaviour)."""
+    written = {'bytes': 0, 'writes': 0}
+    for key in list(data):
+        data.pop(key)
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+            written['bytes'] += f.tell()
+        written['writes'] += 1
+    return written
+
+
+def main(args):
+    bot = load_bot(DISCORD_TOKEN="", STORAGE_BACKEND="json")
+    logging.getLogger('EpiTrelloBot').setLevel(logging.WARNING)
+    bot.load_closed_threads()
+
+    items = fill(bot, args.entries)
+    scheduler = bot.PurgeScheduler()
+    scheduler.rebuild(items)
+    written = count_writes(bot.closed_threads_store)
+
+    loop = asyncio.new_event_loop()
+    started = time.perf_counter()
+    loop.run_until_complete(bot.purge_closed_threads(scheduler))
+    on_loop = time.perf_counter() - started
+    bot._store_writer.flush()
+    total = time.perf_counter() - started
+    loop.close()
+
+    remaining = len(bot.closed_threads)
+    print(f"Purge de {args.entries} entrées (journal + compaction tous les {bot.closed_threads_store.compact_every} ops)")
+    print(f"  boucle d'événements: {on_loop * 1000:.0f} ms, écritures terminées après {total * 1000:.0f} ms")
+    print(f"  {written['writes']} écritures, {written['bytes'] / 1024:.0f} Kio écrits, {remaining} entrées restantes")
+
+    if args.baseline:
+        data = {str(tid): closed_at.isoformat() for tid, _, closed_at in items[:args.baseline]}
+        started = time.perf_counter()
+        old = old_purge(data, os.path.abspath("closed_threads.baseline.json"))
+        elapsed = time.perf_counter() - started
+        print(f"\nAvant: réécriture complète par suppression ({args.baseline} entrées, sur la boucle)")
+        print(f"  {elapsed * 1000:.0f} ms, {old['writes']} écritures, {old['bytes'] / 1024 / 1024:.0f} Mio écrits")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=10_000)
+    # the former method is O(n²) in bytes written: 10k entries take minutes, hence a smaller default
+    parser.add_argument("--baseline", type=int, default=1_000, help="entrées pour l'ancienne méthode (0: ignorée)")
+    main(parser.parse_args())
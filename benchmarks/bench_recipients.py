@@ -0,0 +1,75 @@
+"""Reminder recipients for 5,000 interested users: `resolve_recipients` vs the former all() scan.
+
+    python benchmarks/bench_recipients.py [--interested 5000] [--connected 100,1000,5000]
+
+Interested users are split between people already in the event's voice channel (the first
+`--connected` members of the channel are interested, the rest are other members), 10%
+opted out of reminders, and everybody else who must be pinged. The former filter
+compared each interested user with every connected member; `resolve_recipients` builds
+id sets once and also returns the mention batches within the 2,000-character limit.
+"""
+
+import argparse
+from types import SimpleNamespace
+
+import discord
+
+from common import load_bot, summary, timed
+
+
+class VoiceChannel(discord.VoiceChannel):
+    """A voice channel whose members are given (discord.py derives them from voice states)."""
+
+    def __init__(self, members):
+        self._bench_members = members
+
+    @property
+    def members(self):
+        return self._bench_members
+
+
+def user(uid: int):
+    return SimpleNamespace(id=uid, mention=f"<@{uid}>", display_name=f"user{uid}")
+
+
+def old_filter(interested, channel, opt_out):
+    """The filter of admin_remind/admin_simulate/the reminder template before the pipeline."""
+    already_connected = [m for m in channel.members]
+    return [
+        u.mention
+        for u in interested
+        if getattr(u, "id", None) not in opt_out
+        and all(getattr(u, "id", None) != m.id for m in already_connected)
+    ]
+
+
+def main(args):
+    bot = load_bot(STORAGE_BACKEND="json")
+    base = 400_000_000_000_000_000
+    interested = [user(base + i) for i in range(args.interested)]
+    bot.notify_opt_out.clear()
+    bot.notify_opt_out.update(u.id for u in interested[::10])
+
+    print(f"{args.interested} intéressés, 10% opt-out\n")
+    for connected in args.connected:
+        # half of the voice channel is interested, half are other members
+        members = interested[:connected // 2] + [user(base + args.interested + i) for i in range(connected - connected // 2)]
+        event = SimpleNamespace(channel=VoiceChannel(members))
+
+        result = bot.resolve_recipients(event, interested)
+        expected = old_filter(interested, event.channel, bot.notify_opt_out)
+        assert [u.mention for u in result.to_ping] == expected
+        repeat = 3 if connected * args.interested >= 10_000_000 else 20
+
+        print(summary(f"{connected} en vocal: all() (avant)", timed(old_filter, interested, event.channel, bot.notify_opt_out, repeat=repeat)))
+        print(summary(f"{connected} en vocal: resolve_recipients", timed(bot.resolve_recipients, event, interested, repeat=50)))
+        longest = max((len(b) for b in result.mention_batches), default=0)
+        print(f"{'':<42} à pinguer={len(result.to_ping)} messages={len(result.mention_batches)} "
+              f"plus long={longest} car. (avant: 1 message de {len(' '.join(expected))} car.)\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--interested", type=int, default=5000)
+    parser.add_argument("--connected", type=lambda v: [int(x) for x in v.split(",")], default=[100, 1000, 5000])
+    main(parser.parse_args())
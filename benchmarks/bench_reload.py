@@ -0,0 +1,68 @@
+"""Hot reload of one extension vs a process restart of the bot.
+
+    python benchmarks/bench_reload.py [--repeat 20] [--restarts 5]
+
+Reload: `reload_extension` (what the watcher triggers through `reload <ext>` on stdin) on
+every extension, in a process where bot.py is already imported. Restart: a new interpreter
+that imports bot.py (state files, stores, clients) and loads every extension, timed from
+spawn until it is ready to log in. That is only a lower bound of a real restart, which
+also drains the old process and then pays the gateway login, IDENTIFY, READY/GUILD_CREATE
+and the thread-index rebuild; none of that is reachable without a token here.
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT, load_bot, summary
+
+STARTUP = """
+import asyncio, sys
+sys.path.insert(0, {root!r})
+import bot
+
+async def main():
+    for name in bot.EXTENSIONS:
+        await bot.bot.load_extension(name)
+
+asyncio.run(main())
+print("ready", flush=True)
+"""
+
+
+def restart_once() -> float:
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", STARTUP.format(root=ROOT)],
+        cwd=tempfile.mkdtemp(prefix="epitrello-bench-"), env=dict(os.environ, DISCORD_TOKEN=""),
+        capture_output=True, text=True, check=True,
+    )
+    assert out.stdout.strip().endswith("ready"), out.stdout
+    return time.perf_counter() - started
+
+
+def main(args):
+    bot = load_bot(DISCORD_TOKEN="")
+
+    async def reloads():
+        for name in bot.EXTENSIONS:
+            await bot.reload_extension(name)
+        results = {}
+        for name in bot.EXTENSIONS:
+            results[name] = [await bot.reload_extension(name) / 1000 for _ in range(args.repeat)]
+        return results
+
+    for name, samples in asyncio.run(reloads()).items():
+        print(summary(f"rechargement {name}", samples))
+    print(summary("redémarrage (jusqu'à la connexion)", [restart_once() for _ in range(args.restarts)]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--restarts", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,59 @@
+"""Shared helpers for the benchmark scripts.
+
+The benchmarks import the real `bot` module (and its extensions) so they measure the code
+that runs in production. Importing it loads/creates the JSON state files of the current
+directory, so `load_bot()` first moves into a throwaway directory.
+"""
+
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_bot(**env):
+    """Import bot.py from a temporary working directory, with `env` applied first."""
+    os.environ.update({k: str(v) for k, v in env.items()})
+    os.chdir(tempfile.mkdtemp(prefix="epitrello-bench-"))
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import bot
+    return bot
+
+
+def summary(label: str, samples: list, unit: str = "ms", scale: float = 1000.0) -> str:
+    """One result line: count, p50, p95 and max of `samples` (seconds, shown in `unit`)."""
+    ordered = sorted(samples)
+    p95 = ordered[max(0, math.ceil(len(ordered) * 0.95) - 1)]
+    return (
+        f"{label:<42} n={len(ordered):<6} p50={statistics.median(ordered) * scale:8.2f}{unit} "
+        f"p95={p95 * scale:8.2f}{unit} max={ordered[-1] * scale:8.2f}{unit}"
+    )
+
+
+def timed(fn, *args, repeat: int = 5, **kwargs) -> list:
+    """Run `fn` `repeat` times and return the durations in seconds."""
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args, **kwargs)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+class FakeContext:
+    """Minimal commands.Context: records what the command sends and when."""
+
+    def __init__(self, guild=None, author=None):
+        self.guild = guild
+        self.author = author
+        self.sent = []
+        self.sent_at = None
+
+    async def send(self, content=None, **kwargs):
+        self.sent_at = time.perf_counter()
+        self.sent.append(content if content is not None else kwargs)
@@ -3,17 +3,38 @@
 
 import re
 import os
-import requests
+import aiohttp
 import discord
 from discord.ext import commands, tasks
 from dotenv import load_dotenv
 from datetime import datetime, timedelta, timezone
 import json
-import pytz
+import pickle
+import signal
+import heapq
+import calendar
+import itertools
+import sqlite3
+import subprocess
+import sys
+import time
+import atexit
+import queue
+import threading
 import asyncio
+from collections import OrderedDict
 from types import SimpleNamespace
+from flask import Flask, Response, jsonify
+from werkzeug.serving import make_server
 import logging
 
+BOOT_STARTED = time.perf_counter()
+startup_marks = {}  # startup phase -> seconds since BOOT_STARTED (see startup_report)
+
+# bot.py runs as __main__: register it as `bot` so the extensions import this module (and share its state)
+if __name__ == "__main__":
+    sys.modules.setdefault("bot", sys.modules[__name__])
+
 # Configure basic logging so we reliably see runtime messages
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('EpiTrelloBot')
@@ -26,99 +47,841 @@ GITHUB_REPO = os.getenv("GITHUB_REPO")
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 GITHUB_PROJECT = os.getenv("GITHUB_PROJECT")
 
+# GitHub HTTP client tuning (connection pool size / max concurrent requests)
+GITHUB_POOL_SIZE = int(os.getenv("GITHUB_POOL_SIZE", "10"))
+GITHUB_MAX_CONCURRENCY = int(os.getenv("GITHUB_MAX_CONCURRENCY", "8"))
+GITHUB_TIMEOUT = float(os.getenv("GITHUB_TIMEOUT", "10"))
+# PR/issue response cache (entries kept in memory, seconds before revalidation)
+GITHUB_CACHE_SIZE = int(os.getenv("GITHUB_CACHE_SIZE", "256"))
+GITHUB_CACHE_TTL = float(os.getenv("GITHUB_CACHE_TTL", "60"))
+# Longest time (seconds) a GitHub request may be queued waiting for the rate limit to reset
+GITHUB_MAX_WAIT = float(os.getenv("GITHUB_MAX_WAIT", "900"))
+GITHUB_MAX_RETRIES = int(os.getenv("GITHUB_MAX_RETRIES", "3"))
+# Lock-date cache (entries, TTL in seconds for found / not-found results)
+CLOSING_CACHE_SIZE = int(os.getenv("CLOSING_CACHE_SIZE", "5000"))
+CLOSING_CACHE_TTL = float(os.getenv("CLOSING_CACHE_TTL", str(24 * 3600)))
+CLOSING_CACHE_NEGATIVE_TTL = float(os.getenv("CLOSING_CACHE_NEGATIVE_TTL", "600"))
+
+# Automatic event reminders (sent REMINDER_LEAD_MINUTES before scheduled events)
+REMINDERS_ENABLED = os.getenv("REMINDERS_ENABLED", "1").lower() not in ("0", "false", "no", "off")
+REMINDER_LEAD_MINUTES = float(os.getenv("REMINDER_LEAD_MINUTES", "5"))
+
+# Storage backend for closed threads / opt-outs / reminder channels: 'json' (default) or 'sqlite'
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json").lower()
+STORAGE_DB = os.getenv("STORAGE_DB", "epitrellobot.db")
+
+# Warm start: snapshot of caches/schedulers written on shutdown, trusted at startup if younger than this
+WARM_START_MAX_AGE = float(os.getenv("WARM_START_MAX_AGE", str(6 * 3600)))
+
+# Graceful restart: max seconds to wait for in-flight commands before closing
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "30"))
+
+# Metrics: METRICS_PORT>0 serves /metrics and /healthz from a background thread (worker N listens on port + N)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+HEALTH_MAX_LOOP_LAG = float(os.getenv("HEALTH_MAX_LOOP_LAG", "2"))
+METRICS_SAMPLE_INTERVAL = 5  # seconds between two samplings of the gauges (extensions/background.py)
+
+# Worker mode: BOT_WORKERS=N runs one OS process per shard (supervised by this process), sharing state through SQLite
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "1"))
+WORKER_ID = int(os.getenv("BOT_WORKER_ID")) if os.getenv("BOT_WORKER_ID") else None
+WORKER_SPAWN_INTERVAL = float(os.getenv("WORKER_SPAWN_INTERVAL", "5"))  # identify rate limit between shards
+SHARED_POLL_INTERVAL = float(os.getenv("SHARED_POLL_INTERVAL", "2"))
+if BOT_WORKERS > 1 or WORKER_ID is not None:
+    STORAGE_BACKEND = 'sqlite'
+
+# Sharding: BOT_SHARDING=auto runs an AutoShardedBot (SHARD_COUNT / SHARD_IDS optional, auto-detected otherwise)
+BOT_SHARDING = os.getenv("BOT_SHARDING", "off").lower() in ("1", "true", "yes", "on", "auto")
+SHARD_COUNT = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None
+SHARD_IDS = [int(x) for x in os.getenv("SHARD_IDS", "").split(",") if x.strip()] or None
+
 intents = discord.Intents.default()
 intents.message_content = True
 intents.guilds = True
 intents.guild_scheduled_events = True  # indispensable pour les events
 
-bot = commands.Bot(command_prefix="!", intents=intents, help_command=None)
+if BOT_SHARDING:
+    bot = commands.AutoShardedBot(
+        command_prefix="!", intents=intents, help_command=None,
+        shard_count=SHARD_COUNT, shard_ids=SHARD_IDS,
+    )
+else:
+    bot = commands.Bot(command_prefix="!", intents=intents, help_command=None)
+
+
+def guild_shard_id(guild_id) -> int:
+    """Shard handling `guild_id` (Discord's formula); always 0 when not sharded."""
+    if not BOT_SHARDING or not guild_id:
+        return 0
+    return (int(guild_id) >> 22) % (bot.shard_count or 1)
+
+
+def owned_shard_ids() -> set:
+    """Shards run by this process."""
+    if not BOT_SHARDING:
+        return {0}
+    return set(bot.shard_ids or range(bot.shard_count or 1))
+
+
+# ============ 📈 MÉTRIQUES ============
+
+class Metrics:
+    """Counters, gauges and histograms rendered in the Prometheus text format.
+
+    Written from the event loop, read by the HTTP server thread: every access goes
+    through one lock and rendering only formats numbers, so a scrape never touches
+    bot state (gauges are sampled on the loop by `sample_metrics`, extensions/background.py).
+    """
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = {}  # name -> (type, help)
+        self._values = {}  # (name, labels) -> value (counters and gauges)
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self.last_sample = None  # monotonic time of the last gauge sampling
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._meta[name] = (kind, help_text)
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._values[self._key(name, labels)] = value
+
+    def value(self, name: str, **labels):
+        with self._lock:
+            return self._values.get(self._key(name, labels))
+
+    def observe(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [0] * (len(self.BUCKETS) + 2)
+            for i, bound in enumerate(self.BUCKETS):
+                if value <= bound:
+                    hist[i] += 1
+            hist[-2] += value
+            hist[-1] += 1
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+    def render(self) -> str:
+        with self._lock:
+            values = dict(self._values)
+            histograms = {k: list(v) for k, v in self._histograms.items()}
+        by_name = {}
+        for (name, labels), value in values.items():
+            by_name.setdefault(name, []).append((labels, value))
+        for (name, labels), hist in histograms.items():
+            by_name.setdefault(name, []).append((labels, hist))
+
+        lines = []
+        for name in sorted(by_name):
+            kind, help_text = self._meta.get(name, ('untyped', ''))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(by_name[name], key=lambda item: item[0]):
+                if kind != 'histogram':
+                    lines.append(f"{name}{self._labels(labels)} {value}")
+                    continue
+                for bound, count in zip(self.BUCKETS, value):
+                    lines.append(f"{name}_bucket{self._labels(labels, [('le', bound)])} {count}")
+                lines.append(f"{name}_bucket{self._labels(labels, [('le', '+Inf')])} {value[-1]}")
+                lines.append(f"{name}_sum{self._labels(labels)} {value[-2]}")
+                lines.append(f"{name}_count{self._labels(labels)} {value[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+metrics.describe('epitrello_command_duration_seconds', 'histogram', "Durée d'exécution des commandes")
+metrics.describe('epitrello_commands_total', 'counter', 'Commandes exécutées (status=ok|error)')
+metrics.describe('epitrello_rest_request_duration_seconds', 'histogram', 'Latence des appels REST GitHub/Discord')
+metrics.describe('epitrello_rest_requests_total', 'counter', 'Appels REST GitHub/Discord par code HTTP')
+metrics.describe('epitrello_rate_limit_hits_total', 'counter', 'Réponses 403/429 de rate limit reçues')
+metrics.describe('epitrello_event_loop_lag_seconds', 'gauge', "Retard de la boucle d'événements")
+metrics.describe('epitrello_gateway_latency_seconds', 'gauge', 'Latence websocket par shard')
+metrics.describe('epitrello_guilds', 'gauge', 'Guildes servies par ce process')
+metrics.describe('epitrello_purge_queue_depth', 'gauge', 'Posts en attente de suppression')
+metrics.describe('epitrello_reminders_pending', 'gauge', 'Rappels programmés')
+metrics.describe('epitrello_cache_entries', 'gauge', 'Entrées par cache')
+metrics.describe('epitrello_cache_hits', 'gauge', 'Hits cumulés par cache')
+metrics.describe('epitrello_cache_misses', 'gauge', 'Misses cumulés par cache')
+metrics.describe('epitrello_cache_hit_ratio', 'gauge', 'Taux de hit par cache (0-1)')
+
+
+# Commands currently running (waited for before a restart, see `drain_and_close`)
+inflight_commands = set()
+
+
+@bot.before_invoke
+async def _metrics_before_invoke(ctx):
+    ctx.metrics_started = time.perf_counter()
+    inflight_commands.add(ctx)
+
+
+@bot.after_invoke
+async def _metrics_after_invoke(ctx):
+    inflight_commands.discard(ctx)
+    if 'first_response' not in startup_marks and not ctx.command_failed:
+        startup_marks['first_response'] = time.perf_counter() - BOOT_STARTED
+    started = getattr(ctx, 'metrics_started', None)
+    if started is None or ctx.command is None:
+        return
+    name = ctx.command.qualified_name
+    metrics.observe('epitrello_command_duration_seconds', time.perf_counter() - started, command=name)
+    metrics.inc('epitrello_commands_total', command=name, status='error' if ctx.command_failed else 'ok')
 
 # Set pour gérer les utilisateurs qui ne veulent pas recevoir de rappels
 notify_opt_out = set()
+# JSON backend: user_id -> guild where the opt-out was made (SQLite keeps it in notify_opt_out.guild_id)
+notify_opt_out_guilds = {}
 
 # Mapping guild_id -> channel_id for forced reminder channel per guild
 reminder_channels = {}
 
-closing_cache = {}
+class ClosingCache:
+    """Bounded LRU cache of thread lock dates (thread_id -> datetime or None).
+
+    Found dates and "no lock found" (None) results expire after different TTLs so a
+    missing audit-log entry is retried later instead of being cached forever.
+    Timestamps are wall-clock so the cache can be persisted across restarts.
+    """
+
+    def __init__(self, max_entries: int = 5000, ttl: float = 86400, negative_ttl: float = 600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()  # thread_id -> (value, stored_at)
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+
+    def _expired(self, value, stored_at) -> bool:
+        ttl = self.ttl if value is not None else self.negative_ttl
+        return time.time() - stored_at >= ttl
+
+    def lookup(self, thread_id):
+        """Return (found, value) and update hit/miss counters."""
+        entry = self._entries.get(thread_id)
+        if entry is None or self._expired(*entry):
+            if entry is not None:
+                del self._entries[thread_id]
+                self.dirty = True
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(thread_id)
+        self.hits += 1
+        return True, entry[0]
+
+    def get(self, thread_id, default=None):
+        entry = self._entries.get(thread_id)
+        if entry is None or self._expired(*entry):
+            return default
+        return entry[0]
+
+    def __contains__(self, thread_id):
+        entry = self._entries.get(thread_id)
+        return entry is not None and not self._expired(*entry)
+
+    def __getitem__(self, thread_id):
+        if thread_id not in self:
+            raise KeyError(thread_id)
+        return self._entries[thread_id][0]
+
+    def __setitem__(self, thread_id, value):
+        self._entries[thread_id] = (value, time.time())
+        self._entries.move_to_end(thread_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self.dirty = True
+
+    def pop(self, thread_id, default=None):
+        entry = self._entries.pop(thread_id, None)
+        if entry is None:
+            return default
+        self.dirty = True
+        return entry[0]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return (self.hits / total * 100) if total else 0.0
+
+    def to_json(self) -> dict:
+        return {
+            str(tid): [value.isoformat() if value else None, stored_at]
+            for tid, (value, stored_at) in self._entries.items()
+            if not self._expired(value, stored_at)
+        }
+
+    def load_json(self, data: dict):
+        self._entries.clear()
+        for tid, (iso, stored_at) in sorted(data.items(), key=lambda kv: kv[1][1]):
+            value = None
+            if iso:
+                try:
+                    value = datetime.fromisoformat(iso)
+                except Exception:
+                    continue
+            if not self._expired(value, stored_at):
+                self._entries[int(tid)] = (value, stored_at)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self.dirty = False
+
+    def snapshot(self) -> list:
+        """Entries as parsed objects, for the binary warm-start snapshot."""
+        return list(self._entries.items())
+
+    def restore(self, entries: list):
+        self._entries = OrderedDict(
+            (tid, (value, stored_at)) for tid, (value, stored_at) in entries if not self._expired(value, stored_at)
+        )
+        self.dirty = False
+
+
+closing_cache = ClosingCache(max_entries=CLOSING_CACHE_SIZE, ttl=CLOSING_CACHE_TTL, negative_ttl=CLOSING_CACHE_NEGATIVE_TTL)
 closed_threads = {}
 bot_closed_threads = set()  # IDs of threads closed by the bot command (temporary)
 
+# Forum thread index: thread_id -> {guild_id, parent_id, name, archived, locked, created_at, closed_at}
+thread_index = {}
+
+# Audit-log lock index: guild_id -> {'high_water': last audit entry id, 'locks': {thread_id: iso}}
+lock_index = {}
+
 # =========== 💾 GESTION FICHIERS ============
 
-# Load reminder channel overrides from disk
-def load_reminder_channels():
-    global reminder_channels
-    path = os.path.join(os.getcwd(), 'reminder_channels.json')
-    if not os.path.exists(path):
-        reminder_channels = {}
-        return
-    try:
-        with open(path, 'r') as f:
-            reminder_channels = json.load(f)
-    except Exception:
-        reminder_channels = {}
+class _StoreWriter:
+    """Single background thread performing all state-file I/O in submission order."""
 
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
 
-def save_reminder_channels():
-    path = os.path.join(os.getcwd(), 'reminder_channels.json')
-    try:
-        with open(path, 'w') as f:
-            json.dump(reminder_channels, f)
-    except Exception as e:
-        logger.error(f"Impossible d'enregistrer reminder_channels.json: {e}")
+    def submit(self, fn, *args):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="store-writer", daemon=True)
+            self._thread.start()
+        self._queue.put((fn, args))
 
+    def _run(self):
+        while True:
+            fn, args = self._queue.get()
+            try:
+                fn(*args)
+            except Exception as e:
+                logger.error(f"Écriture de fichier d'état échouée: {e}")
+            finally:
+                self._queue.task_done()
 
-# Charger notified_users.json en mémoire au démarrage
-def load_notified_users():
-    global notify_opt_out
-    path = os.path.join(os.getcwd(), 'notified_users.json')
+    def flush(self):
+        """Block until every submitted write has been performed."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+
+_store_writer = _StoreWriter()
+atexit.register(_store_writer.flush)
+
+
+def _state_file(filename: str) -> str:
+    """Per-process state file name: `thread_index.json` -> `thread_index.worker2.json` in worker mode."""
+    if WORKER_ID is None:
+        return filename
+    root, ext = os.path.splitext(filename)
+    return f"{root}.worker{WORKER_ID}{ext}"
+
+
+def _write_json_atomic(path: str, data, **dump_kwargs):
+    """Write `data` to a temp file and atomically rename it over `path` (never leaves a torn file)."""
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f, **dump_kwargs)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+WARM_START_VERSION = 1
+
+
+def _warm_start_path() -> str:
+    return os.path.join(os.getcwd(), _state_file('warm_start.pickle'))
+
+
+def read_warm_snapshot():
+    """Load (and consume) the shutdown snapshot; None if missing, unreadable, of another version or too old."""
+    path = _warm_start_path()
     if not os.path.exists(path):
-        notify_opt_out = set()
-        return
+        return None
     try:
-        with open(path, 'r') as f:
-            data = json.load(f)
-            # Normalize IDs to int where possible
-            normalized = set()
-            for v in data:
-                try:
-                    normalized.add(int(v))
-                except Exception:
-                    # keep original if cannot convert
-                    try:
-                        normalized.add(v)
-                    except Exception:
-                        pass
-            notify_opt_out = normalized
+        with open(path, 'rb') as f:
+            snap = pickle.load(f)
+    except Exception as e:
+        logger.warning(f"Snapshot de démarrage illisible, démarrage à froid: {e}")
+        snap = None
+    # single use: after a crash the journals are newer than any older snapshot
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    if not isinstance(snap, dict) or snap.get('version') != WARM_START_VERSION:
+        return None
+    age = time.time() - snap.get('written_at', 0)
+    if not 0 <= age <= WARM_START_MAX_AGE:
+        logger.info(f"Snapshot de démarrage trop ancien ({age:.0f}s), démarrage à froid")
+        return None
+    return snap
+
+
+def write_warm_snapshot(snap: dict):
+    """Pickle `snap` next to the state files (atomic rename); runs on the store writer thread."""
+    path = _warm_start_path()
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(snap, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def _parse_iso(value):
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
     except Exception:
-        notify_opt_out = set()
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
 
 
-def save_notified_users():
-    path = os.path.join(os.getcwd(), 'notified_users.json')
+def _int_or_self(value):
     try:
-        with open(path, 'w') as f:
-            json.dump(list(notify_opt_out), f)
-    except Exception as e:
-        print(f"⚠️ Impossible d'enregistrer notified_users.json: {e}")
+        return int(value)
+    except Exception:
+        return value
 
 
-# Load/save for closed threads (stores closure timestamp in ISO format)
-def load_closed_threads():
-    global closed_threads, closing_cache
-    path = os.path.join(os.getcwd(), 'closed_threads.json')
-    if not os.path.exists(path):
-        closed_threads = {}
+class JournaledStore:
+    """JSON state file with an append-only write-ahead journal.
+
+    Each mutation appends one line to `<file>.journal` instead of rewriting the whole
+    file; every `compact_every` operations (or on `compact()`) a snapshot is written to
+    a temp file and atomically renamed over `<file>`, then the journal is truncated.
+    All disk writes are done by a background thread, off the event loop. On load the
+    snapshot is read and the journal replayed (a torn last line is ignored).
+
+    `kind` is 'dict' (file holds an object) or 'set' (file holds a list).
+    """
+
+    def __init__(self, filename: str, kind: str = 'dict', key_type=None, indent=None, compact_every: int = 500):
+        self.path = os.path.join(os.getcwd(), filename)
+        self.journal_path = self.path + '.journal'
+        self.kind = kind
+        self.key_type = key_type or (lambda k: k)
+        self.indent = indent
+        self.compact_every = compact_every
+        self.data = {} if kind == 'dict' else set()
+        self._ops_since_compact = 0
+
+    def _apply(self, data, op):
+        key = self.key_type(op.get('k'))
+        if op.get('op') == 'set':
+            data[key] = op.get('v')
+        elif op.get('op') == 'del':
+            data.pop(key, None)
+        elif op.get('op') == 'add':
+            data.add(key)
+        elif op.get('op') == 'discard':
+            data.discard(key)
+
+    def load(self):
+        data = {} if self.kind == 'dict' else set()
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    raw = json.load(f)
+                if self.kind == 'dict' and isinstance(raw, dict):
+                    data = {self.key_type(k): v for k, v in raw.items()}
+                elif self.kind == 'set' and isinstance(raw, list):
+                    data = {self.key_type(v) for v in raw}
+            except Exception as e:
+                logger.error(f"Impossible de lire {os.path.basename(self.path)}: {e}")
+
+        replayed = 0
+        if os.path.exists(self.journal_path):
+            try:
+                with open(self.journal_path, 'r') as f:
+                    for line in f:
+                        try:
+                            self._apply(data, json.loads(line))
+                            replayed += 1
+                        except Exception:
+                            # torn write at the end of the journal (crash mid-append)
+                            break
+            except Exception as e:
+                logger.error(f"Impossible de rejouer {os.path.basename(self.journal_path)}: {e}")
+
+        self.data = data
+        if replayed:
+            self.compact()
+        return data
+
+    def _log(self, op: dict):
+        line = json.dumps(op, ensure_ascii=False) + "\n"
+        _store_writer.submit(self._append, line)
+        self._ops_since_compact += 1
+        if self._ops_since_compact >= self.compact_every:
+            self.compact()
+
+    def set(self, key, value, **meta):
+        # `meta` (guild_id, ...) only feeds the indexed columns of the SQLite backend
+        self.data[key] = value
+        self._log({'op': 'set', 'k': key, 'v': value})
+
+    def delete(self, key):
+        if key in self.data:
+            self.data.pop(key, None)
+            self._log({'op': 'del', 'k': key})
+
+    def add(self, item, **meta):
+        if item not in self.data:
+            self.data.add(item)
+            self._log({'op': 'add', 'k': item})
+
+    def discard(self, item):
+        if item in self.data:
+            self.data.discard(item)
+            self._log({'op': 'discard', 'k': item})
+
+    def compact(self):
+        """Schedule a full snapshot (atomic rename) and truncate the journal."""
+        if self.kind == 'dict':
+            snapshot = {str(k): v for k, v in self.data.items()}
+        else:
+            snapshot = list(self.data)
+        self._ops_since_compact = 0
+        _store_writer.submit(self._write_snapshot, snapshot)
+
+    def _append(self, line: str):
+        with open(self.journal_path, 'a') as f:
+            f.write(line)
+
+    def _write_snapshot(self, snapshot):
+        _write_json_atomic(self.path, snapshot, ensure_ascii=False, indent=self.indent)
+        # the snapshot now contains every journaled op
+        open(self.journal_path, 'w').close()
+
+
+class SQLiteBackend:
+    """SQLite (WAL mode) database holding closed threads, opt-outs and reminder channels.
+
+    Writes go through the store writer thread (its own connection); reads use a
+    second connection on the event loop thread, which WAL allows concurrently.
+    `guild_id`, `thread_id` and `closed_at` are indexed so purge and per-guild
+    queries don't scan every row.
+
+    In worker mode every mutation also appends a row to `changes` in the same
+    transaction; the other processes poll it (`poll_shared_changes`) and refresh
+    the affected keys in their in-memory mirrors.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS closed_threads (
+        thread_id INTEGER PRIMARY KEY,
+        guild_id INTEGER,
+        closed_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_closed_threads_closed_at ON closed_threads (closed_at);
+    CREATE INDEX IF NOT EXISTS idx_closed_threads_guild ON closed_threads (guild_id);
+    CREATE TABLE IF NOT EXISTS notify_opt_out (
+        user_id INTEGER PRIMARY KEY,
+        guild_id INTEGER,
+        opted_out_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_notify_opt_out_guild ON notify_opt_out (guild_id);
+    CREATE TABLE IF NOT EXISTS reminder_channels (
+        guild_id INTEGER PRIMARY KEY,
+        channel_id INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+    CREATE TABLE IF NOT EXISTS changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        tbl TEXT NOT NULL,
+        key INTEGER NOT NULL,
+        origin INTEGER,
+        at REAL NOT NULL
+    );
+    """
+
+    def __init__(self, filename: str):
+        self.path = os.path.join(os.getcwd(), filename)
+        self._reader = None
+        self._writer_conn = None
+
+    def _connect(self):
+        # several worker processes may write concurrently: wait for the lock instead of failing
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(self.SCHEMA)
+        return conn
+
+    @property
+    def reader(self):
+        if self._reader is None:
+            self._reader = self._connect()
+        return self._reader
+
+    def _write(self, sql: str, params: tuple, change):
+        # runs on the store writer thread
+        if self._writer_conn is None:
+            self._writer_conn = self._connect()
+        with self._writer_conn:
+            self._writer_conn.execute(sql, params)
+            if change is not None:
+                self._writer_conn.execute(
+                    "INSERT INTO changes (tbl, key, origin, at) VALUES (?, ?, ?, ?)",
+                    (change[0], change[1], WORKER_ID, time.time()),
+                )
+
+    def write(self, sql: str, params: tuple = (), change=None):
+        """Queue a write; `change=(table, key)` is published to the other workers."""
+        if WORKER_ID is None:
+            change = None
+        _store_writer.submit(self._write, sql, params, change)
+
+    def last_change(self) -> int:
+        return self.query("SELECT COALESCE(MAX(seq), 0) FROM changes")[0][0]
+
+    def changes_since(self, seq: int) -> list:
+        """[(seq, table, key)] written by other processes after `seq`."""
+        return self.query(
+            "SELECT seq, tbl, key FROM changes WHERE seq > ? AND origin IS NOT ? ORDER BY seq",
+            (seq, WORKER_ID),
+        )
+
+    def prune_changes(self, max_age: float = 3600):
+        self.write("DELETE FROM changes WHERE at < ?", (time.time() - max_age,))
+
+    def query(self, sql: str, params: tuple = ()):
+        return self.reader.execute(sql, params).fetchall()
+
+    def migrate_from_json(self):
+        """One-shot import of the JSON state files (journals replayed) into empty tables."""
+        done = self.query("SELECT value FROM meta WHERE key = 'migrated_from_json'")
+        if done:
+            return
+        closed = JournaledStore('closed_threads.json', key_type=str).load()
+        opt_out = JournaledStore('notified_users.json', kind='set', key_type=_int_or_self).load()
+        opt_out_guilds = JournaledStore('notified_users_guilds.json', key_type=_int_or_self).load()
+        channels = JournaledStore('reminder_channels.json', key_type=str).load()
+        index = JournaledStore('thread_index.json', key_type=int).load()  # legacy single-process index
+
+        conn = self.reader
+        with conn:
+            for tid, iso in closed.items():
+                dt = _parse_iso(iso) if isinstance(iso, str) else None
+                if dt is None:
+                    continue
+                guild_id = (index.get(_int_or_self(tid)) or {}).get('guild_id')
+                conn.execute("INSERT OR REPLACE INTO closed_threads VALUES (?, ?, ?)", (int(tid), guild_id, dt.timestamp()))
+            for uid in opt_out:
+                if isinstance(uid, int):
+                    conn.execute("INSERT OR REPLACE INTO notify_opt_out VALUES (?, ?, NULL)", (uid, opt_out_guilds.get(uid)))
+            for gid, cid in channels.items():
+                conn.execute("INSERT OR REPLACE INTO reminder_channels VALUES (?, ?)", (int(gid), int(cid)))
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('migrated_from_json', ?)", (datetime.now(timezone.utc).isoformat(),))
+        logger.info(f"Migration JSON -> SQLite: {len(closed)} posts fermés, {len(opt_out)} opt-out, {len(channels)} canaux de rappel")
+
+
+class SQLiteStore:
+    """Same interface as JournaledStore (in-memory `data` mirror + mutations), persisted in a SQLite table."""
+
+    def __init__(self, backend: SQLiteBackend, table: str):
+        self.backend = backend
+        self.table = table
+        self.kind = 'set' if table == 'notify_opt_out' else 'dict'
+        self.data = {} if self.kind == 'dict' else set()
+
+    def load(self):
+        if self.table == 'closed_threads':
+            rows = self.backend.query("SELECT thread_id, closed_at FROM closed_threads")
+            self.data = {str(tid): datetime.fromtimestamp(ts, timezone.utc).isoformat() for tid, ts in rows}
+        elif self.table == 'notify_opt_out':
+            self.data = {uid for (uid,) in self.backend.query("SELECT user_id FROM notify_opt_out")}
+        else:
+            self.data = {str(gid): cid for gid, cid in self.backend.query("SELECT guild_id, channel_id FROM reminder_channels")}
+        return self.data
+
+    def set(self, key, value, **meta):
+        self.data[key] = value
+        if self.table == 'closed_threads':
+            closed_at = _parse_iso(value) or datetime.now(timezone.utc)
+            self.backend.write(
+                "INSERT OR REPLACE INTO closed_threads VALUES (?, ?, ?)",
+                (int(key), meta.get('guild_id'), closed_at.timestamp()),
+                change=(self.table, int(key)),
+            )
+        else:
+            self.backend.write(
+                "INSERT OR REPLACE INTO reminder_channels VALUES (?, ?)", (int(key), int(value)),
+                change=(self.table, int(key)),
+            )
+
+    def delete(self, key):
+        if key in self.data:
+            self.data.pop(key, None)
+            col = 'thread_id' if self.table == 'closed_threads' else 'guild_id'
+            self.backend.write(f"DELETE FROM {self.table} WHERE {col} = ?", (int(key),), change=(self.table, int(key)))
+
+    def add(self, item, **meta):
+        if item not in self.data:
+            self.data.add(item)
+            self.backend.write(
+                "INSERT OR REPLACE INTO notify_opt_out VALUES (?, ?, ?)",
+                (int(item), meta.get('guild_id'), time.time()),
+                change=(self.table, int(item)),
+            )
+
+    def discard(self, item):
+        if item in self.data:
+            self.data.discard(item)
+            self.backend.write("DELETE FROM notify_opt_out WHERE user_id = ?", (int(item),), change=(self.table, int(item)))
+
+    def refresh(self, key: int):
+        """Re-read one row after another worker changed it; returns the new value (None if deleted)."""
+        if self.table == 'closed_threads':
+            rows = self.backend.query("SELECT closed_at FROM closed_threads WHERE thread_id = ?", (key,))
+            value = datetime.fromtimestamp(rows[0][0], timezone.utc).isoformat() if rows else None
+        elif self.table == 'notify_opt_out':
+            present = bool(self.backend.query("SELECT 1 FROM notify_opt_out WHERE user_id = ?", (key,)))
+            (self.data.add if present else self.data.discard)(key)
+            return key if present else None
+        else:
+            rows = self.backend.query("SELECT channel_id FROM reminder_channels WHERE guild_id = ?", (key,))
+            value = rows[0][0] if rows else None
+        if value is None:
+            self.data.pop(str(key), None)
+        else:
+            self.data[str(key)] = value
+        return value
+
+    def compact(self):
+        # every mutation is already committed
+        pass
+
+
+if STORAGE_BACKEND == 'sqlite':
+    sqlite_backend = SQLiteBackend(STORAGE_DB)
+    reminder_channels_store = SQLiteStore(sqlite_backend, 'reminder_channels')
+    notified_users_store = SQLiteStore(sqlite_backend, 'notify_opt_out')
+    notify_guilds_store = None
+    closed_threads_store = SQLiteStore(sqlite_backend, 'closed_threads')
+else:
+    sqlite_backend = None
+    reminder_channels_store = JournaledStore('reminder_channels.json', key_type=str)
+    notified_users_store = JournaledStore('notified_users.json', kind='set', key_type=_int_or_self)
+    # notified_users.json stays a plain list of ids; the guild of each opt-out lives next to it
+    notify_guilds_store = JournaledStore('notified_users_guilds.json', key_type=_int_or_self)
+    closed_threads_store = JournaledStore('closed_threads.json', key_type=str, indent=2)
+# Per-shard state stays in (per-process) JSON files: each worker only indexes its own guilds
+thread_index_store = JournaledStore(_state_file('thread_index.json'), key_type=int)
+# Reminder timers: event_id -> {guild_id, start, fire_at, sent_for}
+reminder_state_store = JournaledStore(_state_file('reminder_state.json'), key_type=int)
+
+
+def closed_threads_due(before: datetime) -> list:
+    """Return [(thread_id, guild_id, closed_at)] for closed threads closed at or before `before`."""
+    if sqlite_backend is not None:
+        rows = sqlite_backend.query(
+            "SELECT thread_id, guild_id, closed_at FROM closed_threads WHERE closed_at <= ? ORDER BY closed_at",
+            (before.timestamp(),),
+        )
+        return [(tid, gid, datetime.fromtimestamp(ts, timezone.utc)) for tid, gid, ts in rows]
+
+    due = []
+    for tid_str, iso in list(closed_threads.items()):
+        try:
+            tid = int(tid_str)
+        except Exception:
+            continue
+        dt = _parse_iso(iso) if isinstance(iso, str) else None
+        if dt is not None and dt <= before:
+            due.append((tid, (thread_index.get(tid) or {}).get('guild_id'), dt))
+    return due
+
+
+def opted_out_users(guild_id: int) -> set:
+    """Return the ids of users who opted out from this guild (indexed query on SQLite)."""
+    if sqlite_backend is not None:
+        return {uid for (uid,) in sqlite_backend.query("SELECT user_id FROM notify_opt_out WHERE guild_id = ?", (guild_id,))}
+    return {uid for uid in notify_opt_out if notify_opt_out_guilds.get(uid) == guild_id}
+
+
+def opted_out_without_guild() -> int:
+    """Number of opt-outs whose guild was never recorded (made before it was tracked)."""
+    if sqlite_backend is not None:
+        return sqlite_backend.query("SELECT COUNT(*) FROM notify_opt_out WHERE guild_id IS NULL")[0][0]
+    return sum(1 for uid in notify_opt_out if notify_opt_out_guilds.get(uid) is None)
+
+
+def record_opt_out(user_id: int, guild_id: int = None):
+    notified_users_store.add(user_id, guild_id=guild_id)
+    if notify_guilds_store is not None and guild_id is not None:
+        notify_guilds_store.set(user_id, guild_id)
+
+
+def forget_opt_out(user_id: int):
+    notified_users_store.discard(user_id)
+    if notify_guilds_store is not None:
+        notify_guilds_store.delete(user_id)
+
+
+# Load reminder channel overrides from disk
+def load_reminder_channels():
+    global reminder_channels
+    reminder_channels = reminder_channels_store.load()
+
+
+# Charger notified_users.json en mémoire au démarrage
+def load_notified_users():
+    global notify_opt_out, notify_opt_out_guilds
+    # IDs are normalized to int where possible (key_type)
+    notify_opt_out = notified_users_store.load()
+    if notify_guilds_store is not None:
+        notify_opt_out_guilds = notify_guilds_store.load()
+
+
+# Load closed threads (stores closure timestamp in ISO format)
+def load_closed_threads(seed_cache: bool = True):
+    global closed_threads
+    closed_threads = closed_threads_store.load()
+    if not seed_cache:
+        # closing_cache already restored from the warm-start snapshot
         return
-    try:
-        with open(path, 'r') as f:
-            data = json.load(f)
-            if isinstance(data, dict):
-                closed_threads = data
-            else:
-                closed_threads = {}
-    except Exception:
-        closed_threads = {}
 
     # seed closing_cache with parsed datetimes where possible
     for k, v in list(closed_threads.items()):
@@ -135,13 +898,69 @@ def load_closed_threads():
             # skip entries that can't be parsed
             pass
 
-def save_closed_threads():
-    path = os.path.join(os.getcwd(), 'closed_threads.json')
+
+# Load/save for the lock-date cache, persisted next to closed_threads.json
+def load_closing_cache():
+    path = os.path.join(os.getcwd(), _state_file('closing_cache.json'))
+    if not os.path.exists(path):
+        return
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            closing_cache.load_json(data)
+    except Exception:
+        pass
+
+
+def save_closing_cache():
+    path = os.path.join(os.getcwd(), _state_file('closing_cache.json'))
+    # snapshot taken on the loop, written by the store writer thread
+    _store_writer.submit(_write_json_atomic, path, closing_cache.to_json())
+    closing_cache.dirty = False
+
+
+# Load/save for the forum thread index (datetimes stored in ISO format)
+def load_thread_index():
+    global thread_index
+    thread_index = thread_index_store.load()
+
+
+def save_thread_index():
+    thread_index_store.compact()
+
+
+# Load/save for the audit-log lock index
+def load_lock_index():
+    global lock_index
+    path = os.path.join(os.getcwd(), _state_file('lock_index.json'))
+    if not os.path.exists(path):
+        lock_index = {}
+        return
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        lock_index = {
+            int(gid): {
+                'high_water': v.get('high_water'),
+                'locks': {int(tid): iso for tid, iso in (v.get('locks') or {}).items()},
+            }
+            for gid, v in data.items()
+        } if isinstance(data, dict) else {}
+    except Exception:
+        lock_index = {}
+
+
+def save_lock_index():
+    path = os.path.join(os.getcwd(), _state_file('lock_index.json'))
     try:
-        with open(path, 'w') as f:
-            json.dump(closed_threads, f, ensure_ascii=False, indent=2)
+        data = {
+            str(gid): {'high_water': v.get('high_water'), 'locks': {str(t): iso for t, iso in v['locks'].items()}}
+            for gid, v in lock_index.items()
+        }
+        _store_writer.submit(_write_json_atomic, path, data)
     except Exception as e:
-        logger.error(f"Impossible d'enregistrer closed_threads.json: {e}")
+        logger.error(f"Impossible d'enregistrer lock_index.json: {e}")
 
 
 async def send_confirmation_outside_thread(ctx, thread, content):
@@ -181,9 +1000,23 @@ async def send_confirmation_outside_thread(ctx, thread, content):
 
 
 # Charger les opt-out en mémoire maintenant
+if sqlite_backend is not None:
+    sqlite_backend.migrate_from_json()
+warm_snapshot = read_warm_snapshot()
+if warm_snapshot is not None:
+    closing_cache.restore(warm_snapshot['closing_cache'])
+startup_marks['snapshot'] = time.perf_counter() - BOOT_STARTED
 load_notified_users()
 load_reminder_channels()
-load_closed_threads()
+if warm_snapshot is None:
+    load_closing_cache()
+load_closed_threads(seed_cache=warm_snapshot is None)
+load_thread_index()
+load_lock_index()
+reminder_state = reminder_state_store.load()
+startup_marks['state'] = time.perf_counter() - BOOT_STARTED
+# Worker mode: position in the shared change log (changes made before startup are already loaded)
+shared_change_seq = sqlite_backend.last_change() if sqlite_backend is not None else 0
 
 # ============ ⚙️ FONCTIONS UTILES ============
 
@@ -194,6 +1027,549 @@ def github_headers():
     return headers
 
 
+class GitHubError(Exception):
+    """Raised when GitHub answers a batch/GraphQL request with an unusable status."""
+
+    def __init__(self, status_code: int, message: str = ""):
+        super().__init__(f"GitHub {status_code}: {message}" if message else f"GitHub {status_code}")
+        self.status_code = status_code
+
+
+# Network errors raised by the async GitHub client (equivalent of requests.RequestException)
+GITHUB_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, GitHubError)
+
+# `#123` references in thread titles / messages
+GITHUB_REF_RE = re.compile(r"#(\d+)")
+
+
+def extract_references(*texts) -> list:
+    """Return every distinct `#N` number found in `texts`, in order of appearance."""
+    seen = []
+    for text in texts:
+        if not text:
+            continue
+        for m in GITHUB_REF_RE.finditer(text):
+            n = int(m.group(1))
+            if n not in seen:
+                seen.append(n)
+    return seen
+
+
+class RestResponse:
+    """Minimal response object returned by the async REST clients (mimics the bits of requests.Response we use)."""
+
+    def __init__(self, status_code: int, headers, data):
+        self.status_code = status_code
+        self.headers = headers
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+class GitHubCache:
+    """TTL + LRU cache of PR/issue payloads keyed by (repo, kind, number).
+
+    Entries keep the ETag returned by GitHub so stale entries can be revalidated
+    with `If-None-Match` (a 304 does not count against the rate limit).
+    Only the fields the bot displays are kept, to bound the memory footprint.
+    """
+
+    KEPT_FIELDS = ('number', 'title', 'body', 'state', 'html_url')
+    MAX_BODY_LEN = 4096  # Discord embed description limit
+
+    def __init__(self, max_entries: int = 256, ttl: float = 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (stored_at, etag, data)
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    @classmethod
+    def _trim(cls, data):
+        if not isinstance(data, dict):
+            return data
+        trimmed = {k: data.get(k) for k in cls.KEPT_FIELDS if k in data}
+        if isinstance(trimmed.get('body'), str):
+            trimmed['body'] = trimmed['body'][:cls.MAX_BODY_LEN]
+        user = data.get('user')
+        if isinstance(user, dict):
+            trimmed['user'] = {'login': user.get('login')}
+        return trimmed
+
+    def get(self, key):
+        """Return (fresh, etag, data) for `key`, or None if not cached."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        stored_at, etag, data = entry
+        fresh = (time.monotonic() - stored_at) < self.ttl
+        return fresh, etag, data
+
+    def put(self, key, etag, data):
+        self._entries[key] = (time.monotonic(), etag, self._trim(data))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def snapshot(self) -> list:
+        """[(key, age, etag, data)]: ages instead of monotonic stamps so they survive a restart."""
+        now = time.monotonic()
+        return [(key, now - stored_at, etag, data) for key, (stored_at, etag, data) in self._entries.items()]
+
+    def restore(self, entries: list, offline: float = 0.0):
+        """Re-insert snapshot entries; `offline` (seconds between snapshot and now) ages them further."""
+        now = time.monotonic()
+        for key, age, etag, data in entries:
+            # stale entries are kept for their ETag (a 304 revalidation is free)
+            self._entries[key] = (now - age - offline, etag, data)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def touch(self, key):
+        """Mark an entry as freshly revalidated (after a 304)."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries[key] = (time.monotonic(), entry[1], entry[2])
+            self._entries.move_to_end(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses + self.revalidations
+        hit_rate = ((self.hits + self.revalidations) / total * 100) if total else 0.0
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidations': self.revalidations,
+            'hit_rate': hit_rate,
+        }
+
+
+class GitHubClient:
+    """Shared asynchronous GitHub REST client.
+
+    Keeps one aiohttp session (keep-alive connection pool) for the whole bot and
+    bounds the number of concurrent requests with a semaphore, so command handlers
+    never block the event loop on network I/O.
+
+    Requests are also scheduled around GitHub's rate limit: the client tracks
+    `X-RateLimit-Remaining`/`X-RateLimit-Reset` and `Retry-After`, queues requests
+    until the quota resets instead of failing, and coalesces identical in-flight
+    requests into a single upstream call.
+    """
+
+    API_URL = "https://api.github.com"
+
+    def __init__(self, pool_size: int = 10, max_concurrency: int = 8, timeout: float = 10, cache: GitHubCache = None,
+                 max_wait: float = 900, max_retries: int = 3):
+        self.pool_size = pool_size
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.cache = cache if cache is not None else GitHubCache()
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self._session = None
+        self._semaphore = None
+        # Rate limit state, as last reported by GitHub
+        self.rate_remaining = None
+        self.rate_reset = None  # epoch seconds
+        self.rate_limited = 0  # number of 403/429 rate-limit responses received
+        self.coalesced = 0  # number of requests served by an identical in-flight request
+        self._inflight = {}
+
+    def _get_session(self):
+        # The session must be created from inside the running event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=github_headers(),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    def _update_rate_limit(self, headers):
+        try:
+            if "X-RateLimit-Remaining" in headers:
+                self.rate_remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Reset" in headers:
+                self.rate_reset = float(headers["X-RateLimit-Reset"])
+        except (TypeError, ValueError):
+            pass
+
+    def _quota_delay(self) -> float:
+        """Seconds to wait before the next request may be sent (0 if quota is available)."""
+        if self.rate_remaining is not None and self.rate_remaining <= 0 and self.rate_reset:
+            return max(0.0, self.rate_reset - time.time())
+        return 0.0
+
+    def _retry_delay(self, resp: RestResponse, attempt: int):
+        """Return how long to wait before retrying `resp`, or None if it must not be retried."""
+        if resp.status_code in (403, 429):
+            retry_after = resp.headers.get("Retry-After")
+            if retry_after is not None:
+                try:
+                    return float(retry_after)
+                except ValueError:
+                    return 60.0
+            if resp.headers.get("X-RateLimit-Remaining") == "0":
+                return self._quota_delay() + 1
+            # plain 403 (bad token / no access): not a rate limit
+            return None
+        if resp.status_code in (502, 503, 504):
+            return 2 ** attempt
+        return None
+
+    async def _send(self, method: str, url: str, headers: dict = None, json_body=None) -> RestResponse:
+        session = self._get_session()
+        async with self._semaphore:
+            started = time.perf_counter()
+            async with session.request(method, url, headers=headers, json=json_body) as resp:
+                data = None
+                if resp.status != 304:
+                    try:
+                        data = await resp.json(content_type=None)
+                    except (ValueError, aiohttp.ContentTypeError):
+                        data = None
+                self._update_rate_limit(resp.headers)
+                metrics.observe('epitrello_rest_request_duration_seconds', time.perf_counter() - started, api='github')
+                metrics.inc('epitrello_rest_requests_total', api='github', status=resp.status)
+                return RestResponse(resp.status, resp.headers, data)
+
+    async def _scheduled(self, method: str, url: str, headers: dict = None, json_body=None) -> RestResponse:
+        waited = 0.0
+        attempt = 0
+        while True:
+            delay = self._quota_delay()
+            if delay > 0:
+                if waited + delay > self.max_wait:
+                    logger.warning(f"GitHub rate limit: quota épuisé, reset dans {delay:.0f}s (> {self.max_wait:.0f}s)")
+                    delay = max(0.0, self.max_wait - waited)
+                logger.info(f"GitHub rate limit: requête mise en attente {delay:.0f}s")
+                await asyncio.sleep(delay)
+                waited += delay
+
+            resp = await self._send(method, url, headers=headers, json_body=json_body)
+            retry_in = self._retry_delay(resp, attempt)
+            if retry_in is None:
+                return resp
+            if resp.status_code in (403, 429):
+                self.rate_limited += 1
+                metrics.inc('epitrello_rate_limit_hits_total', api='github')
+            if attempt >= self.max_retries or waited + retry_in > self.max_wait:
+                return resp
+            logger.info(f"GitHub {resp.status_code} sur {url}: nouvel essai dans {retry_in:.0f}s")
+            await asyncio.sleep(retry_in)
+            waited += retry_in
+            attempt += 1
+
+    def _url(self, path: str) -> str:
+        return path if path.startswith("http") else f"{self.API_URL}{path}"
+
+    @staticmethod
+    def _inflight_key(method: str, url: str, headers: dict = None, json_body=None):
+        return (method, url, tuple(sorted((headers or {}).items())), json.dumps(json_body, sort_keys=True))
+
+    async def request(self, method: str, path: str, headers: dict = None, json_body=None) -> RestResponse:
+        """Send a request through the rate-limit scheduler, coalescing identical in-flight calls."""
+        url = self._url(path)
+        key = self._inflight_key(method, url, headers, json_body)
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.coalesced += 1
+            return await asyncio.shield(fut)
+
+        fut = asyncio.ensure_future(self._scheduled(method, url, headers=headers, json_body=json_body))
+        self._inflight[key] = fut
+        fut.add_done_callback(lambda _f: self._inflight.pop(key, None))
+        return await asyncio.shield(fut)
+
+    async def get(self, path: str, headers: dict = None) -> RestResponse:
+        """GET `path` (relative to the API root, or absolute URL) and return a RestResponse."""
+        return await self.request("GET", path, headers=headers)
+
+    async def get_item(self, kind: str, number: int) -> RestResponse:
+        """Fetch a PR (`kind='pulls'`) or issue (`kind='issues'`) through the response cache.
+
+        Fresh entries are served from memory; stale ones are revalidated with their ETag.
+        """
+        key = (GITHUB_REPO, kind, int(number))
+        cached = self.cache.get(key)
+        headers = None
+        if cached is not None:
+            fresh, etag, data = cached
+            if fresh:
+                self.cache.hits += 1
+                return RestResponse(200, {}, data)
+            if etag:
+                headers = {"If-None-Match": etag}
+
+        path = f"/repos/{GITHUB_REPO}/{kind}/{int(number)}"
+        # only the caller that actually goes upstream counts a miss/revalidation; duplicates
+        # joining its in-flight request are counted in `coalesced`
+        upstream = self._inflight_key("GET", self._url(path), headers) not in self._inflight
+        r = await self.get(path, headers=headers)
+        if r.status_code == 304 and cached is not None:
+            if upstream:
+                self.cache.revalidations += 1
+            self.cache.touch(key)
+            return RestResponse(200, r.headers, cached[2])
+
+        if upstream:
+            self.cache.misses += 1
+        if r.status_code == 200:
+            self.cache.put(key, r.headers.get("ETag"), r.json())
+            return RestResponse(200, r.headers, self.cache.get(key)[2])
+        return r
+
+    def _cached_reference(self, number: int):
+        """Return a fresh cached PR/issue for `number` (PR first), or None."""
+        for kind in ("pulls", "issues"):
+            cached = self.cache.get((GITHUB_REPO, kind, number))
+            if cached is not None and cached[0]:
+                self.cache.hits += 1
+                # PRs fetched through the issues endpoint are cached under 'issues'
+                is_pull = kind == "pulls" or "/pull/" in (cached[2].get("html_url") or "")
+                return dict(cached[2], kind="pull" if is_pull else "issue")
+        return None
+
+    async def _graphql_references(self, numbers: list) -> dict:
+        """Resolve `numbers` in a single GraphQL round trip (requires a token)."""
+        owner, name = GITHUB_REPO.split("/", 1)
+        fields = "number title body state url author { login }"
+        parts = [
+            f"r{n}: issueOrPullRequest(number: {n}) {{ __typename ... on PullRequest {{ {fields} }} ... on Issue {{ {fields} }} }}"
+            for n in numbers
+        ]
+        query = "query($owner: String!, $name: String!) { repository(owner: $owner, name: $name) { " + " ".join(parts) + " } }"
+        r = await self.request("POST", "/graphql", json_body={"query": query, "variables": {"owner": owner, "name": name}})
+        if r.status_code != 200 or not isinstance(r.json(), dict):
+            raise GitHubError(r.status_code, "GraphQL")
+        repo_data = (r.json().get("data") or {}).get("repository")
+        if repo_data is None:
+            raise GitHubError(r.status_code, "dépôt introuvable (GraphQL)")
+
+        results = {}
+        for n in numbers:
+            node = repo_data.get(f"r{n}")
+            if not node:
+                results[n] = None
+                continue
+            kind = "pulls" if node.get("__typename") == "PullRequest" else "issues"
+            data = {
+                "number": node.get("number", n),
+                "title": node.get("title"),
+                "body": node.get("body"),
+                "state": (node.get("state") or "").lower(),
+                "html_url": node.get("url"),
+                "user": {"login": (node.get("author") or {}).get("login")},
+            }
+            self.cache.put((GITHUB_REPO, kind, n), None, data)
+            results[n] = dict(self.cache.get((GITHUB_REPO, kind, n))[2], kind="pull" if kind == "pulls" else "issue")
+        return results
+
+    async def _rest_reference(self, number: int):
+        # the issues endpoint also returns PRs (with a `pull_request` key)
+        r = await self.get_item("issues", number)
+        if r.status_code == 404:
+            return None
+        if r.status_code != 200:
+            raise GitHubError(r.status_code)
+        data = r.json()
+        if "pull_request" in data or "/pull/" in (data.get("html_url") or ""):
+            return dict(data, kind="pull")
+        return dict(data, kind="issue")
+
+    async def resolve_references(self, numbers) -> dict:
+        """Resolve many PR/issue numbers at once.
+
+        Returns {number: data or None}, where data holds title/state/html_url/user and
+        `kind` ('pull' or 'issue'). Cached entries are reused; the rest is resolved with
+        one GraphQL query per 50 numbers, or per-number REST calls when no token is set.
+        """
+        results = {}
+        missing = []
+        for n in numbers:
+            n = int(n)
+            cached = self._cached_reference(n)
+            if cached is not None:
+                results[n] = cached
+            elif n not in missing:
+                missing.append(n)
+
+        if not missing:
+            return results
+
+        if GITHUB_TOKEN and GITHUB_REPO and "/" in GITHUB_REPO:
+            self.cache.misses += len(missing)
+            for i in range(0, len(missing), 50):
+                results.update(await self._graphql_references(missing[i:i + 50]))
+        else:
+            fetched = await asyncio.gather(*(self._rest_reference(n) for n in missing))
+            results.update(zip(missing, fetched))
+        return results
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+github = GitHubClient(
+    pool_size=GITHUB_POOL_SIZE,
+    max_concurrency=GITHUB_MAX_CONCURRENCY,
+    timeout=GITHUB_TIMEOUT,
+    cache=GitHubCache(max_entries=GITHUB_CACHE_SIZE, ttl=GITHUB_CACHE_TTL),
+    max_wait=GITHUB_MAX_WAIT,
+    max_retries=GITHUB_MAX_RETRIES,
+)
+
+
+class DiscordRestClient:
+    """Asynchronous Discord REST client used for the raw API fallbacks.
+
+    Shares one aiohttp session and honours Discord's per-route rate-limit buckets
+    (`X-RateLimit-Bucket`, `X-RateLimit-Remaining`, `X-RateLimit-Reset-After`) as well
+    as 429 `retry_after` / global limits, so concurrent fallbacks never block the loop
+    and never hammer a bucket that is already exhausted.
+    """
+
+    API_URL = "https://discord.com/api/v10"
+
+    def __init__(self, token: str, timeout: float = 10, max_retries: int = 3):
+        self.token = token
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._session = None
+        self._route_buckets = {}  # route key -> bucket hash reported by Discord
+        self._buckets = {}  # (bucket hash or route key, major id) -> SimpleNamespace(remaining, reset_at, lock)
+        self._global_reset_at = 0.0
+        self.rate_limited = 0
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers={
+                    "Authorization": f"Bot {self.token}",
+                    "Accept": "application/json",
+                    "User-Agent": "EpiTrelloBot (https://github.com/ErwannL/EpiTrelloBot, 1.0)",
+                },
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    def _bucket(self, route: str, major):
+        key = (self._route_buckets.get(route, route), major)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = SimpleNamespace(remaining=None, reset_at=0.0, lock=asyncio.Lock())
+            self._buckets[key] = bucket
+        return bucket
+
+    async def request(self, method: str, route: str, major=None, params: dict = None, json_body=None, **fmt) -> RestResponse:
+        """Send `method route` where `route` is a path template such as `/channels/{channel_id}/threads/active`.
+
+        `major` is the major parameter (channel/guild id) used to scope the rate-limit bucket.
+        """
+        path = route.format(**fmt)
+        route_key = f"{method} {route}"
+        session = self._get_session()
+
+        for attempt in range(self.max_retries + 1):
+            bucket = self._bucket(route_key, major)
+            async with bucket.lock:
+                now = time.monotonic()
+                if self._global_reset_at > now:
+                    await asyncio.sleep(self._global_reset_at - now)
+                if bucket.remaining == 0 and bucket.reset_at > time.monotonic():
+                    await asyncio.sleep(bucket.reset_at - time.monotonic())
+
+                started = time.perf_counter()
+                async with session.request(method, f"{self.API_URL}{path}", params=params, json=json_body) as resp:
+                    try:
+                        data = await resp.json(content_type=None)
+                    except (ValueError, aiohttp.ContentTypeError):
+                        data = None
+                    headers = resp.headers
+                    metrics.observe('epitrello_rest_request_duration_seconds', time.perf_counter() - started, api='discord')
+                    metrics.inc('epitrello_rest_requests_total', api='discord', status=resp.status)
+
+                    bucket_hash = headers.get("X-RateLimit-Bucket")
+                    if bucket_hash and self._route_buckets.get(route_key) != bucket_hash:
+                        self._route_buckets[route_key] = bucket_hash
+                        self._buckets.setdefault((bucket_hash, major), bucket)
+                    try:
+                        if "X-RateLimit-Remaining" in headers:
+                            bucket.remaining = int(headers["X-RateLimit-Remaining"])
+                        if "X-RateLimit-Reset-After" in headers:
+                            bucket.reset_at = time.monotonic() + float(headers["X-RateLimit-Reset-After"])
+                    except (TypeError, ValueError):
+                        pass
+
+                    if resp.status != 429:
+                        return RestResponse(resp.status, headers, data)
+
+                    self.rate_limited += 1
+                    metrics.inc('epitrello_rate_limit_hits_total', api='discord')
+                    retry_after = 1.0
+                    if isinstance(data, dict) and data.get("retry_after") is not None:
+                        retry_after = float(data["retry_after"])
+                    if headers.get("X-RateLimit-Global") or (isinstance(data, dict) and data.get("global")):
+                        self._global_reset_at = time.monotonic() + retry_after
+                    else:
+                        bucket.remaining = 0
+                        bucket.reset_at = time.monotonic() + retry_after
+                    logger.info(f"Discord 429 sur {route_key}: nouvel essai dans {retry_after:.2f}s")
+                    if attempt >= self.max_retries:
+                        return RestResponse(resp.status, headers, data)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+discord_rest = DiscordRestClient(TOKEN)
+
+
+def instrument_discord_http(http):
+    """Count the calls made by discord.py's own HTTP client in the Discord REST metrics.
+
+    discord.py retries 429s internally and only returns the decoded body, so a success is
+    recorded as `2xx` and only a rate limit that outlasts its retries reaches the counter.
+    """
+    if getattr(http.request, '_epitrello_metrics', False):
+        return
+    original = http.request
+
+    async def request(route, **kwargs):
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            result = await original(route, **kwargs)
+            status = '2xx'
+            return result
+        except discord.HTTPException as e:
+            status = e.status
+            if e.status == 429:
+                metrics.inc('epitrello_rate_limit_hits_total', api='discord')
+            raise
+        finally:
+            metrics.observe('epitrello_rest_request_duration_seconds', time.perf_counter() - started, api='discord')
+            metrics.inc('epitrello_rest_requests_total', api='discord', status=status)
+
+    request._epitrello_metrics = True
+    http.request = request
+
+
 def get_event_start_time(event):
     """Return a datetime for the event start, handling attribute name differences across discord.py versions."""
     # discord.py renamed/changed scheduled event attributes across versions
@@ -204,23 +1580,176 @@ def get_event_start_time(event):
     return None
 
 
-async def get_event_interested_users(guild: discord.Guild, event) -> list:
-    """Return a list of User objects who are interested in the event.
+# Discord recurrence frequencies (ScheduledEventRecurrenceFrequency values)
+RRULE_YEARLY, RRULE_MONTHLY, RRULE_WEEKLY, RRULE_DAILY = 0, 1, 2, 3
+RRULE_MAX_STEPS = 5000  # safety bound for rules whose filters never match
+
+
+def _rule_get(rule, name, default=None):
+    """Read a recurrence rule field from a discord.py object or a raw REST dict."""
+    if isinstance(rule, dict):
+        val = rule.get(name, default)
+    else:
+        val = getattr(rule, name, default)
+    return default if val is None else val
+
 
-    This handles multiple discord.py versions:
-      - event.fetch_users() (newer)
+def _enum_int(val):
+    return int(getattr(val, 'value', val))
+
+
+def _nth_weekday(year: int, month: int, n: int, weekday: int):
+    """Day of month of the n-th `weekday` (0=Monday) of a month; n=-1 is the last one. None if absent."""
+    days_in_month = calendar.monthrange(year, month)[1]
+    days = [d for d in range(1, days_in_month + 1) if calendar.weekday(year, month, d) == weekday]
+    try:
+        return days[n - 1] if n > 0 else days[n]
+    except IndexError:
+        return None
+
+
+def _rule_candidates(start: datetime, rule):
+    """Yield the (unbounded, sorted) occurrences described by a Discord recurrence rule."""
+    freq = _enum_int(_rule_get(rule, 'frequency', RRULE_WEEKLY))
+    interval = max(1, int(_rule_get(rule, 'interval', 1)))
+    by_weekday = sorted({_enum_int(d) for d in _rule_get(rule, 'by_weekday', []) or []})
+    by_n_weekday = _rule_get(rule, 'by_n_weekday', []) or []
+    by_month = [_enum_int(m) for m in _rule_get(rule, 'by_month', []) or []]
+    by_month_day = [int(d) for d in _rule_get(rule, 'by_month_day', []) or []]
+
+    for step in range(RRULE_MAX_STEPS):
+        k = step * interval
+        if freq == RRULE_DAILY:
+            dt = start + timedelta(days=k)
+            if not by_weekday or dt.weekday() in by_weekday:
+                yield dt
+        elif freq == RRULE_WEEKLY:
+            if not by_weekday:
+                yield start + timedelta(weeks=k)
+                continue
+            week_start = start + timedelta(weeks=k) - timedelta(days=start.weekday())
+            for wd in by_weekday:
+                dt = week_start + timedelta(days=wd)
+                if dt >= start:
+                    yield dt
+        elif freq == RRULE_MONTHLY:
+            month_index = start.month - 1 + k
+            year, month = start.year + month_index // 12, month_index % 12 + 1
+            days = []
+            for item in by_n_weekday:
+                day = _nth_weekday(year, month, int(_rule_get(item, 'n', 1)), _enum_int(_rule_get(item, 'day', 0)))
+                if day:
+                    days.append(day)
+            if not days:
+                days = by_month_day or [start.day]
+            for day in sorted(set(days)):
+                if day <= calendar.monthrange(year, month)[1]:
+                    dt = start.replace(year=year, month=month, day=day)
+                    if dt >= start:
+                        yield dt
+        else:  # yearly
+            year = start.year + k
+            month = by_month[0] if by_month else start.month
+            day = by_month_day[0] if by_month_day else start.day
+            if day <= calendar.monthrange(year, month)[1]:
+                dt = start.replace(year=year, month=month, day=day)
+                if dt >= start:
+                    yield dt
+
+
+def iter_event_occurrences(event, after: datetime, rule=None):
+    """Lazily yield the start datetimes of `event` strictly after `after`, in order.
+
+    `rule` is Discord's native `recurrence_rule` as returned by the REST API (frequency,
+    interval, by_weekday, by_n_weekday, by_month, by_month_day, count, end): discord.py's
+    ScheduledEvent doesn't expose it, so callers pass the raw dict cached by the reminder
+    engine. Events without a rule but with "weekly" in their name keep the historical
+    weekly simulation.
+    """
+    start = get_event_start_time(event)
+    if start is None:
+        return
+    if rule is None:
+        rule = getattr(event, 'recurrence_rule', None)
+    if rule is None and "weekly" in (getattr(event, 'name', '') or '').lower():
+        rule = {'frequency': RRULE_WEEKLY, 'interval': 1}
+    if rule is None:
+        if start > after:
+            yield start
+        return
+
+    count = _rule_get(rule, 'count')
+    end_time = _rule_get(rule, 'end') or _rule_get(rule, 'end_time')
+    if isinstance(end_time, str):
+        end_time = _parse_iso(end_time)
+    for n, dt in enumerate(_rule_candidates(start, rule), start=1):
+        if count and n > int(count):
+            return
+        if end_time and dt > end_time:
+            return
+        if dt > after:
+            yield dt
+
+
+def upcoming_occurrences(events, after: datetime, limit: int, rules: dict = None):
+    """Top `limit` occurrences across `events` as (start, event) via a k-way heap merge.
+
+    `rules` maps event ids to their raw recurrence rule (see ReminderEngine.rules).
+    """
+    rules = rules or {}
+
+    def _stream(e):
+        for dt in iter_event_occurrences(e, after, rules.get(e.id)):
+            yield dt, e.id, e
+
+    streams = [_stream(e) for e in events]
+    return [(dt, e) for dt, _, e in itertools.islice(heapq.merge(*streams, key=lambda x: (x[0], x[1])), limit)]
+
+
+def _user_from_rest(item):
+    """Convert a REST scheduled-event user ({user, member} or a bare user) to a user-like object."""
+    if isinstance(item, dict) and isinstance(item.get('user'), dict):
+        u = item['user']
+        uid = int(u.get('id'))
+        username = u.get('username') or u.get('name') or str(uid)
+        display = username
+        # member nickname if present
+        if isinstance(item.get('member'), dict):
+            display = item['member'].get('nick') or username
+        return SimpleNamespace(id=uid, name=username, display_name=display, mention=f"<@{uid}>")
+    if isinstance(item, dict) and 'id' in item:
+        uid = int(item.get('id'))
+        username = item.get('username') or item.get('name') or str(uid)
+        return SimpleNamespace(id=uid, name=username, display_name=username, mention=f"<@{uid}>")
+    return None
+
+
+async def iter_event_interested_users(guild: discord.Guild, event):
+    """Async generator yielding the users interested in `event`, page by page as they arrive.
+
+    Handles multiple discord.py versions:
+      - event.fetch_users() / event.users() (async iterators)
       - guild.fetch_scheduled_event_users(event.id) (alternate)
-    The function normalizes different return shapes.
+    and finally pages through `/scheduled-events/{id}/users` with `after` (100 per page)
+    through the async Discord REST client. The different return shapes are normalized.
     """
-    # Try event.fetch_users()
-    fetch_attr = getattr(event, 'fetch_users', None)
-    if callable(fetch_attr):
+    # Library iterators (paginate internally)
+    for attr in ('fetch_users', 'users'):
+        fetch_attr = getattr(event, attr, None)
+        if not callable(fetch_attr):
+            continue
+        yielded = False
         try:
-            users = [u async for u in event.fetch_users()]
-            return users
+            kwargs = {'limit': None} if attr == 'users' else {}
+            async for u in fetch_attr(**kwargs):
+                yielded = True
+                yield u
+            return
         except Exception:
+            if yielded:
+                # partial results already sent: don't restart with another method (duplicates)
+                return
             # Fall through to other methods
-            pass
 
     # Try guild.fetch_scheduled_event_users
     guild_fetch = getattr(guild, 'fetch_scheduled_event_users', None)
@@ -231,58 +1760,87 @@ async def get_event_interested_users(guild: discord.Guild, event) -> list:
             users = res
             if isinstance(res, tuple) and len(res) > 0:
                 users = res[0]
-
-            normalized = []
             for item in users:
                 # item might be a ScheduledEventUser with .user
-                if hasattr(item, 'user'):
-                    normalized.append(item.user)
-                else:
-                    normalized.append(item)
-            return normalized
+                yield item.user if hasattr(item, 'user') else item
+            return
         except Exception:
             pass
 
-    # Last resort: try attribute 'users' or 'user' lists on event
-    if hasattr(event, 'users') and isinstance(event.users, list):
-        return event.users
+    # Last resort: try attribute 'users' list on event
+    if isinstance(getattr(event, 'users', None), list):
+        for u in event.users:
+            yield u
+        return
 
-    # Final fallback: call Discord REST API directly if we have a bot token
-    if TOKEN:
+    # Final fallback: page through the Discord REST API (requires the bot token)
+    if not TOKEN:
+        return
+    after = None
+    while True:
+        params = {'with_member': 'true', 'limit': 100}
+        if after:
+            params['after'] = after
         try:
-            url = f"https://discord.com/api/v10/guilds/{guild.id}/scheduled-events/{event.id}/users?with_member=true&limit=100"
-            headers = {
-                "Authorization": f"Bot {TOKEN}",
-                "Accept": "application/json",
-                "User-Agent": "EpiTrelloBot (https://github.com/ErwannL/EpiTrelloBot, 1.0)"
-            }
-            resp = requests.get(url, headers=headers, timeout=10)
-            if resp.status_code == 200:
-                data = resp.json()
-                normalized = []
-                for item in data:
-                    # item could be {user: {...}, member: {...}} or a user object
-                    user_obj = None
-                    if isinstance(item, dict) and 'user' in item and isinstance(item['user'], dict):
-                        u = item['user']
-                        uid = int(u.get('id'))
-                        username = u.get('username') or u.get('name') or str(uid)
-                        display = username
-                        # member nickname if present
-                        if 'member' in item and isinstance(item['member'], dict):
-                            display = item['member'].get('nick') or username
-                        user_obj = SimpleNamespace(id=uid, name=username, display_name=display, mention=f"<@{uid}>")
-                    elif isinstance(item, dict) and 'id' in item:
-                        uid = int(item.get('id'))
-                        username = item.get('username') or item.get('name') or str(uid)
-                        user_obj = SimpleNamespace(id=uid, name=username, display_name=username, mention=f"<@{uid}>")
-                    if user_obj:
-                        normalized.append(user_obj)
-                return normalized
+            r = await discord_rest.request(
+                "GET", "/guilds/{guild_id}/scheduled-events/{event_id}/users",
+                major=guild.id, params=params, guild_id=guild.id, event_id=event.id,
+            )
         except Exception:
-            pass
+            return
+        page = r.json() if r.status_code == 200 else None
+        if not isinstance(page, list) or not page:
+            return
+        last_id = None
+        for item in page:
+            user_obj = _user_from_rest(item)
+            if user_obj:
+                last_id = user_obj.id
+                yield user_obj
+        if len(page) < 100 or last_id is None:
+            return
+        after = last_id
 
-    return []
+
+# event_id -> (monotonic time, [users]) ; short TTL shared by admin event/simulate/remind and reminders
+INTERESTED_CACHE_TTL = float(os.getenv("INTERESTED_CACHE_TTL", "60"))
+_interested_cache = {}
+_interested_inflight = {}
+
+
+def invalidate_interested_users(event_id: int):
+    _interested_cache.pop(event_id, None)
+
+
+async def get_event_interested_users(guild: discord.Guild, event) -> list:
+    """Return a list of User objects who are interested in the event.
+
+    Results are cached per event for INTERESTED_CACHE_TTL seconds and concurrent calls
+    for the same event share a single fetch (see `iter_event_interested_users`).
+    """
+    cached = _interested_cache.get(event.id)
+    if cached is not None and time.monotonic() - cached[0] < INTERESTED_CACHE_TTL:
+        return list(cached[1])
+
+    fut = _interested_inflight.get(event.id)
+    if fut is None:
+        async def _collect():
+            return [u async for u in iter_event_interested_users(guild, event)]
+
+        fut = asyncio.ensure_future(_collect())
+        _interested_inflight[event.id] = fut
+        fut.add_done_callback(lambda _f: _interested_inflight.pop(event.id, None))
+
+    try:
+        users = await asyncio.shield(fut)
+    except Exception:
+        return []
+    _interested_cache[event.id] = (time.monotonic(), users)
+    # drop expired entries so the cache stays small
+    now = time.monotonic()
+    for eid in [eid for eid, (ts, _) in _interested_cache.items() if now - ts >= INTERESTED_CACHE_TTL]:
+        _interested_cache.pop(eid, None)
+    return list(users)
 
 
 def _get_channel_by_id(guild: discord.Guild, cid: int):
@@ -336,6 +1894,62 @@ def get_reminder_channel(guild: discord.Guild, event):
     return None
 
 
+DISCORD_MESSAGE_LIMIT = 2000
+
+
+def _mention_batches(mentions, max_len: int = DISCORD_MESSAGE_LIMIT, sep: str = " "):
+    """Group mentions into messages that each stay within Discord's character limit."""
+    batches = []
+    cur = []
+    cur_len = 0
+    for m in mentions:
+        extra = len(m) + (len(sep) if cur else 0)
+        if cur and cur_len + extra > max_len:
+            batches.append(sep.join(cur))
+            cur = []
+            cur_len = 0
+            extra = len(m)
+        cur.append(m)
+        cur_len += extra
+    if cur:
+        batches.append(sep.join(cur))
+    return batches
+
+
+def resolve_recipients(event, interested) -> SimpleNamespace:
+    """Compute who should be pinged for `event`: interested − opted-out − already in voice.
+
+    Id sets are built once, so the cost is linear in the number of interested users.
+    Returns a namespace with `interested`, `opted_out`, `connected` (id sets), `to_ping`
+    (users, original order) and `mention_batches` (strings within the 2,000-char limit).
+    """
+    by_id = {}
+    for u in interested:
+        uid = getattr(u, 'id', None)
+        if uid is not None and uid not in by_id:
+            by_id[uid] = u
+
+    interested_ids = set(by_id)
+    connected_ids = set()
+    channel = getattr(event, 'channel', None)
+    if isinstance(channel, discord.VoiceChannel):
+        connected_ids = {m.id for m in channel.members}
+
+    opted_out = interested_ids & notify_opt_out
+    connected = interested_ids & connected_ids
+    excluded = opted_out | connected
+    to_ping = [u for uid, u in by_id.items() if uid not in excluded]
+
+    return SimpleNamespace(
+        interested=interested_ids,
+        opted_out=opted_out,
+        connected=connected,
+        connected_total=len(connected_ids),
+        to_ping=to_ping,
+        mention_batches=_mention_batches([getattr(u, 'mention', f"<@{u.id}>") for u in to_ping]),
+    )
+
+
 def _chunks_from_lines(msg: str, max_len: int = 1800):
     """Split `msg` into chunks no longer than `max_len`, but only at line boundaries.
 
@@ -366,13 +1980,232 @@ def _chunks_from_lines(msg: str, max_len: int = 1800):
         chunks.append(''.join(cur))
     return chunks
 
+
+class Paginator(discord.ui.View):
+    """One message with ◀/▶ buttons whose pages are rendered lazily from a row iterator.
+
+    `rows` may be a sync or async iterable of lines; rows are only pulled when a page
+    needs them (plus one page of look-ahead to know whether ▶ is possible), so a long
+    listing costs one message and one edit per page actually viewed.
+    Only the command author can turn pages.
+    """
+
+    def __init__(self, header: str, rows, author_id: int = None, page_size: int = 20,
+                 max_len: int = 1800, timeout: float = 300):
+        super().__init__(timeout=timeout)
+        self.header = header
+        self.author_id = author_id
+        self.page_size = page_size
+        self.max_len = max_len
+        self._rows = rows.__aiter__() if hasattr(rows, '__aiter__') else iter(rows)
+        self._pending = None  # row pulled but not fitting in the previous page
+        self._exhausted = False
+        self.pages = []
+        self.index = 0
+        self.message = None
+        # rapid clicks must not pull the row iterator concurrently (async generators refuse it)
+        self._lock = asyncio.Lock()
+
+    async def _next_row(self):
+        if self._pending is not None:
+            row, self._pending = self._pending, None
+            return row
+        try:
+            if hasattr(self._rows, '__anext__'):
+                return await self._rows.__anext__()
+            return next(self._rows)
+        except (StopIteration, StopAsyncIteration):
+            self._exhausted = True
+            return None
+
+    async def _ensure_page(self, index: int) -> bool:
+        """Render pages up to `index`; False if the rows run out before."""
+        while len(self.pages) <= index and not self._exhausted:
+            lines, size = [], len(self.header)
+            while len(lines) < self.page_size:
+                row = await self._next_row()
+                if row is None:
+                    break
+                if lines and size + len(row) + 1 > self.max_len:
+                    self._pending = row
+                    break
+                lines.append(row[:self.max_len])
+                size += len(row) + 1
+            if lines:
+                self.pages.append("\n".join(lines))
+        return len(self.pages) > index
+
+    def _render(self) -> str:
+        total = str(len(self.pages)) if self._exhausted else "?"
+        body = self.pages[self.index] if self.pages else ""
+        return f"{self.header}\n{body}\n-# Page {self.index + 1}/{total}"
+
+    async def _refresh_buttons(self):
+        has_next = await self._ensure_page(self.index + 1)
+        self.previous_page.disabled = self.index == 0
+        self.next_page.disabled = not has_next
+
+    async def start(self, ctx):
+        await self._ensure_page(0)
+        await self._refresh_buttons()
+        single = self._exhausted and len(self.pages) <= 1
+        self.message = await ctx.send(self._render(), view=None if single else self)
+        if single:
+            self.stop()
+        return self.message
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if self.author_id is not None and interaction.user.id != self.author_id:
+            await interaction.response.send_message("⚠️ Seul l'auteur de la commande peut changer de page.", ephemeral=True)
+            return False
+        return True
+
+    async def _show(self, interaction: discord.Interaction, step: int):
+        # acknowledge within Discord's 3 s window, rendering the page may take longer
+        await interaction.response.defer()
+        async with self._lock:
+            # the target page is computed under the lock so queued clicks each move one page
+            index = max(0, self.index + step)
+            if step > 0 and not await self._ensure_page(index):
+                return
+            self.index = index
+            await self._refresh_buttons()
+            await self.message.edit(content=self._render(), view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, -1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, 1)
+
+    async def on_timeout(self):
+        if self.message is None:
+            return
+        for item in self.children:
+            item.disabled = True
+        try:
+            await self.message.edit(view=self)
+        except discord.HTTPException:
+            pass
+
+
+def _snowflake_time(sid):
+    try:
+        sid = int(sid)
+        ts = ((sid >> 22) + 1420070400000) / 1000
+        return datetime.fromtimestamp(ts, timezone.utc)
+    except Exception:
+        return None
+
+
+def _thread_from_rest(tdata: dict, channel):
+    """Convert a REST thread dict into a SimpleNamespace with the attributes used elsewhere."""
+    tid = int(tdata.get('id'))
+    # Normalize archived/locked which can be bool or strings in some responses
+    def _to_bool(val):
+        if isinstance(val, bool):
+            return val
+        if val is None:
+            return False
+        s = str(val).lower()
+        return s in ('1', 'true', 'yes')
+
+    # Prefer thread_metadata if present (REST thread objects nest archived/locked there)
+    meta = tdata.get('thread_metadata') or tdata.get('metadata') or {}
+    archived_val = meta.get('archived', tdata.get('archived', False))
+    locked_val = meta.get('locked', tdata.get('locked', False))
+    archived = _to_bool(archived_val)
+    locked = _to_bool(locked_val)
+
+    # message_count may be absent
+    msg_count = tdata.get('message_count') if 'message_count' in tdata else '?'
+
+    return SimpleNamespace(
+        id=tid,
+        name=tdata.get('name') or f"<{tid}>",
+        archived=archived,
+        locked=locked,
+        created_at=_snowflake_time(tdata.get('id')),
+        message_count=msg_count,
+        parent=channel
+    )
+
+
+async def _iter_thread_pages(channel_id: int, scope: str):
+    """Async generator yielding pages (lists of REST thread dicts) for one thread listing.
+
+    `scope` is 'active', 'public' or 'private'. Archived listings are paginated with `before`.
+    """
+    if scope == 'active':
+        r = await discord_rest.request("GET", "/channels/{channel_id}/threads/active", major=channel_id, channel_id=channel_id)
+        if r.status_code == 200 and isinstance(r.json(), dict):
+            yield r.json().get('threads', [])
+        return
+
+    route = f"/channels/{{channel_id}}/threads/archived/{scope}"
+    params = {'limit': 100}
+    while True:
+        r = await discord_rest.request("GET", route, major=channel_id, params=dict(params), channel_id=channel_id)
+        if r.status_code != 200 or not isinstance(r.json(), dict):
+            return
+        j = r.json()
+        page = j.get('threads', [])
+        yield page
+        if not j.get('has_more') or not page:
+            return
+        # archived listings paginate on the archive timestamp (ISO8601); fall back to the last id
+        last = page[-1]
+        before = (last.get('thread_metadata') or {}).get('archive_timestamp') or last.get('id')
+        if not before:
+            return
+        params['before'] = before
+
+
+async def iter_all_threads(channel):
+    """Stream the threads of `channel` from the REST API as pages arrive.
+
+    Active, archived public and archived private listings are paginated concurrently,
+    so the total time is bounded by the slowest chain instead of the sum of them.
+    Threads may be yielded more than once (e.g. active and archived); callers dedupe.
+    """
+    pages = asyncio.Queue()
+    done = object()
+
+    async def _producer(scope):
+        try:
+            async for page in _iter_thread_pages(channel.id, scope):
+                await pages.put(page)
+        except Exception as e:
+            logger.warning(f"fetch_all_threads: scan '{scope}' interrompu pour {channel.id}: {e}")
+        finally:
+            await pages.put(done)
+
+    producers = [asyncio.create_task(_producer(scope)) for scope in ('active', 'public', 'private')]
+    remaining = len(producers)
+    try:
+        while remaining:
+            page = await pages.get()
+            if page is done:
+                remaining -= 1
+                continue
+            for td in page:
+                yield _thread_from_rest(td, channel)
+    finally:
+        for task in producers:
+            if not task.done():
+                task.cancel()
+
+
 async def fetch_all_threads(channel: discord.ForumChannel):
     """Récupère tous les threads d'un ForumChannel.
 
     Essaie d'utiliser l'API client (channel.fetch_threads) si disponible.
-    Sinon, utilise l'API REST via requests et le token BOT (global TOKEN) pour récupérer
-    active + archived (public/private) threads. Retourne une liste d'objets avec
-    attributs utilisés ailleurs (id, name, archived, locked, created_at, message_count, parent).
+    Sinon, utilise l'API REST (client async `discord_rest`) et le token BOT pour récupérer
+    active + archived (public/private) threads, les listes archivées étant parcourues en
+    parallèle. Retourne une liste d'objets avec attributs utilisés ailleurs
+    (id, name, archived, locked, created_at, message_count, parent).
     """
     threads = []
 
@@ -394,98 +2227,9 @@ async def fetch_all_threads(channel: discord.ForumChannel):
     if not TOKEN:
         return threads
 
-    def _snowflake_time(sid: int):
-        try:
-            sid = int(sid)
-            ts = ((sid >> 22) + 1420070400000) / 1000
-            return datetime.fromtimestamp(ts, timezone.utc)
-        except Exception:
-            return None
-
-    headers = {
-        "Authorization": f"Bot {TOKEN}",
-        "Accept": "application/json",
-        "User-Agent": "EpiTrelloBot (fetch_threads fallback)"
-    }
-
-    base = "https://discord.com/api/v10"
-
-    # Helper to convert REST thread dict -> SimpleNamespace-like object
-    def _mk_thread_obj(tdata):
-        tid = int(tdata.get('id'))
-        # Normalize archived/locked which can be bool or strings in some responses
-        def _to_bool(val):
-            if isinstance(val, bool):
-                return val
-            if val is None:
-                return False
-            s = str(val).lower()
-            return s in ('1', 'true', 'yes')
-
-        # Prefer thread_metadata if present (REST thread objects nest archived/locked there)
-        meta = tdata.get('thread_metadata') or tdata.get('metadata') or {}
-        archived_val = meta.get('archived', tdata.get('archived', False))
-        locked_val = meta.get('locked', tdata.get('locked', False))
-        archived = _to_bool(archived_val)
-        locked = _to_bool(locked_val)
-
-        # message_count may be absent
-        msg_count = tdata.get('message_count') if 'message_count' in tdata else '?'
-
-        return SimpleNamespace(
-            id=tid,
-            name=tdata.get('name') or f"<{tid}>",
-            archived=archived,
-            locked=locked,
-            created_at=_snowflake_time(tdata.get('id')),
-            message_count=msg_count,
-            parent=channel
-        )
-
     try:
-        # Active threads
-        url_active = f"{base}/channels/{channel.id}/threads/active"
-        r = requests.get(url_active, headers=headers, timeout=10)
-        if r.status_code == 200:
-            j = r.json()
-            for td in j.get('threads', []):
-                threads.append(_mk_thread_obj(td))
-
-        # Archived public threads (paginated)
-        url_archived_public = f"{base}/channels/{channel.id}/threads/archived/public"
-        params = {'limit': 100}
-        while True:
-            r = requests.get(url_archived_public, headers=headers, params=params, timeout=10)
-            if r.status_code != 200:
-                break
-            j = r.json()
-            for td in j.get('threads', []):
-                threads.append(_mk_thread_obj(td))
-            if not j.get('has_more'):
-                break
-            # use 'before' param with last thread id to paginate
-            last = j.get('threads', [])[-1].get('id') if j.get('threads') else None
-            if not last:
-                break
-            params['before'] = last
-
-        # Archived private threads (if bot has access)
-        url_archived_private = f"{base}/channels/{channel.id}/threads/archived/private"
-        params = {'limit': 100}
-        while True:
-            r = requests.get(url_archived_private, headers=headers, params=params, timeout=10)
-            if r.status_code != 200:
-                break
-            j = r.json()
-            for td in j.get('threads', []):
-                threads.append(_mk_thread_obj(td))
-            if not j.get('has_more'):
-                break
-            last = j.get('threads', [])[-1].get('id') if j.get('threads') else None
-            if not last:
-                break
-            params['before'] = last
-
+        async for t in iter_all_threads(channel):
+            threads.append(t)
     except Exception:
         return threads
 
@@ -514,1165 +2258,1116 @@ async def fetch_all_threads(channel: discord.ForumChannel):
     return list(unique.values())
 
 
-async def get_lock_date(thread_id: int, guild: discord.Guild):
-    # Vérifier cache
-    if thread_id in closing_cache:
-        return closing_cache[thread_id]
-
-    lock_date = None
-    try:
-        async for entry in guild.audit_logs(
-            limit=100,  # tu peux augmenter
-            action=discord.AuditLogAction.thread_update
-        ):
-            if entry.target.id != thread_id:
-                continue
-
-            before_locked = getattr(entry.before, "locked", None)
-            after_locked = getattr(entry.after, "locked", None)
-            if before_locked is False and after_locked is True:
-                lock_date = entry.created_at
-                break
-    except discord.Forbidden:
-        print(f"[DEBUG-LOCK] Pas de permission pour lire audit_logs")
-    except Exception as e:
-        print(f"[DEBUG-LOCK] Erreur inattendue: {e}")
+# ============ 🗂️ INDEX DES POSTS DE FORUM ============
 
-    closing_cache[thread_id] = lock_date
-    return lock_date
+def _iso(dt):
+    return dt.isoformat() if dt else None
 
 
-# ---- Background task: purge closed threads older than 1 week ----
-@tasks.loop(minutes=60)
-async def purge_closed_threads():
-    """Delete threads listed in `closed_threads` if they were closed more than 1 week ago.
+def index_thread(thread, guild_id: int = None, locked_at: datetime = None, archived: bool = None):
+    """Add or refresh `thread` in the forum thread index (only threads of ForumChannels).
 
-    Runs periodically and removes successful/irrecoverable entries from `closed_threads.json`.
+    `locked_at` is only given when the gateway reports the unlocked→locked transition: a
+    thread that is merely found locked during a scan keeps `closed_at` unknown (None) so
+    listings fall back to the audit log for its real lock date. `archived` overrides the
+    thread's flag when the object is known to be stale (archived through REST).
     """
-    now = datetime.now(timezone.utc)
-    to_delete = []
-
-    # Collect candidate thread IDs
-    for tid_str, iso in list(closed_threads.items()):
-        try:
-            tid = int(tid_str)
-        except Exception:
-            continue
-
-        dt = None
-        # Prefer cached parsed datetime
-        if tid in closing_cache and closing_cache[tid] is not None:
-            dt = closing_cache[tid]
-        else:
-            if isinstance(iso, str):
-                try:
-                    dt = datetime.fromisoformat(iso)
-                    if dt.tzinfo is None:
-                        dt = dt.replace(tzinfo=timezone.utc)
-                except Exception:
-                    dt = None
-
-        if not dt:
-            # can't determine close date; skip for now
+    parent = getattr(thread, 'parent', None)
+    if parent is not None and not isinstance(parent, discord.ForumChannel):
+        return
+    tid = int(thread.id)
+    previous = thread_index.get(tid, {})
+    locked = bool(getattr(thread, 'locked', False))
+
+    closed_at = previous.get('closed_at')
+    if str(tid) in closed_threads:
+        closed_at = closed_threads[str(tid)]
+    elif locked_at is not None and not closed_at:
+        closed_at = _iso(locked_at)
+
+    if guild_id is None:
+        guild = getattr(thread, 'guild', None) or getattr(parent, 'guild', None)
+        guild_id = getattr(guild, 'id', None) or previous.get('guild_id')
+
+    thread_index_store.set(tid, {
+        'guild_id': guild_id,
+        'parent_id': getattr(parent, 'id', None) or getattr(thread, 'parent_id', None) or previous.get('parent_id'),
+        'name': getattr(thread, 'name', None) or previous.get('name') or f"<{tid}>",
+        'archived': bool(getattr(thread, 'archived', False)) if archived is None else archived,
+        'locked': locked,
+        'created_at': _iso(getattr(thread, 'created_at', None)) or previous.get('created_at'),
+        'closed_at': closed_at,
+    })
+
+
+def unindex_thread(thread_id: int):
+    thread_index_store.delete(int(thread_id))
+
+
+def indexed_threads(guild_id: int) -> list:
+    """Return the indexed threads of a guild as objects (id, name, archived, locked, created_at, closed_at, parent_id)."""
+    result = []
+    for tid, entry in thread_index.items():
+        if entry.get('guild_id') != guild_id:
             continue
+        result.append(SimpleNamespace(
+            id=tid,
+            name=entry.get('name') or f"<{tid}>",
+            archived=entry.get('archived', False),
+            locked=entry.get('locked', False),
+            created_at=_parse_iso(entry.get('created_at')),
+            closed_at=_parse_iso(entry.get('closed_at')),
+            parent_id=entry.get('parent_id'),
+        ))
+    return result
+
+
+indexed_guilds = set()  # guilds whose index is complete (full scan or validated warm start)
+
+
+async def build_thread_index(guild: discord.Guild):
+    """(Re)scan every ForumChannel of `guild` and rebuild its part of the index. Returns the thread count."""
+    forums = [c for c in guild.channels if isinstance(c, discord.ForumChannel)]
+    results = await asyncio.gather(*(fetch_all_threads(c) for c in forums), return_exceptions=True)
+
+    seen = set()
+    for channel, fetched in zip(forums, results):
+        if isinstance(fetched, Exception):
+            logger.warning(f"Index: erreur forum {getattr(channel, 'name', channel.id)}: {fetched}")
+            fetched = []
+        # cached active threads are the most up to date representation
+        for t in list(fetched) + list(getattr(channel, 'threads', [])):
+            if not getattr(t, 'parent', None):
+                t.parent = channel
+            index_thread(t, guild_id=guild.id)
+            seen.add(int(t.id))
+
+    # drop threads of this guild that no longer exist (only if every forum was scanned)
+    if not any(isinstance(r, Exception) for r in results):
+        for tid in [tid for tid, e in thread_index.items() if e.get('guild_id') == guild.id and tid not in seen]:
+            thread_index_store.delete(tid)
+        indexed_guilds.add(guild.id)
+
+    save_thread_index()
+    return len(seen)
+
+
+async def find_thread(guild: discord.Guild, thread_id: int):
+    """Return the Thread `thread_id` of `guild` (archived ones included), or None.
+
+    Lookup order: gateway cache (`guild.get_thread`), thread index, then a single
+    `fetch_channel`. The cost does not depend on the number of forums/threads.
+    """
+    thread = guild.get_thread(thread_id)
+    if thread is not None:
+        return thread
 
-        if now >= dt + timedelta(weeks=1):
-            to_delete.append((tid, dt))
-
-    # Attempt deletion
-    for tid, dt in to_delete:
-        ch = bot.get_channel(tid)
-        if ch is None:
-            # try fetch via bot (may fail if not available)
-            try:
-                ch = await bot.fetch_channel(tid)
-            except Exception:
-                ch = None
-
-        # fallback: try per-guild fetch
-        if ch is None:
-            for g in bot.guilds:
-                try:
-                    ch = await g.fetch_channel(tid)
-                    if ch:
-                        break
-                except Exception:
-                    ch = None
+    entry = thread_index.get(thread_id)
+    if entry is not None and entry.get('guild_id') not in (None, guild.id):
+        # known thread, but it belongs to another guild
+        return None
 
-        if ch is None:
-            # channel not found anymore: remove from closed_threads
-            closed_threads.pop(str(tid), None)
-            closing_cache.pop(tid, None)
-            try:
-                save_closed_threads()
-            except Exception:
-                logger.warning(f"Auto-purge: couldn't save closed_threads after removing {tid}")
-            logger.info(f"Auto-purge: thread {tid} not found; removed from closed_threads.json")
-            continue
+    try:
+        ch = await guild.fetch_channel(thread_id)
+    except (discord.NotFound, discord.Forbidden):
+        if entry is not None:
+            unindex_thread(thread_id)
+        return None
+    except discord.HTTPException as e:
+        logger.warning(f"find_thread: fetch_channel({thread_id}) a échoué: {e}")
+        return None
+    except discord.InvalidData:
+        # id of a channel of another guild, or of a DM/group channel
+        return None
+
+    if not isinstance(ch, discord.Thread):
+        return None
+    index_thread(ch, guild_id=guild.id)
+    return ch
+
+
+_lock_index_locks = {}  # guild_id -> asyncio.Lock (one refresh at a time per guild)
+_lock_index_refreshed = {}  # guild_id -> monotonic time of the last refresh attempt
+LOCK_INDEX_MIN_INTERVAL = 60  # seconds between two on-demand refreshes of the same guild
+
+
+async def refresh_lock_index(guild: discord.Guild, force: bool = False):
+    """Read the `thread_update` audit log once and record thread lock dates.
+
+    The first call pages through the whole log; later calls only read entries newer
+    than the persisted high-water mark. Entries are applied oldest first so an unlock
+    after a lock clears the date.
+    """
+    lock = _lock_index_locks.setdefault(guild.id, asyncio.Lock())
+    async with lock:
+        last = _lock_index_refreshed.get(guild.id)
+        if not force and last is not None and time.monotonic() - last < LOCK_INDEX_MIN_INTERVAL:
+            return
+        # recorded before reading: a failing read (no permission, API error) is throttled too
+        _lock_index_refreshed[guild.id] = time.monotonic()
 
+        state = lock_index.setdefault(guild.id, {'high_water': None, 'locks': {}})
+        high_water = state.get('high_water')
+        changes = []
+        newest = high_water
         try:
-            await ch.delete(reason="Auto-deleted: closed > 1 week")
+            kwargs = {'limit': None, 'action': discord.AuditLogAction.thread_update}
+            if high_water:
+                kwargs['after'] = discord.Object(id=int(high_water))
+            async for entry in guild.audit_logs(**kwargs):
+                if newest is None or entry.id > int(newest):
+                    newest = entry.id
+                before_locked = getattr(entry.before, "locked", None)
+                after_locked = getattr(entry.after, "locked", None)
+                if before_locked is not None and after_locked is not None and before_locked != after_locked:
+                    changes.append((entry.id, entry.target.id, after_locked, entry.created_at))
+        except discord.Forbidden:
+            print(f"[DEBUG-LOCK] Pas de permission pour lire audit_logs")
+            return
         except Exception as e:
-            logger.warning(f"Auto-purge: failed to delete thread {tid}: {e}")
-            # don't remove the entry so we can retry later
-            continue
-
-        # deletion succeeded: remove record and persist
-        closed_threads.pop(str(tid), None)
-        closing_cache.pop(tid, None)
-        try:
-            save_closed_threads()
-        except Exception:
-            logger.warning(f"Auto-purge: couldn't save closed_threads after deleting {tid}")
-
-        logger.info(f"Auto-purge: deleted thread {tid} (closed at {dt.isoformat()})")
-
-        # Optional: notify guild.system_channel if available and sendable
-        try:
-            guild = getattr(ch, 'guild', None)
-            if guild and getattr(guild, 'system_channel', None):
-                sc = guild.system_channel
-                perms = sc.permissions_for(guild.me)
-                if perms and perms.send_messages:
-                    await sc.send(f"🗑️ Le post '{getattr(ch,'name', str(tid))}' a été supprimé automatiquement (fermé depuis plus d'une semaine).")
-        except Exception:
-            pass
-
-
-# ============ 🚀 ÉVÉNEMENTS ============
-
-@bot.event
-async def on_ready():
-    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    print(f"[RELOAD] {now} — ✅ Connecté en tant que {bot.user}")
-    # Start periodic background tasks
-    try:
-        if not purge_closed_threads.is_running():
-            purge_closed_threads.start()
-    except Exception:
-        pass
-    # check_meetings.start()
-    # await check_old_closed_threads()
+            print(f"[DEBUG-LOCK] Erreur inattendue: {e}")
+            return
 
+        for _, tid, locked, created_at in sorted(changes):
+            if locked:
+                state['locks'][tid] = created_at.isoformat()
+            else:
+                state['locks'].pop(tid, None)
+            # invalidate cached lookups for this thread
+            closing_cache.pop(tid, None)
 
-@bot.event
-async def on_thread_create(thread: discord.Thread):
-    """Lorsqu’un nouveau post est créé, vérifie s’il contient un numéro de PR"""
-    title = thread.name
-    print(f"Nouveau post détecté : {title}")
-
-    match = re.search(r"#(\d+)", title)
-    if not match:
-        print("Aucun numéro trouvé dans le titre.")
-        return
+        state['high_water'] = newest
+        if changes or newest != high_water:
+            save_lock_index()
 
-    pr_number = match.group(1)
-    pr_url = f"https://api.github.com/repos/{GITHUB_REPO}/pulls/{pr_number}"
 
-    headers = {
-        "Accept": "application/vnd.github+json",
-    }
-    if GITHUB_TOKEN:
-        headers["Authorization"] = f"Bearer {GITHUB_TOKEN}"
+async def get_lock_date(thread_id: int, guild: discord.Guild):
+    # Vérifier cache
+    found, cached = closing_cache.lookup(thread_id)
+    if found:
+        return cached
 
-    try:
-        response = requests.get(pr_url, headers=headers, timeout=10)
-    except requests.RequestException as exc:
-        print(f"GitHub API request failed for PR {pr_number}: {exc}")
-        await thread.send("⚠️ Erreur lors de la requête vers GitHub pour vérifier la PR. Réessaie plus tard.")
-        return
+    # Lookup in the audit-log lock index (refreshed incrementally, at most once a minute)
+    await refresh_lock_index(guild)
+    iso = lock_index.get(guild.id, {}).get('locks', {}).get(thread_id)
+    lock_date = _parse_iso(iso)
 
-    print(f"GitHub API status: {response.status_code}")
+    closing_cache[thread_id] = lock_date
+    return lock_date
 
-    if response.status_code == 200:
-        await thread.send(f"🔗 **PR #{pr_number} trouvée !**\n👉 https://github.com/{GITHUB_REPO}/pull/{pr_number}")
-    elif response.status_code == 403:
-        await thread.send("⚠️ Rate limit ou token invalide (403). Vérifie ton token GitHub.")
-    elif response.status_code == 404:
-        await thread.send(f"❌ La PR #{pr_number} n’existe pas ou est privée.")
-    else:
-        await thread.send(f"⚠️ Erreur inattendue ({response.status_code}) depuis GitHub.")
 
-# ============ 💬 COMMANDES ============
+# ---- Background task: purge closed threads older than 1 week ----
+PURGE_DELAY = timedelta(weeks=1)
+PURGE_RETRY_DELAY = timedelta(hours=1)
+PURGE_WORKERS = int(os.getenv("PURGE_WORKERS", "4"))
 
-@bot.command()
-async def repo(ctx):
-    """Affiche le lien du repo principal"""
-    await ctx.send(f"📦 Repo GitHub : https://github.com/{GITHUB_REPO}")
 
+class PurgeScheduler:
+    """Min-heap of thread deletion deadlines (closed_at + 1 week).
 
-@bot.command()
-async def pr(ctx, number: int):
-    """Affiche une Pull Request"""
-    url = f"https://api.github.com/repos/{GITHUB_REPO}/pulls/{number}"
-    try:
-        r = requests.get(url, headers=github_headers(), timeout=10)
-    except requests.RequestException as exc:
-        print(f"GitHub PR request failed: {exc}")
-        await ctx.send("⚠️ Erreur lors de la requête vers GitHub. Réessaie plus tard.")
-        return
+    `schedule` is O(log n); the purge task sleeps exactly until the earliest
+    deadline and is woken up early when an earlier one is inserted. Superseded
+    heap entries are skipped lazily when popped.
+    """
 
-    if r.status_code == 200:
-        data = r.json()
-        embed = discord.Embed(
-            title=f"PR #{number} — {data['title']}",
-            description=data.get("body", "Pas de description"),
-            color=0x2ecc71,
-            url=data["html_url"]
-        )
-        embed.add_field(name="Auteur", value=data["user"]["login"])
-        embed.add_field(name="État", value=data["state"].capitalize())
-        await ctx.send(embed=embed)
-    else:
-        await ctx.send(f"❌ PR #{number} introuvable.")
+    def __init__(self):
+        self._heap = []  # (due_ts, thread_id, guild_id)
+        self._due = {}  # thread_id -> due_ts (current deadline)
+        self._wakeup = None
+
+    def _event(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        return self._wakeup
+
+    def rebuild(self, entries):
+        """Rebuild from [(thread_id, guild_id, closed_at)] in O(n)."""
+        self._due = {}
+        self._heap = []
+        for tid, guild_id, closed_at in entries:
+            due = (closed_at + PURGE_DELAY).timestamp()
+            self._due[tid] = due
+            self._heap.append((due, tid, guild_id))
+        heapq.heapify(self._heap)
+        self._event().set()
+
+    def schedule(self, thread_id: int, due: datetime, guild_id: int = None):
+        due_ts = due.timestamp()
+        self._due[thread_id] = due_ts
+        heapq.heappush(self._heap, (due_ts, thread_id, guild_id))
+        if self._heap[0][1] == thread_id:
+            # new earliest deadline: wake the purge task up
+            self._event().set()
+
+    def cancel(self, thread_id: int):
+        self._due.pop(thread_id, None)
+
+    def _drop_stale(self):
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def next_due(self):
+        self._drop_stale()
+        return datetime.fromtimestamp(self._heap[0][0], timezone.utc) if self._heap else None
+
+    async def wait_next(self):
+        """Sleep until the earliest deadline is reached."""
+        while True:
+            event = self._event()
+            event.clear()
+            self._drop_stale()
+            delay = self._heap[0][0] - time.time() if self._heap else None
+            if delay is not None and delay <= 0:
+                return
+            try:
+                await asyncio.wait_for(event.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
 
+    def pop_due(self) -> list:
+        """Pop every entry whose deadline has passed: [(thread_id, guild_id)]."""
+        now = time.time()
+        due = []
+        while True:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return due
+            _, tid, guild_id = heapq.heappop(self._heap)
+            self._due.pop(tid, None)
+            due.append((tid, guild_id))
+
+    def entries(self) -> list:
+        """Current [(thread_id, guild_id, closed_at)], the input of `rebuild` (for the warm-start snapshot)."""
+        return [
+            (tid, guild_id, datetime.fromtimestamp(due, timezone.utc) - PURGE_DELAY)
+            for due, tid, guild_id in self._heap
+            if self._due.get(tid) == due
+        ]
+
+    def __len__(self):
+        return len(self._due)
+
+
+# One deadline heap (and one purge loop) per shard, so purge work is spread across shards
+purge_schedulers = {}  # shard_id -> PurgeScheduler
+purge_schedulers_built = False
+
+
+def purge_scheduler_for(guild_id) -> PurgeScheduler:
+    return purge_schedulers.setdefault(guild_shard_id(guild_id), PurgeScheduler())
+
+
+def rebuild_purge_schedulers():
+    """Partition every closed thread by shard and rebuild the heaps of the shards run here."""
+    global purge_schedulers_built
+    purge_schedulers_built = True
+    owned = owned_shard_ids()
+    by_shard = {shard_id: [] for shard_id in owned}
+    for tid, guild_id, closed_at in closed_threads_due(datetime.now(timezone.utc) + timedelta(days=36500)):
+        guild_id = guild_id or (thread_index.get(tid) or {}).get('guild_id')
+        shard_id = guild_shard_id(guild_id)
+        if shard_id in by_shard:
+            by_shard[shard_id].append((tid, guild_id, closed_at))
+    for shard_id, entries in by_shard.items():
+        purge_schedulers.setdefault(shard_id, PurgeScheduler()).rebuild(entries)
+
+
+def purge_queue_stats():
+    """(pending deletions, next deadline) across all shards."""
+    pending = sum(len(p) for p in purge_schedulers.values())
+    next_dues = [d for d in (p.next_due() for p in purge_schedulers.values()) if d is not None]
+    return pending, (min(next_dues) if next_dues else None)
+
+
+async def _purge_thread(tid: int, guild_id, dt: datetime):
+    """Delete one due thread. Returns (status, guild_id, name) with status 'deleted', 'missing' or 'failed'.
+
+    The guild comes from the stored metadata (closed_threads / thread index), so a thread
+    costs at most one REST call: `Thread.delete` when it is cached, otherwise a raw
+    `DELETE /channels/{id}` through `discord_rest` (rate-limit buckets honoured).
+    """
+    entry = thread_index.get(tid) or {}
+    guild_id = guild_id or entry.get('guild_id')
+    name = entry.get('name') or str(tid)
+    guild = bot.get_guild(guild_id) if guild_id else None
 
-@bot.command()
-async def issue(ctx, number: int):
-    """Affiche une issue GitHub"""
-    url = f"https://api.github.com/repos/{GITHUB_REPO}/issues/{number}"
+    ch = guild.get_thread(tid) if guild is not None else bot.get_channel(tid)
     try:
-        r = requests.get(url, headers=github_headers(), timeout=10)
-    except requests.RequestException as exc:
-        print(f"GitHub issue request failed: {exc}")
-        await ctx.send("⚠️ Erreur lors de la requête vers GitHub. Réessaie plus tard.")
-        return
-
-    if r.status_code == 200:
-        data = r.json()
-        embed = discord.Embed(
-            title=f"Issue #{number} — {data['title']}",
-            description=data.get("body", "Pas de description"),
-            color=0xe67e22,
-            url=data["html_url"]
-        )
-        embed.add_field(name="Auteur", value=data["user"]["login"])
-        embed.add_field(name="État", value=data["state"].capitalize())
-        await ctx.send(embed=embed)
+        if ch is not None:
+            name = getattr(ch, 'name', name)
+            guild_id = getattr(getattr(ch, 'guild', None), 'id', guild_id)
+            await ch.delete(reason="Auto-deleted: closed > 1 week")
+            status = 'deleted'
+        elif TOKEN:
+            r = await discord_rest.request("DELETE", "/channels/{channel_id}", major=tid, channel_id=tid)
+            if r.status_code in (200, 204):
+                status = 'deleted'
+                if not guild_id and isinstance(r.json(), dict):
+                    guild_id = _int_or_self(r.json().get('guild_id'))
+            elif r.status_code == 404:
+                status = 'missing'
+            else:
+                logger.warning(f"Auto-purge: failed to delete thread {tid}: HTTP {r.status_code} {r.json()}")
+                return 'failed', guild_id, name
+        else:
+            status = 'missing'
+    except discord.NotFound:
+        status = 'missing'
+    except Exception as e:
+        logger.warning(f"Auto-purge: failed to delete thread {tid}: {e}")
+        return 'failed', guild_id, name
+
+    # deleted or gone: remove record (journaled, O(1) per entry)
+    closed_threads_store.delete(str(tid))
+    closing_cache.pop(tid, None)
+    if status == 'missing':
+        logger.info(f"Auto-purge: thread {tid} not found; removed from closed_threads.json")
     else:
-        await ctx.send(f"❌ Issue #{number} introuvable.")
+        logger.info(f"Auto-purge: deleted thread {tid} (closed at {dt.isoformat()})")
+    return status, guild_id, name
 
 
-@bot.command()
-async def kanban(ctx):
-    """Renvoie le lien du tableau GitHub Projects"""
-    if not GITHUB_PROJECT:
-        await ctx.send("⚠️ Aucun lien Kanban configuré.")
+async def _send_purge_summary(guild_id: int, names: list):
+    """Notify guild.system_channel once with every post deleted in this pass."""
+    guild = bot.get_guild(guild_id) if guild_id else None
+    sc = getattr(guild, 'system_channel', None)
+    if sc is None:
         return
-
-    # Accept either a full URL or a path like 'users/antoinefld/projects/3' or 'owner/repo/projects/3'
-    if isinstance(GITHUB_PROJECT, str) and GITHUB_PROJECT.startswith("http"):
-        url = GITHUB_PROJECT
-    else:
-        url = f"https://github.com/{GITHUB_PROJECT}"
-
     try:
-        await ctx.send(f"🗂️ Kanban : {url}")
-    except discord.HTTPException as exc:
-        print(f"Failed to send kanban link: {exc}")
-        try:
-            await ctx.author.send(f"Je n'ai pas pu envoyer le lien du Kanban dans le canal. Voici le lien : {url}")
-        except Exception:
-            print("Also failed to DM the user the kanban link.")
-
-
-@bot.command()
-async def ping(ctx):
-    """Teste la latence"""
-    latency = round(bot.latency * 1000)
-    await ctx.send(f"🏓 Pong ! Latence : {latency} ms")
+        perms = sc.permissions_for(guild.me)
+        if not (perms and perms.send_messages):
+            return
+        lines = [f"🗑️ {len(names)} post(s) supprimé(s) automatiquement (fermés depuis plus d'une semaine) :"]
+        lines.extend(f"• {n}" for n in names)
+        for chunk in _chunks_from_lines("\n".join(lines)):
+            await sc.send(chunk)
+    except Exception:
+        pass
 
 
-@bot.command(name="help")
-async def help_command(ctx, *, topic: str = None):
-    """Affiche la liste des commandes, ou l'aide pour une commande/catégorie
+async def purge_closed_threads(scheduler: PurgeScheduler):
+    """Delete threads listed in `closed_threads` once they have been closed for 1 week.
 
-    Usage:
-      !help                -> liste des catégories et commandes
-      !help <command>      -> détail sur une commande
-      !help <category>     -> liste des commandes dans une catégorie
+    Runs as one `tasks.loop` per shard (see `start_purge_loop`). Each iteration sleeps
+    until the next deadline of the shard's `scheduler`, then deletes
+    every due thread with a pool of PURGE_WORKERS concurrent workers, removes
+    successful/irrecoverable entries from `closed_threads.json` and sends one summary
+    message per guild.
     """
-    # Normaliser l'argument
-    if topic:
-        topic = topic.strip()
-
-    # Rassembler les commandes par catégorie (cog name). None -> 'No Category'
-    categories = {}
-    for cmd in bot.commands:
-        cog = cmd.cog_name or "No Category"
-        categories.setdefault(cog, []).append(cmd)
-
-    # Si pas d'argument, afficher un résumé similaire à l'exemple
-    if not topic:
-        lines = []
-        lines.append("EpiTrelloBot")
-        lines.append("APP")
-        lines.append("")
-        for cat, cmds in categories.items():
-            lines.append(f"{cat}:")
-            for c in cmds:
-                # short one-line description
-                desc = (c.help or "Aucune description").splitlines()[0]
-                lines.append(f"  {c.name} {desc}")
-            lines.append("")
-
-        lines.append("Type !help command for more info on a command.")
-        lines.append("You can also type !help category for more info on a category.")
-
-        # Envoyer en bloc de code pour préserver la mise en forme
-        await ctx.send("\n".join(lines))
-        return
-
-    # Chercher une commande exacte
-    cmd = bot.get_command(topic)
-    if cmd:
-        desc = cmd.help or "Aucune description"
-        signature = f"!{cmd.name} {cmd.signature}".strip()
-        reply = [f"Command: {cmd.name}", f"Usage: {signature}", f"{desc}"]
-        await ctx.send("\n".join(reply))
-        return
-
-    # Chercher une catégorie (case-insensitive)
-    match_cat = None
-    for cat in categories.keys():
-        if cat.lower() == topic.lower():
-            match_cat = cat
-            break
-
-    if match_cat:
-        lines = [f"{match_cat}:"]
-        for c in categories[match_cat]:
-            desc = (c.help or "Aucune description").splitlines()[0]
-            lines.append(f"  {c.name} {desc}")
-        await ctx.send("\n".join(lines))
-        return
-
-    await ctx.send("⚠️ Commande ou catégorie introuvable. Tapez !help pour la liste des commandes.")
-
-
-@bot.command(name="next")
-async def next_events(ctx):
-    """Affiche les 3 prochains événements planifiés sur Discord, en simulant les récurrences."""
-    searching_msg = await ctx.send("🔍 Je cherche les prochains événements…")
-
-    guild = ctx.guild
-    events = await guild.fetch_scheduled_events()
-    now = datetime.now(timezone.utc)
-    upcoming = []
-
-    for e in events:
-        start_time = get_event_start_time(e)
-        if not start_time or e.status != discord.EventStatus.scheduled:
+    await scheduler.wait_next()
+    to_delete = []
+    for tid, guild_id in scheduler.pop_due():
+        dt = _parse_iso(closed_threads.get(str(tid)))
+        if dt is None:
+            # entry removed (or unparsable) since it was scheduled
             continue
+        to_delete.append((tid, guild_id, dt))
 
-        # Ajouter l'événement actuel s'il est à venir
-        if start_time > now:
-            upcoming.append((e.name, start_time, e.id, guild.id))
-
-        # Détecter les événements récurrents (exemple: Weekly)
-        if "weekly" in e.name.lower():
-            # Générer les 3 prochaines occurrences (hebdomadaire)
-            for i in range(1, 4):
-                future_start = start_time + timedelta(weeks=i)
-                upcoming.append((e.name, future_start, e.id, guild.id))
-
-    # Trier et garder les 3 prochains
-    upcoming = sorted(upcoming, key=lambda x: x[1])[:3]
-
-    if not upcoming:
-        await searching_msg.edit(content="📭 Aucun événement à venir.")
+    if not to_delete:
         return
 
-    msg = "**🗓️ Prochains événements Discord :**\n"
-    for name, start_time, event_id, guild_id in upcoming:
-        date_str = start_time.astimezone(pytz.timezone("Europe/Paris")).strftime("%d/%m/%Y %H:%M")
-        link = f"https://discord.com/events/{guild_id}/{event_id}"
-        msg += f"• **{name}** — {date_str} | [Lien]({link})\n"
-
-    await searching_msg.edit(content=msg)
+    semaphore = asyncio.Semaphore(PURGE_WORKERS)
 
+    async def _worker(tid, guild_id, dt):
+        async with semaphore:
+            return await _purge_thread(tid, guild_id, dt)
 
-@bot.command(name="notify")
-async def notify(ctx, option: str = None):
-    """Permet de s'inscrire ou se désinscrire des rappels d'événements."""
-    user_id = ctx.author.id
-    # Charger l'état en mémoire (notify_opt_out)
-    global notify_opt_out
-
-    # Cas 1 : !notify seul → affiche le statut
-    # NOTE: notify_opt_out now stores users who DO NOT want notifications.
-    if option is None:
-        if user_id in notify_opt_out:
-            await ctx.send(f"� {ctx.author.mention}, tu es **désinscrit** des rappels (opt-out).")
-        else:
-            await ctx.send(f"� {ctx.author.mention}, tu es **inscrit** aux rappels par défaut.")
-        return
+    results = await asyncio.gather(*(_worker(*item) for item in to_delete))
 
-    # Cas 2 : !notify on → (re)inscription aux rappels — enlever du opt-out
-    if option.lower() == "on":
-        if user_id not in notify_opt_out:
-            await ctx.send(f"✅ {ctx.author.mention}, tu es déjà **inscrit** aux rappels.")
-        else:
-            try:
-                notify_opt_out.remove(user_id)
-            except KeyError:
-                pass
-            save_notified_users()
-            await ctx.send(f"🔔 {ctx.author.mention}, tu es maintenant **inscrit** aux rappels.")
-        return
+    deleted_by_guild = {}
+    for (tid, guild_id, dt), (status, resolved_guild, name) in zip(to_delete, results):
+        if status == 'failed':
+            # don't drop the entry so we can retry later
+            scheduler.schedule(tid, datetime.now(timezone.utc) + PURGE_RETRY_DELAY, guild_id=resolved_guild)
+        elif status == 'deleted':
+            deleted_by_guild.setdefault(resolved_guild, []).append(name)
 
-    # Cas 3 : !notify off → désinscription (ajout au opt-out)
-    if option.lower() == "off":
-        if user_id in notify_opt_out:
-            await ctx.send(f"ℹ️ {ctx.author.mention}, tu es déjà **désinscrit** des rappels.")
-        else:
-            notify_opt_out.add(user_id)
-            save_notified_users()
-            await ctx.send(f"❌ {ctx.author.mention}, tu es maintenant **désinscrit** des rappels.")
-        return
+    # Optional: one notification per guild in its system_channel
+    await asyncio.gather(*(_send_purge_summary(gid, names) for gid, names in deleted_by_guild.items()))
 
-    # Cas 4 : Mauvaise syntaxe
-    await ctx.send("⚠️ Utilisation : `!notify`, `!notify on` ou `!notify off`")
 
+purge_loops = {}  # shard_id -> tasks.Loop
 
-# ============ 🔐 COMMANDES ADMIN (TEST) ============
 
-@bot.group(name="admin", invoke_without_command=True)
-@commands.has_permissions(administrator=True)
-async def admin(ctx):
-    """Groupe de commandes admin pour tester le bot."""
-    await ctx.send("Utilisation: `!admin health | github [pr_number] | notified | guilds` (admin seulement)")
+def start_purge_loop(shard_id: int):
+    loop = purge_loops.get(shard_id)
+    if loop is None:
+        loop = tasks.loop(seconds=0)(purge_closed_threads)
+        purge_loops[shard_id] = loop
+    if not loop.is_running():
+        loop.start(purge_schedulers.setdefault(shard_id, PurgeScheduler()))
 
 
-@admin.command(name="health")
-@commands.has_permissions(administrator=True)
-async def admin_health(ctx):
-    """Vérifie rapidement l'état des variables d'environnement et dépendances."""
-    checks = {}
-    # Env vars
-    checks['GITHUB_REPO'] = bool(GITHUB_REPO)
-    checks['GITHUB_TOKEN'] = bool(GITHUB_TOKEN)
-    checks['GITHUB_PROJECT'] = bool(GITHUB_PROJECT)
+# ============ 🧊 DÉMARRAGE À CHAUD (snapshot binaire) ============
 
-    # Packages availability (runtime)
-    pkgs = {}
-    for pkg in ('requests','discord','pytz'):
-        try:
-            __import__(pkg)
-            pkgs[pkg] = 'ok'
-        except Exception as e:
-            pkgs[pkg] = f'missing ({e.__class__.__name__})'
-
-    latency = round(bot.latency * 1000) if bot.latency is not None else 'N/A'
-
-    lines = ["**Health check rapide**"]
-    for k,v in checks.items():
-        lines.append(f"• {k}: {'set' if v else 'NOT SET'}")
-    lines.append("\n**Packages:**")
-    for k,v in pkgs.items():
-        lines.append(f"• {k}: {v}")
-    lines.append(f"\n• Latence websocket: {latency} ms")
-
-    await ctx.send("\n".join(lines))
+def capture_warm_snapshot() -> dict:
+    """Caches and scheduler state to pickle on shutdown (stores stay authoritative for the rest)."""
+    return {
+        'version': WARM_START_VERSION,
+        'written_at': time.time(),
+        'shard_count': bot.shard_count if BOT_SHARDING else 1,
+        'closing_cache': closing_cache.snapshot(),
+        'github_cache': github.cache.snapshot(),
+        'indexed_guilds': sorted(indexed_guilds),
+        'purge': {shard_id: p.entries() for shard_id, p in purge_schedulers.items()},
+    }
 
 
-@admin.command(name="github")
-@commands.has_permissions(administrator=True)
-async def admin_github(ctx, pr_number: int = None):
-    """Test l'accès GitHub: sans argument vérifie le repo, avec un numéro récupère la PR."""
-    if not GITHUB_REPO:
-        await ctx.send("⚠️ `GITHUB_REPO` non configuré.")
+def restore_warm_snapshot():
+    """Apply the process-wide parts of `warm_snapshot`; guild parts are applied per shard (`restore_guild_index`)."""
+    global purge_schedulers_built
+    if warm_snapshot is None:
         return
-
-    if pr_number is None:
-        url = f"https://api.github.com/repos/{GITHUB_REPO}"
+    github.cache.restore(warm_snapshot['github_cache'], offline=time.time() - warm_snapshot['written_at'])
+
+    # purge heaps: only if the shard layout is unchanged and every entry is still a closed thread
+    purge = warm_snapshot['purge']
+    shard_count = bot.shard_count if BOT_SHARDING else 1
+    if purge and warm_snapshot['shard_count'] == shard_count and set(purge) >= owned_shard_ids():
+        entries = [e for shard_entries in purge.values() for e in shard_entries]
+        valid = all(str(tid) in closed_threads for tid, _gid, _closed_at in entries)
+        if valid and (BOT_SHARDING or len(entries) == len(closed_threads)):
+            for shard_id in owned_shard_ids():
+                purge_schedulers.setdefault(shard_id, PurgeScheduler()).rebuild(purge[shard_id])
+            purge_schedulers_built = True
+
+
+def restore_guild_index(guild: discord.Guild) -> bool:
+    """Trust the persisted index of `guild` if the snapshot marked it complete, after checking it against
+    the gateway state (active threads and forums received in GUILD_CREATE). False → full REST rebuild needed."""
+    if warm_snapshot is None or guild.id not in warm_snapshot['indexed_guilds']:
+        return False
+    forum_ids = {c.id for c in guild.channels if isinstance(c, discord.ForumChannel)}
+    active = {t.id: t for t in guild.threads if getattr(t, 'parent_id', None) in forum_ids}
+    for t in active.values():
+        index_thread(t, guild_id=guild.id)
+    missing = []
+    for tid, entry in list(thread_index.items()):
+        if entry.get('guild_id') != guild.id:
+            continue
+        if entry.get('parent_id') not in forum_ids:
+            thread_index_store.delete(tid)
+        elif not entry.get('archived') and tid not in active:
+            # archived (or deleted) while offline: the gateway only sends active threads
+            thread_index_store.set(tid, dict(entry, archived=True))
+            missing.append(tid)
+    indexed_guilds.add(guild.id)
+    if missing:
+        asyncio.create_task(verify_missing_threads(missing))
+    return True
+
+
+async def verify_missing_threads(thread_ids: list):
+    """Check through REST the threads a warm start assumed archived: drop the deleted ones (404)
+    and take the real archived/locked flags of the others."""
+    dropped = 0
+    for tid in thread_ids:
         try:
-            r = requests.get(url, headers=github_headers(), timeout=10)
-        except requests.RequestException as e:
-            await ctx.send(f"⚠️ Erreur requête GitHub: {e}")
-            return
-
-        if r.status_code == 200:
-            data = r.json()
-            await ctx.send(f"✅ Accès repo OK — {data.get('full_name')} — {data.get('private') and 'private' or 'public'}")
-        else:
-            await ctx.send(f"❌ Erreur {r.status_code} lors de l'accès au repo.")
+            r = await discord_rest.request("GET", "/channels/{channel_id}", major=tid, channel_id=tid)
+        except Exception as e:
+            logger.warning(f"Vérification du thread {tid} impossible: {e}")
+            continue
+        if r.status_code == 404:
+            unindex_thread(tid)
+            dropped += 1
+        elif r.status_code == 200 and isinstance(r.json(), dict) and tid in thread_index:
+            metadata = r.json().get('thread_metadata') or {}
+            thread_index_store.set(tid, dict(
+                thread_index[tid], archived=bool(metadata.get('archived')), locked=bool(metadata.get('locked')),
+            ))
+    if dropped:
+        logger.info(f"[WARM] {dropped} thread(s) supprimé(s) pendant l'arrêt retiré(s) de l'index")
+
+
+warm_start_stats = {'restored': 0, 'rebuilt': 0}
+
+
+def startup_report() -> list:
+    """Startup phases (duration and time since launch) and warm-start outcome, as text lines."""
+    labels = {
+        'snapshot': "lecture du snapshot",
+        'state': "chargement de l'état",
+        'extensions': "extensions",
+        'ready': "connexion gateway (on_ready)",
+        'first_response': "première commande servie",
+    }
+    if warm_snapshot is not None:
+        mode = f"à chaud (snapshot de {datetime.fromtimestamp(warm_snapshot['written_at']).strftime('%d/%m %H:%M:%S')})"
     else:
-        url = f"https://api.github.com/repos/{GITHUB_REPO}/pulls/{pr_number}"
-        try:
-            r = requests.get(url, headers=github_headers(), timeout=10)
-        except requests.RequestException as e:
-            await ctx.send(f"⚠️ Erreur requête GitHub: {e}")
-            return
-
-        if r.status_code == 200:
-            data = r.json()
-            await ctx.send(f"✅ PR #{pr_number} trouvée: {data.get('title','(no title)')} — {data.get('html_url')}")
-        elif r.status_code == 404:
-            await ctx.send(f"❌ PR #{pr_number} introuvable.")
-        else:
-            await ctx.send(f"⚠️ Erreur GitHub {r.status_code}.")
-
-
-@admin.command(name="notified")
-@commands.has_permissions(administrator=True)
-async def admin_notified(ctx):
-    """Affiche le nombre et un échantillon d'utilisateurs notifiés (fichier notified_users.json)."""
-    path = os.path.join(os.getcwd(), 'notified_users.json')
-    if not os.path.exists(path):
-        return await ctx.send("ℹ️ Aucun fichier `notified_users.json` trouvé.")
-
-    try:
-        with open(path, 'r') as f:
-            users = json.load(f)
-    except Exception as e:
-        return await ctx.send(f"⚠️ Impossible de lire le fichier: {e}")
-
-    # Now this file stores the opt-out users (those who DO NOT want notifications)
-    sample = users[:10]
-    await ctx.send(f"👥 {len(users)} utilisateurs désinscrits (opt-out) (exemple: {sample})")
-
-
-@admin.command(name="guilds")
-@commands.has_permissions(administrator=True)
-async def admin_guilds(ctx):
-    """Liste les guildes où le bot est présent (id + nom)."""
-    lines = [f"Guildes ({len(bot.guilds)}):"]
-    for g in bot.guilds:
-        lines.append(f"• {g.name} — {g.id}")
-    await ctx.send("\n".join(lines))
-
-
-@admin.error
-async def admin_error(ctx, error):
-    if isinstance(error, commands.MissingPermissions):
-        await ctx.send("❌ Tu dois être administrateur pour utiliser ces commandes.")
+        mode = "à froid"
+    lines = [f"Démarrage {mode}"]
+    previous = 0.0
+    for key, label in labels.items():
+        if key not in startup_marks:
+            continue
+        at = startup_marks[key]
+        lines.append(f"• {label}: {(at - previous) * 1000:.0f} ms (t+{at:.2f}s)")
+        previous = at
+    lines.append(f"• index des forums: {warm_start_stats['restored']} guildes restaurées, {warm_start_stats['rebuilt']} reconstruites par REST")
+    return lines
+
+
+# ============ 🧩 EXTENSIONS ET CONTRÔLE (rechargement à chaud, drain) ============
+
+# Commands, listeners and background loops live in extensions/ and are reloaded in place;
+# the gateway session and every cache/store defined here survive a reload.
+EXTENSIONS = (
+    "extensions.general",
+    "extensions.admin",
+    "extensions.threads",
+    "extensions.reminders",
+    "extensions.background",
+)
+
+
+async def reload_extension(name: str) -> float:
+    """(Re)load one extension and return how long it took, in ms."""
+    started = time.perf_counter()
+    if name in bot.extensions:
+        await bot.reload_extension(name)
     else:
-        await ctx.send(f"⚠️ Erreur: {error}")
-
-
-# ============ 🔎 COMMANDES ADMIN: VOICE / EVENT / SIMULATE / DEBUG THREADS ============
-
-@admin.command(name="voice")
-@commands.has_permissions(administrator=True)
-async def admin_voice(ctx, *, channel: str = None):
-    """Liste les membres d'un salon vocal.
+        await bot.load_extension(name)
+    return (time.perf_counter() - started) * 1000
 
-    Usage: !admin voice <channel_id|channel_name|mention>
-    Si aucun argument, liste les membres du canal vocal actuel (si applicable).
-    """
-    # Trouver le channel
-    target = None
-    if channel is None:
-        # si l'auteur est dans un vocal, prendre celui-ci
-        if hasattr(ctx.author, 'voice') and ctx.author.voice and ctx.author.voice.channel:
-            target = ctx.author.voice.channel
-    else:
-        # essayer ID
-        ch = None
-        if channel.isdigit():
-            ch = ctx.guild.get_channel(int(channel))
-        if ch is None:
-            # par mention/name
-            # on accepte un mention comme <#id>
-            m = re.match(r"<#(\d+)>", channel)
-            if m:
-                ch = ctx.guild.get_channel(int(m.group(1)))
-        if ch is None:
-            # trouver par nom
-            for c in ctx.guild.voice_channels:
-                if c.name.lower() == channel.lower():
-                    ch = c
-                    break
-        target = ch
 
-    if target is None:
-        return await ctx.send("⚠️ Salon vocal introuvable. Mentionne ou donne l'ID/nom, ou rejoins un vocal et lance la commande sans argument.")
+draining = False
 
-    members = target.members
-    if not members:
-        return await ctx.send(f"🔈 Salon '{target.name}' vide.")
 
-    lines = [f"🔈 Membres dans '{target.name}' ({len(members)}):"]
-    for m in members:
-        lines.append(f"• {m} — {m.id}")
-    await ctx.send("\n".join(lines))
+@bot.check
+async def _not_draining(ctx):
+    """Refuse new commands while the process drains before a restart."""
+    if draining:
+        await ctx.send("⏳ Redémarrage du bot en cours, réessaie dans quelques secondes.")
+        return False
+    return True
 
 
-@admin.command(name="event")
-@commands.has_permissions(administrator=True)
-async def admin_event(ctx, event_id: int = None):
-    """Liste les utilisateurs intéressés par un événement planifié.
+async def drain_and_close():
+    """Stop accepting commands, let in-flight ones finish (DRAIN_TIMEOUT), flush state, then close.
 
-    Usage: !admin event <event_id>
-    Si pas d'ID, liste les events du guild et leurs IDs.
+    Also writes the warm-start snapshot and closes the HTTP sessions.
     """
-    guild = ctx.guild
-    if event_id is None:
-        events = await guild.fetch_scheduled_events()
-        if not events:
-            return await ctx.send("Aucun événement prévu sur cette guild.")
-        lines = ["📅 Événements planifiés :"]
-        for e in events:
-            start = get_event_start_time(e)
-            start_str = start.strftime('%d/%m %H:%M') if start else '??'
-            lines.append(f"• {e.name} — id:{e.id} — {start_str}")
-        return await ctx.send("\n".join(lines))
-
-    # Récupérer l'event
+    global draining
+    if draining:
+        return
+    draining = True
+    started = time.perf_counter()
+    deadline = started + DRAIN_TIMEOUT
+    while inflight_commands and time.perf_counter() < deadline:
+        await asyncio.sleep(0.1)
+    if inflight_commands:
+        logger.warning(f"Drain: {len(inflight_commands)} commande(s) encore en cours après {DRAIN_TIMEOUT:.0f}s")
+
+    if closing_cache.dirty:
+        save_closing_cache()
+    save_thread_index()
     try:
-        event = await guild.fetch_scheduled_event(event_id)
+        _store_writer.submit(write_warm_snapshot, capture_warm_snapshot())
     except Exception as e:
-        return await ctx.send(f"⚠️ Impossible de récupérer l'événement: {e}")
-    # Diagnostic: try multiple retrievals and report results to help debug empty lists
-    diag = []
-
-    has_event_fetch = callable(getattr(event, 'fetch_users', None))
-    has_guild_fetch = callable(getattr(guild, 'fetch_scheduled_event_users', None))
-    diag.append(f"has event.fetch_users: {has_event_fetch}")
-    diag.append(f"has guild.fetch_scheduled_event_users: {has_guild_fetch}")
-
-    # Try event.fetch_users() if available
-    event_fetch_count = None
-    event_fetch_error = None
-    if has_event_fetch:
+        logger.error(f"Snapshot de démarrage à chaud impossible: {e}")
+    # wait for the store writer thread without blocking the loop
+    await asyncio.get_running_loop().run_in_executor(None, _store_writer.flush)
+    await github.close()
+    await discord_rest.close()
+    print(f"[RELOAD] Drain terminé en {(time.perf_counter() - started) * 1000:.0f} ms, fermeture", flush=True)
+    await bot.close()
+
+
+def control_reply(message: str):
+    """Machine-readable line for run_bot_watch.py (only when it drives this process)."""
+    if os.getenv("BOT_CONTROL") == "stdin":
+        print(f"[CONTROL] {message}", flush=True)
+
+
+def _control_reader(loop):
+    """BOT_CONTROL=stdin: apply the `reload <extension>` / `drain` lines sent by run_bot_watch.py."""
+    for line in sys.stdin:
+        cmd, _, name = line.strip().partition(" ")
+        if cmd == "drain":
+            asyncio.run_coroutine_threadsafe(drain_and_close(), loop)
+            continue
+        if cmd != "reload" or not name:
+            continue
+        future = asyncio.run_coroutine_threadsafe(reload_extension(name), loop)
         try:
-            tmp = [u async for u in event.fetch_users()]
-            event_fetch_count = len(tmp)
+            elapsed = future.result()
+            print(f"[RELOAD] {name} rechargée en {elapsed:.0f} ms", flush=True)
+            control_reply(f"reloaded {name} {elapsed:.1f}")
         except Exception as e:
-            event_fetch_error = str(e)
+            # discord.py keeps the previous version loaded when a reload fails
+            print(f"[RELOAD] Échec du rechargement de {name}: {e}", flush=True)
+            control_reply(f"failed {name}")
 
-    # Try guild.fetch_scheduled_event_users if available
-    guild_fetch_count = None
-    guild_fetch_result_info = None
-    if has_guild_fetch:
-        try:
-            res = await guild.fetch_scheduled_event_users(event.id)
-            # res may be (users, next_token) or a list-like
-            users = res
-            if isinstance(res, tuple) and len(res) > 0:
-                users = res[0]
-            guild_fetch_count = len(users) if hasattr(users, '__len__') else None
-            guild_fetch_result_info = type(res).__name__
-        except Exception as e:
-            guild_fetch_result_info = f"error: {e}"
 
-    # Check fallback attribute on event
-    event_users_attr_len = None
-    if hasattr(event, 'users') and isinstance(event.users, (list, tuple)):
+@bot.event
+async def setup_hook():
+    instrument_discord_http(bot.http)
+    restore_warm_snapshot()
+    for name in EXTENSIONS:
+        await bot.load_extension(name)
+    startup_marks['extensions'] = time.perf_counter() - BOOT_STARTED
+
+    loop = asyncio.get_running_loop()
+    # SIGTERM (deploy, worker supervisor) / SIGINT: drain, snapshot, then close
+    for sig in (signal.SIGTERM, signal.SIGINT):
         try:
-            event_users_attr_len = len(event.users)
-        except Exception:
-            event_users_attr_len = None
+            loop.add_signal_handler(sig, lambda sig=sig: asyncio.ensure_future(_on_signal(sig)))
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C still stops the bot, without snapshot
+    if os.getenv("BOT_CONTROL") == "stdin":
+        threading.Thread(target=_control_reader, args=(loop,), name="reload-control", daemon=True).start()
 
-    try:
-        interested = await get_event_interested_users(guild, event)
-    except Exception as e:
-        return await ctx.send(f"⚠️ Erreur lors de la récupération des utilisateurs intéressés: {e}")
 
-    lines = [f"📅 Intéressés pour '{event.name}' ({len(interested)}):"]
-    sample = interested[:50]
-    for u in sample:
-        lines.append(f"• {getattr(u,'display_name', getattr(u,'name', str(u)))} — {u.id}")
-    if len(interested) > len(sample):
-        lines.append(f"... et {len(interested)-len(sample)} de plus")
+async def _on_signal(sig):
+    logger.info(f"{signal.Signals(sig).name} reçu: arrêt propre")
+    await drain_and_close()
 
-    await ctx.send("\n".join(lines))
 
+# ============ 🚀 ÉVÉNEMENTS ============
 
-@admin.command(name="simulate")
-@commands.has_permissions(administrator=True)
-async def admin_simulate(ctx, event_id: int = None):
-    """Simule la logique de check_meetings pour un event donné — liste qui serait pingué.
+_shards_started = set()  # shards whose thread index has been built
+ready_after = None  # seconds from process start to the first on_ready
 
-    Si aucun `event_id` fourni, liste les events disponibles pour l'aider.
-    """
-    guild = ctx.guild
-    if event_id is None:
-        events = await guild.fetch_scheduled_events()
-        if not events:
-            return await ctx.send("Aucun événement prévu sur cette guild.")
-        lines = ["📅 Événements planifiés :"]
-        for e in events:
-            start = get_event_start_time(e)
-            start_str = start.strftime('%d/%m %H:%M') if start else '??'
-            lines.append(f"• {e.name} — id:{e.id} — {start_str}")
-        return await ctx.send("\n".join(lines))
 
+def _start_shard(shard_id: int, guilds):
+    """Per-shard startup: purge loop, scheduled-event cache/reminders and thread index for `guilds`."""
     try:
-        event = await guild.fetch_scheduled_event(event_id)
-    except Exception as e:
-        return await ctx.send(f"⚠️ Impossible de récupérer l'événement: {e}")
-
-    interested = await get_event_interested_users(guild, event)
-
-    # who is already connected in event.channel if voice
-    already_connected = []
-    if isinstance(event.channel, discord.VoiceChannel):
-        already_connected = [m for m in event.channel.members]
-
-    users_to_ping = [u for u in interested if getattr(u,'id', None) not in notify_opt_out and all(getattr(u,'id', None) != m.id for m in already_connected)]
-
-    lines = [f"🔔 Simulation pour '{event.name}':"]
-    lines.append(f"• Intéressés: {len(interested)}")
-    lines.append(f"• Déjà connectés: {len(already_connected)}")
-    lines.append(f"• Opt-out: {len([u for u in interested if getattr(u,'id', None) in notify_opt_out])}")
-    lines.append(f"• À pinguer: {len(users_to_ping)}")
-    if users_to_ping:
-        lines.append("Exemple (max 20):")
-        for u in users_to_ping[:20]:
-            lines.append(f"• {getattr(u,'display_name', getattr(u,'name', str(u)))} — {u.id}")
-
-    await ctx.send("\n".join(lines))
-
-
-@admin.command(name="setreminder")
-@commands.has_permissions(administrator=True)
-async def admin_setreminder(ctx, channel_id: int):
-    """Set the reminder channel for this guild. Usage: !admin setreminder <channel_id>"""
-    gid = str(ctx.guild.id)
-    # validate channel
-    ch = _get_channel_by_id(ctx.guild, channel_id)
-    if not ch or not hasattr(ch, 'send'):
-        return await ctx.send("⚠️ Salon introuvable ou non-textuel dans cette guild.")
-    perms = ch.permissions_for(ctx.guild.me)
-    if not (perms and perms.send_messages):
-        return await ctx.send("⚠️ Je n'ai pas la permission d'envoyer des messages dans ce salon.")
-
-    reminder_channels[gid] = channel_id
-    save_reminder_channels()
-    await ctx.send(f"✅ Canal de rappel configuré pour cette guild: {getattr(ch,'name', channel_id)} ({channel_id})")
-
-
-@admin.command(name="clearreminder")
-@commands.has_permissions(administrator=True)
-async def admin_clearreminder(ctx):
-    """Clear the reminder channel override for this guild."""
-    gid = str(ctx.guild.id)
-    if gid in reminder_channels:
-        reminder_channels.pop(gid, None)
-        save_reminder_channels()
-        await ctx.send("✅ Override de canal de rappel supprimé pour cette guild. La sélection par défaut sera utilisée.")
+        start_purge_loop(shard_id)
+    except Exception:
+        pass
+    # Cache scheduled events and arm reminder timers (refreshed on every (re)connect)
+    for guild in guilds:
+        reminder_engine.load_guild(guild)
+
+    # Build the forum thread index once per shard (kept current by thread events afterwards),
+    # unless the warm-start snapshot vouches for the persisted one
+    if shard_id not in _shards_started:
+        _shards_started.add(shard_id)
+        for guild in guilds:
+            if restore_guild_index(guild):
+                warm_start_stats['restored'] += 1
+            else:
+                warm_start_stats['rebuilt'] += 1
+                asyncio.create_task(build_thread_index(guild))
+
+
+@bot.event
+async def on_ready():
+    global ready_after
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    if ready_after is None:
+        ready_after = time.perf_counter() - BOOT_STARTED
+        startup_marks['ready'] = ready_after
+        print(f"[RELOAD] {now} — ✅ Connecté en tant que {bot.user} (prêt {ready_after:.1f}s après le lancement)")
+        control_reply(f"ready {ready_after:.3f}")
+        for line in startup_report():
+            logger.info(f"[STARTUP] {line}")
     else:
-        await ctx.send("ℹ️ Aucun override défini pour cette guild.")
+        print(f"[RELOAD] {now} — ✅ Reconnecté en tant que {bot.user}")
+    # Build the purge heaps (the other background loops live in extensions/background.py)
+    try:
+        if not purge_schedulers_built:
+            rebuild_purge_schedulers()
+    except Exception:
+        pass
 
+    # Sharded: per-shard work already happened in on_shard_ready
+    if not BOT_SHARDING:
+        _start_shard(0, bot.guilds)
 
-@admin.command(name="remind")
-@commands.has_permissions(administrator=True)
-async def admin_remind(ctx, event_id: int):
-    """Force l'envoi immédiat d'un rappel pour un event (admin only). Usage: !admin remind <event_id>"""
-    
-    guild = ctx.guild
 
-    # ---- Récupération de l'événement ----
-    try:
-        event = await guild.fetch_scheduled_event(event_id)
-    except Exception as e:
-        return await ctx.send(f"⚠️ Impossible de récupérer l'événement : {e}")
+@bot.event
+async def on_shard_ready(shard_id: int):
+    if not BOT_SHARDING:
+        return
+    print(f"[SHARD] Shard {shard_id} prêt")
+    if not purge_schedulers_built:
+        rebuild_purge_schedulers()
+    _start_shard(shard_id, [g for g in bot.guilds if g.shard_id == shard_id])
+
 
-    # ---- Sélection du channel ----
+# ============ 🕒 RAPPPELS AUTOMATIQUES DES ÉVÉNEMENTS DISCORD ============
+
+REMINDER_LEAD = timedelta(minutes=REMINDER_LEAD_MINUTES)
+
+
+async def send_event_reminder(guild: discord.Guild, event):
+    """Envoie le rappel automatique d'un événement aux intéressés non connectés (et non opt-out)."""
+    start_time = get_event_start_time(event)
+    # Resolve the reminder channel (may use per-guild override)
     channel = get_reminder_channel(guild, event)
-    if not channel or not hasattr(channel, "send"):
-        return await ctx.send(
-            f"⚠️ Aucun channel textuel disponible pour envoyer le rappel de **{event.name}**."
-        )
+    if not channel or not hasattr(channel, 'send'):
+        logger.error(f"⚠️ Aucun channel textuel disponible pour envoyer le rappel de {getattr(event,'name','N/A')} (guild {guild.id}).")
+        return False
 
-    # ---- Récupération des participants ----
+    # 🔹 Étape 1 — Récupérer les personnes intéressées (compatibilité versions discord.py)
     interested_users = await get_event_interested_users(guild, event)
 
-    already_connected = []
-    if isinstance(event.channel, discord.VoiceChannel):
-        already_connected = [m for m in event.channel.members]
-
-    # ---- Filtrer les utilisateurs : pas opt-out + pas déjà en vocal ----
-    users_to_ping = [
-        u.mention
-        for u in interested_users
-        if getattr(u, "id", None) not in notify_opt_out
-        and all(getattr(u, "id", None) != m.id for m in already_connected)
-    ]
+    # 🔹 Étapes 2 & 3 — Exclure ceux déjà dans le salon vocal et ceux qui ne veulent pas de notifications
+    recipients = resolve_recipients(event, interested_users)
+    users_to_ping = recipients.to_ping
 
     if not users_to_ping:
-        return await ctx.send(
-            f"ℹ️ Aucun utilisateur à ping pour **{event.name}** "
-            "(tous déjà connectés ou opt-out)."
-        )
-
-    # ---- Génération des mentions ----
-    mentions = " ".join(users_to_ping)
+        logger.info(f"Personne à ping pour {getattr(event,'name','N/A')} (tous déjà connectés ou opt-out 👏)")
+        return True
 
-    # ---- Embed ----
+    minutes = int(REMINDER_LEAD.total_seconds() // 60)
     embed = discord.Embed(
         title=f"⏰ Rappel : {event.name}",
-        description=f"Rappel forcé par admin.\nParticipants notifiés : {mentions}",
+        description=f"L’événement commence dans **{minutes} minutes** !\n\n🔔 Participants à prévenir : **{len(users_to_ping)}**",
         color=0x5865F2,
-        timestamp=get_event_start_time(event) or datetime.now(timezone.utc),
+        timestamp=start_time
     )
+    # Indiquer dans le footer le channel ciblé (sera utile pour retrouver le message)
+    target_channel_name = getattr(channel, 'name', None) or str(getattr(channel, 'id', 'N/A'))
+    embed.set_footer(text=f"Heure locale selon le fuseau horaire Discord de chacun. | channel: {target_channel_name}")
 
-    target_channel_name = getattr(channel, "name", None) or str(getattr(channel, "id", "N/A"))
-    embed.set_footer(text=f"Envoyé par {ctx.author} | channel : {target_channel_name}")
-
-    # ---- Envoi du message ----
+    allowed_ping = discord.AllowedMentions(users=True)
     try:
-        # Autoriser les pings d'utilisateurs
-        allowed_ping = discord.AllowedMentions(users=True)
-
-        # 2️⃣ Envoi de l’embed (sans aucun ping)
+        # First send plain mentions to trigger pings, then the embed without mentions to avoid double pings
+        for batch in recipients.mention_batches:
+            await channel.send(batch, allowed_mentions=allowed_ping)
         await channel.send(embed=embed, allowed_mentions=discord.AllowedMentions.none())
+        logger.info(f"🔔 Rappel envoyé pour {event.name} (ping de {len(users_to_ping)} membres) dans channel '{target_channel_name}'")
+        return True
+    except Exception as e:
+        logger.error(f"⚠️ Échec envoi du rappel pour {event.name} dans channel '{target_channel_name}': {e}")
 
-        # 1️⃣ Envoi du message texte avec les VRAIS pings
-        await channel.send(content=mentions, allowed_mentions=allowed_ping)
-
-        return await ctx.send(
-            f"✅ Rappel forcé envoyé dans **{target_channel_name}** "
-            f"(ping de **{len(users_to_ping)}** utilisateurs)."
-        )
+    # try to fallback to system channel if available and different
+    sc = guild.system_channel
+    if sc and getattr(sc, 'send', None) and sc != channel:
+        try:
+            for batch in recipients.mention_batches:
+                await sc.send(batch, allowed_mentions=allowed_ping)
+            await sc.send(embed=embed, allowed_mentions=discord.AllowedMentions.none())
+            logger.info(f"🔔 Rappel envoyé pour {event.name} dans system_channel '{getattr(sc, 'name', sc.id)}'")
+            return True
+        except Exception as e2:
+            logger.error(f"⚠️ Échec envoi du rappel fallback pour {event.name}: {e2}")
+    return False
 
-    except Exception as e:
-        logger.error(f"Erreur envoi rappel forcé pour {event.name}: {e}")
-        return await ctx.send(f"⚠️ Erreur en envoyant le rappel forcé : {e}")
 
-# ============ 🕒 RAPPPELS AUTOMATIQUES DES ÉVÉNEMENTS DISCORD ============
+class ReminderEngine:
+    """Event-driven reminders for scheduled events.
 
+    Scheduled events are cached per guild from the gateway (`guild.scheduled_events`
+    at startup, then `on_scheduled_event_create/update/delete`), and one timer is armed
+    per event at T-REMINDER_LEAD. Timer state is persisted in `reminder_state.json` so
+    a restart re-arms pending timers, fires the ones missed while offline (if the event
+    hasn't started yet) and never sends the same reminder twice. No polling: API calls
+    don't grow with guilds × minutes.
+    """
 
-# ============ 🧵 FERMETURE ET ARCHIVAGE AUTOMATIQUE DES POSTS ============
+    def __init__(self):
+        self.events = {}  # guild_id -> {event_id: ScheduledEvent}
+        # event_id -> raw `recurrence_rule` dict: discord.py's ScheduledEvent doesn't carry it,
+        # so it is read from the REST payloads (whole guild at load, one event per gateway update)
+        self.rules = {}
+        self._timers = {}  # event_id -> asyncio.Task
+        self._rule_tasks = set()  # running refresh_rules tasks (kept referenced until done)
 
-@admin.command(name="debugthreads")
-@commands.has_permissions(administrator=True)
-async def admin_debugthreads(ctx):
-    """Debug les threads fermés non archivés. Usage: !admin debugthreads"""
-    guild = ctx.guild
-    all_threads = []
-    # Collect threads from every ForumChannel (fetch to include closed/archived)
-    for channel in guild.channels:
-        if isinstance(channel, discord.ForumChannel):
-            try:
-                fetched = await fetch_all_threads(channel)
-            except Exception as e:
-                await ctx.send(f"⚠️ Erreur forum {getattr(channel,'name',channel.id)}: {e}")
+    async def refresh_rules(self, guild_id: int, event_id: int = None):
+        """Fetch the recurrence rules of a guild's events (or of one event) into `rules`."""
+        try:
+            if event_id is None:
+                r = await discord_rest.request("GET", "/guilds/{guild_id}/scheduled-events", major=guild_id, guild_id=guild_id)
+            else:
+                r = await discord_rest.request(
+                    "GET", "/guilds/{guild_id}/scheduled-events/{event_id}", major=guild_id,
+                    guild_id=guild_id, event_id=event_id,
+                )
+            if r.status_code != 200:
+                logger.warning(f"Règles de récurrence indisponibles pour la guild {guild_id}: HTTP {r.status_code}")
+                return
+            payloads = r.json() if event_id is None else [r.json()]
+        except Exception as e:
+            logger.warning(f"Règles de récurrence indisponibles pour la guild {guild_id}: {e}")
+            return
+        for payload in payloads or []:
+            if not isinstance(payload, dict) or 'id' not in payload:
                 continue
-            for t in fetched:
-                # ensure parent is set for context
-                if not getattr(t, 'parent', None):
-                    t.parent = channel
-                all_threads.append(t)
-
-    if not all_threads:
-        return await ctx.send("Aucun post trouvé sur ce serveur.")
+            eid = int(payload['id'])
+            if payload.get('recurrence_rule'):
+                self.rules[eid] = payload['recurrence_rule']
+            else:
+                self.rules.pop(eid, None)
+
+    def _refresh_rules_later(self, guild_id: int, event_id: int = None):
+        task = asyncio.create_task(self.refresh_rules(guild_id, event_id))
+        self._rule_tasks.add(task)
+        task.add_done_callback(self._rule_tasks.discard)
+
+    def load_guild(self, guild: discord.Guild):
+        """(Re)load the cached scheduled events of `guild` and arm their timers."""
+        events = {e.id: e for e in getattr(guild, 'scheduled_events', [])}
+        self.events[guild.id] = events
+        if events:
+            self._refresh_rules_later(guild.id)
+        for event in events.values():
+            self.arm(event)
+        # forget persisted timers of events that no longer exist
+        for eid, state in list(reminder_state.items()):
+            if state.get('guild_id') == guild.id and eid not in events:
+                self.disarm(eid)
+                reminder_state_store.delete(eid)
+
+    def guild_events(self, guild_id: int) -> list:
+        return list(self.events.get(guild_id, {}).values())
+
+    def upsert(self, event):
+        self.events.setdefault(event.guild_id, {})[event.id] = event
+        self._refresh_rules_later(event.guild_id, event.id)
+        self.arm(event)
+
+    def remove(self, event):
+        self.events.get(event.guild_id, {}).pop(event.id, None)
+        self.rules.pop(event.id, None)
+        self.disarm(event.id)
+        reminder_state_store.delete(event.id)
+
+    def disarm(self, event_id: int):
+        task = self._timers.pop(event_id, None)
+        if task is not None and not task.done():
+            task.cancel()
+
+    def arm(self, event):
+        """Arm (or re-arm) the reminder timer of `event`."""
+        self.disarm(event.id)
+        if not REMINDERS_ENABLED:
+            return
+        start = get_event_start_time(event)
+        if start is None or event.status != discord.EventStatus.scheduled:
+            return
+        if start <= datetime.now(timezone.utc):
+            return
 
-    # Deduplicate by id
-    uniq = {t.id: t for t in all_threads}
-    threads_list = list(uniq.values())
+        state = reminder_state.get(event.id) or {}
+        if state.get('sent_for') == start.isoformat():
+            return  # already reminded for this occurrence
+
+        fire_at = start - REMINDER_LEAD
+        if state.get('start') != start.isoformat() or state.get('fire_at') != fire_at.isoformat():
+            reminder_state_store.set(event.id, {
+                'guild_id': event.guild_id,
+                'start': start.isoformat(),
+                'fire_at': fire_at.isoformat(),
+                'sent_for': state.get('sent_for'),
+            })
+        self._timers[event.id] = asyncio.create_task(self._fire_later(event.guild_id, event.id, fire_at))
+
+    async def _fire_later(self, guild_id: int, event_id: int, fire_at: datetime):
+        delay = (fire_at - datetime.now(timezone.utc)).total_seconds()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        self._timers.pop(event_id, None)
+        guild = bot.get_guild(guild_id)
+        event = self.events.get(guild_id, {}).get(event_id)
+        if guild is None or event is None:
+            return
+        start = get_event_start_time(event)
+        if start is None or event.status != discord.EventStatus.scheduled or start <= datetime.now(timezone.utc):
+            return
 
-    # Sort by creation date if available (newest last)
-    def _key_created(th):
-        dt = getattr(th, 'created_at', None)
-        if dt is None:
-            return 0
+        sent = False
         try:
-            return dt.timestamp()
-        except Exception:
-            return 0
+            sent = await send_event_reminder(guild, event)
+        except Exception as e:
+            logger.error(f"⚠️ Rappel automatique échoué pour {getattr(event, 'name', event_id)}: {e}")
+        if not sent:
+            # not marked as sent: re-armed (and sent right away) on the next restart or event update
+            return
+        state = dict(reminder_state.get(event_id) or {}, guild_id=guild_id, sent_for=start.isoformat())
+        reminder_state_store.set(event_id, state)
 
-    threads_list.sort(key=_key_created)
+    def pending(self) -> int:
+        return sum(1 for t in self._timers.values() if not t.done())
 
-    # Keep closed threads behavior (locked & not archived) as in debugthreads, and also list open threads
-    # Step 1: Put all threads into the 'Fermés' section (user request)
-    closed_threads = threads_list
-    open_threads = []
 
-    lines = []
-    # Closed section will contain all threads; remove forum segment per user request
-    lines.append(f"🧵 Fermés ({len(closed_threads)}):")
-    for t in closed_threads:
-        created = t.created_at.strftime('%d/%m/%Y %H:%M') if getattr(t, 'created_at', None) else '?'
+reminder_engine = ReminderEngine()
 
-        # Passe juste l'id, pas l'objet
-        lock_date = await get_lock_date(t.id, ctx.guild)
-        locked = lock_date.strftime('%d/%m/%Y %H:%M') if lock_date else '—'
 
-        # Date programmée de suppression = date de fermeture + 1 semaine
-        scheduled_deletion = None
-        if lock_date:
-            try:
-                scheduled_deletion = lock_date + timedelta(weeks=1)
-            except Exception:
-                scheduled_deletion = None
+# ============ 🧵 FERMETURE ET ARCHIVAGE AUTOMATIQUE DES POSTS ============
 
-        scheduled_str = scheduled_deletion.strftime('%d/%m/%Y %H:%M') if scheduled_deletion else '—'
+CLOSE_CONFIRM_TIMEOUT = float(os.getenv("CLOSE_CONFIRM_TIMEOUT", "5"))
 
-        lines.append(f"• {t.name} — id:{t.id} — créé:{created} — fermé:{locked} — suppression prévue:{scheduled_str}")
+# thread_id -> Future resolved by on_thread_update once the gateway reports the thread archived
+_pending_archives = {}
 
-    msg = "\n".join(lines)
-    # send in chunks to avoid message length limits — split only at line boundaries
-    for chunk in _chunks_from_lines(msg):
-        await ctx.send(chunk)
 
+def _confirm_archived(thread: discord.Thread):
+    fut = _pending_archives.pop(thread.id, None)
+    if fut is not None and not fut.done():
+        fut.set_result(thread)
 
-@admin.command(name="openthreads")
-@commands.has_permissions(administrator=True)
-async def admin_openthreads(ctx):
-    """Liste uniquement les posts ouverts (non fermés ET non archivés)."""
-    guild = ctx.guild
-    open_threads = []
 
-    for channel in guild.channels:
-        if isinstance(channel, discord.ForumChannel):
-            try:
-                # Threads actifs dans le cache
-                for t in channel.threads:
-                    if not getattr(t, 'locked', False) and not getattr(t, 'archived', False):
-                        if not getattr(t, 'parent', None):
-                            t.parent = channel
-                        open_threads.append(t)
-            except Exception as e:
-                await ctx.send(f"⚠️ Erreur forum {channel.name}: {e}")
-                continue
+def _record_closure(thread: discord.Thread):
+    now_dt = datetime.now(timezone.utc)
+    try:
+        closed_threads_store.set(str(thread.id), now_dt.isoformat(), guild_id=thread.guild.id)
+        closing_cache[thread.id] = now_dt
+        purge_scheduler_for(thread.guild.id).schedule(thread.id, now_dt + PURGE_DELAY, guild_id=thread.guild.id)
+        # the local object is stale when the archive was confirmed through the REST fallback
+        index_thread(thread, archived=True)
+    except Exception as _e:
+        logger.warning(f"Impossible d'enregistrer la fermeture du thread {thread.id}: {_e}")
 
-    if not open_threads:
-        return await ctx.send("🔓 Aucun post ouvert trouvé sur ce serveur.")
-
-    # Tri par date
-    open_threads.sort(key=lambda t: t.created_at or 0)
-
-    # Message
-    lines = [f"🔓 Posts ouverts ({len(open_threads)}):"]
-    for t in open_threads:
-        created = t.created_at.strftime('%d/%m/%Y %H:%M') if t.created_at else '?'
-        lines.append(f"• {t.name} — id:{t.id} — créé:{created}")
-
-    msg = "\n".join(lines)
-    for chunk in _chunks_from_lines(msg):
-        await ctx.send(chunk)
-
-@admin.command(name="listthreads")
-@commands.has_permissions(administrator=True)
-async def admin_listthreads(ctx):
-    """Liste tous les posts de chaque forum, groupés par statut (ouvert, fermé)."""
-    # Reuse existing admin commands to ensure identical output and formatting.
-    # User requested: first show open threads, then closed threads.
-    await admin_openthreads(ctx)
-    await admin_debugthreads(ctx)
-
-@bot.command(name="close")
-async def close_thread(ctx, post_id: int = None):
-    """Ferme (archive) un post de forum.
-
-    Usage:
-      - `!close` (dans un post) — archive le post courant
-      - `!close <post_id>` (admin) — archive le post avec l'ID fourni
-    """
-    thread = None
 
-    # If an ID is provided, search all forum channels for that thread
-    if post_id is not None:
-        for channel in ctx.guild.channels:
-            if isinstance(channel, discord.ForumChannel):
-                try:
-                    for t in channel.threads:
-                        if t.id == post_id:
-                            thread = t
-                            break
-                except Exception:
-                    continue
-            if thread:
-                break
+async def _rest_archived(thread_id: int):
+    """Archived flag of a thread as seen by the REST API (None if it can't be read)."""
+    r = await discord_rest.request("GET", "/channels/{channel_id}", major=thread_id, channel_id=thread_id)
+    if r.status_code != 200 or not isinstance(r.json(), dict):
+        return None
+    return bool((r.json().get('thread_metadata') or {}).get('archived'))
 
-        if not thread:
-            await ctx.send(f"❌ Post {post_id} introuvable.")
-            return
-    else:
-        # No ID: must be used inside a thread
-        if isinstance(ctx.channel, discord.Thread):
-            thread = ctx.channel
-        else:
-            await ctx.send("⚠️ Cette commande doit être utilisée dans un post de forum ou avec un ID : `!close <post_id>`.")
-            return
 
-    # If already archived, inform and return
-    try:
-        if getattr(thread, 'archived', False):
-            await ctx.send(f"ℹ️ Le post {thread.id} est déjà archivé.")
-            return
-    except Exception:
-        pass
+async def archive_thread(thread: discord.Thread) -> bool:
+    """Archive `thread` with a single edit, confirmed by the matching gateway THREAD_UPDATE.
 
-    # Permission check: Manage Threads is required to archive
-    perms = None
+    REST is only used when no event arrives within CLOSE_CONFIRM_TIMEOUT: one GET to
+    verify, and one PATCH through `discord_rest` if the thread is still open.
+    Raises discord.Forbidden if the bot may not archive the thread.
+    """
+    fut = asyncio.get_running_loop().create_future()
+    _pending_archives[thread.id] = fut
     try:
-        perms = thread.permissions_for(ctx.guild.me)
-    except Exception:
-        perms = None
+        await thread.edit(archived=True)
+        try:
+            await asyncio.wait_for(fut, timeout=CLOSE_CONFIRM_TIMEOUT)
+            return True
+        except asyncio.TimeoutError:
+            pass
+    finally:
+        if _pending_archives.get(thread.id) is fut:
+            _pending_archives.pop(thread.id, None)
+
+    logger.info(f"Pas d'événement THREAD_UPDATE pour {thread.id} après {CLOSE_CONFIRM_TIMEOUT:.0f}s, vérification REST")
+    archived = await _rest_archived(thread.id)
+    if archived is not False:
+        return bool(archived)
+    r = await discord_rest.request(
+        "PATCH", "/channels/{channel_id}", major=thread.id, json_body={"archived": True}, channel_id=thread.id,
+    )
+    if r.status_code not in (200, 201):
+        logger.warning(f"REST fallback archive failed for {thread.id}: {r.status_code} {r.json()}")
+        return False
+    return bool(((r.json() or {}).get('thread_metadata') or {}).get('archived'))
+
+
+# ============ 📈 ENDPOINT MÉTRIQUES (/metrics, /healthz) ============
+
+def health_status() -> tuple:
+    """(healthy, details) from state readable without the event loop."""
+    lag = metrics.value('epitrello_event_loop_lag_seconds')
+    sample_age = time.monotonic() - metrics.last_sample if metrics.last_sample is not None else None
+    details = {
+        'ready': bot.is_ready(),
+        'closed': bot.is_closed(),
+        'event_loop_lag': lag,
+        'last_sample_age': sample_age,
+        'worker': WORKER_ID,
+    }
+    # a stalled loop stops refreshing the samples
+    healthy = (
+        details['ready'] and not details['closed']
+        and sample_age is not None and sample_age < 3 * METRICS_SAMPLE_INTERVAL + HEALTH_MAX_LOOP_LAG
+        and (lag or 0.0) < HEALTH_MAX_LOOP_LAG
+    )
+    return healthy, details
 
-    if perms is not None and not getattr(perms, 'manage_threads', False):
-        await ctx.send("❌ Je n'ai pas la permission `Manage Threads` pour archiver ce post. Vérifie mes permissions.")
-        return
 
-    # Attempt to archive using the library, then verify. If it doesn't take effect, try REST fallback.
-    try:
-        await thread.edit(archived=True)
+metrics_app = Flask('epitrello-metrics')
 
-        # verify by fetching fresh channel object
-        try:
-            refreshed = await thread.guild.fetch_channel(thread.id)
-            archived_now = getattr(refreshed, 'archived', False)
-        except Exception:
-            refreshed = None
-            archived_now = None
 
-        # If the library call didn't actually archive, try REST fallback (requires BOT token)
-        if not archived_now:
-            fallback_ok = False
-            if TOKEN:
-                try:
-                    url = f"https://discord.com/api/v10/channels/{thread.id}"
-                    headers = {"Authorization": f"Bot {TOKEN}", "Content-Type": "application/json"}
-                    payload = {"archived": True}
-                    resp = requests.patch(url, headers=headers, json=payload, timeout=10)
-                    if resp.status_code in (200, 201):
-                        fallback_ok = True
-                    else:
-                        logger.warning(f"REST fallback archive failed for {thread.id}: {resp.status_code} {resp.text}")
-                except Exception as e:
-                    logger.warning(f"REST fallback archive exception for {thread.id}: {e}")
+@metrics_app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
-            # re-fetch to confirm
-            try:
-                refreshed = await thread.guild.fetch_channel(thread.id)
-                archived_now = getattr(refreshed, 'archived', False)
-            except Exception:
-                archived_now = False
 
-        if archived_now:
-            now_dt = datetime.now(timezone.utc)
-            try:
-                closed_threads[str(thread.id)] = now_dt.isoformat()
-                closing_cache[thread.id] = now_dt
-                save_closed_threads()
-            except Exception as _e:
-                logger.warning(f"Impossible d'enregistrer la fermeture du thread {thread.id}: {_e}")
-
-            # Notify the user outside of the (now archived) thread to avoid unarchiving it
-            msg = f"✅ Post {thread.id} archivé (clos) avec succès."
-            sent = await send_confirmation_outside_thread(ctx, thread, msg)
-            if not sent:
-                # last fallback: log if we couldn't send anywhere
-                logger.info(msg)
-            print(f"🧵 Post '{thread.name}' ({thread.id}) archivé manuellement par {ctx.author}.")
-            return
+@metrics_app.route('/healthz')
+def healthz_endpoint():
+    healthy, details = health_status()
+    details['status'] = 'ok' if healthy else 'unhealthy'
+    return jsonify(details), (200 if healthy else 503)
 
-        # If we reach here, archive did not succeed
-        await ctx.send("❌ Tentative d'archivage effectuée mais le post reste ouvert. Vérifie mes permissions et le type de thread (public/private).")
-        logger.warning(f"Archive reported success but channel {thread.id} not archived (checked properties).")
 
-    except discord.Forbidden:
-        await ctx.send("❌ Je n'ai pas la permission d'archiver ce post. Vérifie `Manage Threads` et les permissions de canal.")
-    except Exception as e:
-        await ctx.send(f"❌ Erreur lors de l'archivage: {e}")
-
-
-# ========== To fix ===========
-
-# @tasks.loop(minutes=1)
-# async def check_meetings():
-#     """Vérifie les événements Discord planifiés et envoie un rappel 5 min avant aux intéressés non connectés"""
-#     now = datetime.now(timezone.utc)
-#     for guild in bot.guilds:
-#         events = await guild.fetch_scheduled_events()
-#         for event in events:
-#             # Inspect event and compute start delta
-#             start_time = get_event_start_time(event)
-#             logger.debug(f"Checking event {getattr(event,'name','N/A')} (id={getattr(event,'id','N/A')}), status={getattr(event,'status','N/A')}, start_time={start_time}")
-#             if event.status != discord.EventStatus.scheduled:
-#                 logger.debug(f"Skipping event {getattr(event,'id','N/A')} because status != scheduled ({getattr(event,'status','N/A')})")
-#                 continue
-#             if start_time is None:
-#                 logger.debug(f"Skipping event {getattr(event,'id','N/A')} because start_time is None")
-#                 continue
-#             delta = (start_time - now).total_seconds()
-#             logger.debug(f"Event delta (seconds) for {getattr(event,'id','N/A')}: {delta}")
-
-#             # Si l’événement commence dans 5 minutes ou moins
-#             if 0 < delta <= 300:
-#                 # Resolve the reminder channel (may use per-guild override)
-#                 channel = get_reminder_channel(guild, event)
-#                 if not channel or not hasattr(channel, 'send'):
-#                     logger.error(f"⚠️ Aucun channel textuel disponible pour envoyer le rappel de {getattr(event,'name','N/A')} (guild {guild.id}).")
-#                     continue
-
-#                 # 🔹 Étape 1 — Récupérer les personnes intéressées (compatibilité versions discord.py)
-#                 interested_users = await get_event_interested_users(guild, event)
-#                 logger.debug(f"Retrieved {len(interested_users) if interested_users is not None else 0} interested users for event {getattr(event,'id','N/A')}")
-
-#                 # 🔹 Étape 2 — Identifier qui est déjà dans le salon vocal
-#                 already_connected = []
-#                 if isinstance(event.channel, discord.VoiceChannel):
-#                     already_connected = [m for m in event.channel.members]
-
-#                 # 🔹 Étape 3 — Filtrer pour ne pinguer que ceux pas encore connectés et qui veulent des notifications
-#                 users_to_ping = [
-#                     u.mention for u in interested_users
-#                     if getattr(u, 'id', None) not in notify_opt_out and all(getattr(u,'id', None) != m.id for m in already_connected)
-#                 ]
-
-#                 if not users_to_ping:
-#                     logger.info(f"Personne à ping pour {getattr(event,'name','N/A')} (tous déjà connectés ou opt-out 👏)")
-#                     continue
-
-#                 mentions = ", ".join(users_to_ping)
-
-#                 embed = discord.Embed(
-#                     title=f"⏰ Rappel : {event.name}",
-#                     description=f"L’événement commence dans **5 minutes** !\n\n🔔 Participants à prévenir : {mentions}",
-#                     color=0x5865F2,
-#                     timestamp=start_time
-#                 )
-#                 # Indiquer dans le footer le channel ciblé (sera utile pour retrouver le message)
-#                 target_channel_name = None
-#                 if channel is not None:
-#                     target_channel_name = getattr(channel, 'name', None) or str(getattr(channel, 'id', 'N/A'))
-#                 footer_text = f"Heure locale selon le fuseau horaire Discord de chacun. | channel: {target_channel_name or 'unknown'}"
-#                 embed.set_footer(text=footer_text)
-
-#                 try:
-#                     # First send plain mentions to trigger pings
-#                     allowed_ping = discord.AllowedMentions(users=True)
-#                     try:
-#                         await channel.send(mentions, allowed_mentions=allowed_ping)
-#                     except Exception:
-#                         logger.warning(f"Envoi du contenu de mentions échoué pour {event.name} dans {getattr(channel,'name', getattr(channel,'id','N/A'))}")
-
-#                     # Then send the embed without mentions to avoid double pings
-#                     try:
-#                         await channel.send(embed=embed, allowed_mentions=discord.AllowedMentions.none())
-#                     except Exception as e:
-#                         logger.error(f"Erreur envoi embed rappel pour {event.name} dans {getattr(channel,'name', getattr(channel,'id','N/A'))}: {e}")
-#                         raise
-
-#                     ch_desc = getattr(channel, 'name', None) or getattr(channel, 'id', 'N/A')
-#                     logger.info(f"🔔 Rappel envoyé pour {event.name} (ping de {len(users_to_ping)} membres) dans channel '{ch_desc}'")
-#                 except Exception as e:
-#                     ch_desc = getattr(channel, 'name', None) or getattr(channel, 'id', 'N/A')
-#                     logger.error(f"⚠️ Échec envoi du rappel pour {event.name} dans channel '{ch_desc}': {e}")
-#                     # try to fallback to system channel if available and different
-#                     try:
-#                         if guild.system_channel and getattr(guild.system_channel, 'send', None) and guild.system_channel != channel:
-#                             allowed_ping = discord.AllowedMentions(users=True)
-#                             try:
-#                                 await guild.system_channel.send(mentions, allowed_mentions=allowed_ping)
-#                             except Exception:
-#                                 logger.warning(f"Envoi du contenu de mentions échoué pour {event.name} dans system_channel")
-#                             await guild.system_channel.send(embed=embed, allowed_mentions=discord.AllowedMentions.none())
-#                             sys_desc = getattr(guild.system_channel, 'name', None) or getattr(guild.system_channel, 'id', 'N/A')
-#                             logger.info(f"🔔 Rappel envoyé pour {event.name} dans system_channel '{sys_desc}'")
-#                     except Exception as e2:
-#                         logger.error(f"⚠️ Échec envoi du rappel fallback pour {event.name}: {e2}")
-
-#                 # Évite le spam toutes les minutes
-#                 await asyncio.sleep(65)
+metrics_server = None
+
+
+def start_metrics_server():
+    """Serve `metrics_app` from a daemon thread so scrapes never run on the gateway loop."""
+    global metrics_server
+    if METRICS_PORT <= 0 or metrics_server is not None:
+        return
+    port = METRICS_PORT + (WORKER_ID or 0)
+    try:
+        metrics_server = make_server(METRICS_HOST, port, metrics_app, threaded=True)
+    except OSError as e:
+        logger.error(f"Serveur de métriques indisponible sur {METRICS_HOST}:{port}: {e}")
+        return
+    threading.Thread(target=metrics_server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Métriques disponibles sur http://{METRICS_HOST}:{port}/metrics")
 
 
 # ============ LANCEMENT DU BOT ============
 
+def run_workers(count: int):
+    """Run one bot process per shard group (shard % count) and restart any worker that dies.
+
+    Workers share closed threads, opt-outs and reminder channels through the SQLite
+    database; their thread index, reminder timers and caches stay per process.
+    """
+    shard_count = SHARD_COUNT or count
+    if count > shard_count:
+        # a worker without shard would otherwise get an empty SHARD_IDS
+        print(f"[WORKERS] {count} workers pour {shard_count} shards: limité à {shard_count} workers")
+        count = shard_count
+
+    def spawn(worker_id: int):
+        shard_ids = [sid for sid in range(shard_count) if sid % count == worker_id]
+        env = dict(
+            os.environ,
+            BOT_WORKER_ID=str(worker_id),
+            BOT_SHARDING="auto",
+            SHARD_COUNT=str(shard_count),
+            SHARD_IDS=",".join(map(str, shard_ids)),
+            STORAGE_BACKEND="sqlite",
+        )
+        print(f"[WORKERS] Démarrage du worker {worker_id} (shards {shard_ids})")
+        return subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=env)
+
+    workers = {}
+    try:
+        for worker_id in range(count):
+            workers[worker_id] = spawn(worker_id)
+            time.sleep(WORKER_SPAWN_INTERVAL)
+        while True:
+            for worker_id, proc in list(workers.items()):
+                code = proc.poll()
+                if code is not None:
+                    print(f"[WORKERS] Worker {worker_id} arrêté (code {code}), redémarrage")
+                    time.sleep(WORKER_SPAWN_INTERVAL)
+                    workers[worker_id] = spawn(worker_id)
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proc in workers.values():
+            proc.terminate()
+        for proc in workers.values():
+            try:
+                # workers drain and write their warm-start snapshot on SIGTERM
+                proc.wait(timeout=DRAIN_TIMEOUT + 10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
 if __name__ == "__main__":
-    bot.run(TOKEN)
+    if BOT_WORKERS > 1 and WORKER_ID is None:
+        run_workers(BOT_WORKERS)
+    elif WORKER_ID is not None and not SHARD_IDS:
+        # an empty SHARD_IDS means "all shards" for AutoShardedBot, never what a worker wants
+        sys.exit(f"[WORKERS] Worker {WORKER_ID} sans SHARD_IDS: refus de démarrer sur tous les shards")
+    else:
+        start_metrics_server()
+        bot.run(TOKEN)
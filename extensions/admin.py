@@ -0,0 +1,523 @@
+# ============ 🔐 COMMANDES ADMIN ============
+
+import os
+import re
+import pytz
+import discord
+from discord.ext import commands
+from datetime import datetime, timedelta, timezone
+
+import bot as core
+from bot import (
+    BOT_SHARDING, GITHUB_ERRORS, GITHUB_PROJECT, GITHUB_REPO, GITHUB_TOKEN, Paginator, REMINDERS_ENABLED,
+    WORKER_ID, _get_channel_by_id, bot, build_thread_index, closing_cache,
+    get_event_interested_users, get_event_start_time, get_lock_date, get_reminder_channel, github,
+    indexed_threads, logger, notify_opt_out, opted_out_users, opted_out_without_guild, owned_shard_ids,
+    purge_queue_stats, purge_schedulers, refresh_lock_index, reminder_channels, reminder_channels_store,
+    reminder_engine, resolve_recipients, startup_report,
+)
+
+
+@commands.group(name="admin", invoke_without_command=True)
+@commands.has_permissions(administrator=True)
+async def admin(ctx):
+    """Groupe de commandes admin pour tester le bot."""
+    await ctx.send("Utilisation: `!admin health | github [pr_number] | ghcache [reset] | notified | guilds | shards | startup` (admin seulement)")
+
+
+@admin.command(name="health")
+@commands.has_permissions(administrator=True)
+async def admin_health(ctx):
+    """Vérifie rapidement l'état des variables d'environnement et dépendances."""
+    checks = {}
+    # Env vars
+    checks['GITHUB_REPO'] = bool(GITHUB_REPO)
+    checks['GITHUB_TOKEN'] = bool(GITHUB_TOKEN)
+    checks['GITHUB_PROJECT'] = bool(GITHUB_PROJECT)
+
+    # Packages availability (runtime)
+    pkgs = {}
+    for pkg in ('aiohttp','discord','pytz','flask'):
+        try:
+            __import__(pkg)
+            pkgs[pkg] = 'ok'
+        except Exception as e:
+            pkgs[pkg] = f'missing ({e.__class__.__name__})'
+
+    latency = round(bot.latency * 1000) if bot.latency is not None else 'N/A'
+
+    lines = ["**Health check rapide**"]
+    for k,v in checks.items():
+        lines.append(f"• {k}: {'set' if v else 'NOT SET'}")
+    lines.append("\n**Packages:**")
+    for k,v in pkgs.items():
+        lines.append(f"• {k}: {v}")
+    lines.append(f"\n• Latence websocket: {latency} ms")
+    pending_purge, next_purge = purge_queue_stats()
+    next_purge_str = next_purge.astimezone(pytz.timezone("Europe/Paris")).strftime('%d/%m/%Y %H:%M') if next_purge else '—'
+    lines.append(f"• Rappels automatiques: {'activés' if REMINDERS_ENABLED else 'désactivés'} ({reminder_engine.pending()} programmés)")
+    lines.append(f"• Posts en attente de suppression: {pending_purge} (prochaine: {next_purge_str})")
+    lines.append(f"• Cache dates de fermeture: {len(closing_cache)}/{closing_cache.max_entries} entrées — hit rate {closing_cache.hit_rate():.1f}% ({closing_cache.hits} hits / {closing_cache.misses} misses)")
+
+    await ctx.send("\n".join(lines))
+
+
+@admin.command(name="github")
+@commands.has_permissions(administrator=True)
+async def admin_github(ctx, pr_number: int = None):
+    """Test l'accès GitHub: sans argument vérifie le repo, avec un numéro récupère la PR."""
+    if not GITHUB_REPO:
+        await ctx.send("⚠️ `GITHUB_REPO` non configuré.")
+        return
+
+    if pr_number is None:
+        try:
+            r = await github.get(f"/repos/{GITHUB_REPO}")
+        except GITHUB_ERRORS as e:
+            await ctx.send(f"⚠️ Erreur requête GitHub: {e}")
+            return
+
+        if r.status_code == 200:
+            data = r.json()
+            await ctx.send(f"✅ Accès repo OK — {data.get('full_name')} — {data.get('private') and 'private' or 'public'}")
+        else:
+            await ctx.send(f"❌ Erreur {r.status_code} lors de l'accès au repo.")
+    else:
+        try:
+            r = await github.get_item("pulls", pr_number)
+        except GITHUB_ERRORS as e:
+            await ctx.send(f"⚠️ Erreur requête GitHub: {e}")
+            return
+
+        if r.status_code == 200:
+            data = r.json()
+            await ctx.send(f"✅ PR #{pr_number} trouvée: {data.get('title','(no title)')} — {data.get('html_url')}")
+        elif r.status_code == 404:
+            await ctx.send(f"❌ PR #{pr_number} introuvable.")
+        else:
+            await ctx.send(f"⚠️ Erreur GitHub {r.status_code}.")
+
+
+@admin.command(name="ghcache")
+@commands.has_permissions(administrator=True)
+async def admin_ghcache(ctx, action: str = None):
+    """Statistiques du cache GitHub (PR/issues). `!admin ghcache reset` remet les compteurs à zéro."""
+    cache = github.cache
+    if action and action.lower() == "reset":
+        cache.hits = cache.misses = cache.revalidations = 0
+        await ctx.send("✅ Compteurs du cache GitHub remis à zéro.")
+        return
+
+    st = cache.stats()
+    lines = ["**Cache GitHub**"]
+    lines.append(f"• Entrées: {st['entries']}/{st['max_entries']} (TTL {st['ttl']:.0f}s)")
+    lines.append(f"• Hits: {st['hits']}")
+    lines.append(f"• Revalidations (304): {st['revalidations']}")
+    lines.append(f"• Misses: {st['misses']}")
+    lines.append(f"• Taux de hit: {st['hit_rate']:.1f}%")
+    lines.append("\n**Rate limit GitHub**")
+    remaining = github.rate_remaining if github.rate_remaining is not None else '?'
+    lines.append(f"• Requêtes restantes: {remaining}")
+    if github.rate_reset:
+        reset_at = datetime.fromtimestamp(github.rate_reset, timezone.utc).astimezone(pytz.timezone("Europe/Paris"))
+        lines.append(f"• Reset: {reset_at.strftime('%H:%M:%S')}")
+    lines.append(f"• Réponses rate-limit reçues: {github.rate_limited}")
+    lines.append(f"• Requêtes fusionnées (en vol): {github.coalesced}")
+    await ctx.send("\n".join(lines))
+
+
+@admin.command(name="notified")
+@commands.has_permissions(administrator=True)
+async def admin_notified(ctx):
+    """Affiche le nombre et un échantillon d'utilisateurs désinscrits (opt-out, notified_users.json)."""
+    # Read the in-memory state: the file on disk may lag behind its journal
+    users = list(notify_opt_out)
+    if not users:
+        return await ctx.send("ℹ️ Aucun utilisateur désinscrit.")
+
+    # Now this stores the opt-out users (those who DO NOT want notifications)
+    sample = users[:10]
+    in_guild = opted_out_users(ctx.guild.id) if ctx.guild else set()
+    unknown = opted_out_without_guild()
+    unknown_note = f" (+{unknown} sans guild connue)" if unknown else ""
+    await ctx.send(
+        f"👥 {len(users)} utilisateurs désinscrits (opt-out), dont {len(in_guild)} sur cette guild{unknown_note} "
+        f"(exemple: {sample})"
+    )
+
+
+@admin.command(name="guilds")
+@commands.has_permissions(administrator=True)
+async def admin_guilds(ctx):
+    """Liste les guildes où le bot est présent (id + nom)."""
+    lines = [f"Guildes ({len(bot.guilds)}):"]
+    for g in bot.guilds:
+        lines.append(f"• {g.name} — {g.id}")
+    await ctx.send("\n".join(lines))
+
+
+@admin.command(name="shards")
+@commands.has_permissions(administrator=True)
+async def admin_shards(ctx):
+    """Affiche la latence, le nombre de guildes et la file de suppression par shard."""
+    latencies = dict(getattr(bot, 'latencies', None) or [(0, bot.latency)])
+    counts = {}
+    for g in bot.guilds:
+        sid = g.shard_id if BOT_SHARDING else 0
+        counts[sid] = counts.get(sid, 0) + 1
+
+    mode = f"AutoShardedBot ({bot.shard_count} shards)" if BOT_SHARDING else "Bot (1 connexion)"
+    lines = [f"**Shards** — mode: {mode}"]
+    if WORKER_ID is not None:
+        lines.append(f"• Process: worker {WORKER_ID} (pid {os.getpid()}) — shards {sorted(owned_shard_ids())}, journal partagé #{core.shared_change_seq}")
+    for sid in sorted(set(latencies) | set(counts)):
+        lat = latencies.get(sid)
+        lat_str = f"{round(lat * 1000)} ms" if lat is not None and lat == lat else 'N/A'
+        queue_len = len(purge_schedulers.get(sid, ()))
+        lines.append(f"• Shard {sid}: latence {lat_str} — {counts.get(sid, 0)} guildes — {queue_len} suppressions en attente")
+    await ctx.send("\n".join(lines))
+
+
+@admin.command(name="startup")
+@commands.has_permissions(administrator=True)
+async def admin_startup(ctx):
+    """Rapport de démarrage: durée de chaque phase et résultat du démarrage à chaud."""
+    await ctx.send("\n".join(["**Démarrage**"] + startup_report()))
+
+
+@admin.error
+async def admin_error(ctx, error):
+    if isinstance(error, commands.MissingPermissions):
+        await ctx.send("❌ Tu dois être administrateur pour utiliser ces commandes.")
+    elif isinstance(error, commands.CheckFailure) and core.draining:
+        return  # already answered by the drain check
+    else:
+        await ctx.send(f"⚠️ Erreur: {error}")
+
+
+# ============ 🔎 COMMANDES ADMIN: VOICE / EVENT / SIMULATE / DEBUG THREADS ============
+
+@admin.command(name="voice")
+@commands.has_permissions(administrator=True)
+async def admin_voice(ctx, *, channel: str = None):
+    """Liste les membres d'un salon vocal.
+
+    Usage: !admin voice <channel_id|channel_name|mention>
+    Si aucun argument, liste les membres du canal vocal actuel (si applicable).
+    """
+    # Trouver le channel
+    target = None
+    if channel is None:
+        # si l'auteur est dans un vocal, prendre celui-ci
+        if hasattr(ctx.author, 'voice') and ctx.author.voice and ctx.author.voice.channel:
+            target = ctx.author.voice.channel
+    else:
+        # essayer ID
+        ch = None
+        if channel.isdigit():
+            ch = ctx.guild.get_channel(int(channel))
+        if ch is None:
+            # par mention/name
+            # on accepte un mention comme <#id>
+            m = re.match(r"<#(\d+)>", channel)
+            if m:
+                ch = ctx.guild.get_channel(int(m.group(1)))
+        if ch is None:
+            # trouver par nom
+            for c in ctx.guild.voice_channels:
+                if c.name.lower() == channel.lower():
+                    ch = c
+                    break
+        target = ch
+
+    if target is None:
+        return await ctx.send("⚠️ Salon vocal introuvable. Mentionne ou donne l'ID/nom, ou rejoins un vocal et lance la commande sans argument.")
+
+    members = target.members
+    if not members:
+        return await ctx.send(f"🔈 Salon '{target.name}' vide.")
+
+    rows = (f"• {m} — {m.id}" for m in members)
+    await Paginator(f"🔈 Membres dans '{target.name}' ({len(members)}):", rows, author_id=ctx.author.id).start(ctx)
+
+
+@admin.command(name="event")
+@commands.has_permissions(administrator=True)
+async def admin_event(ctx, event_id: int = None):
+    """Liste les utilisateurs intéressés par un événement planifié.
+
+    Usage: !admin event <event_id>
+    Si pas d'ID, liste les events du guild et leurs IDs.
+    """
+    guild = ctx.guild
+    if event_id is None:
+        events = await guild.fetch_scheduled_events()
+        if not events:
+            return await ctx.send("Aucun événement prévu sur cette guild.")
+        lines = ["📅 Événements planifiés :"]
+        for e in events:
+            start = get_event_start_time(e)
+            start_str = start.strftime('%d/%m %H:%M') if start else '??'
+            lines.append(f"• {e.name} — id:{e.id} — {start_str}")
+        return await ctx.send("\n".join(lines))
+
+    # Récupérer l'event
+    try:
+        event = await guild.fetch_scheduled_event(event_id)
+    except Exception as e:
+        return await ctx.send(f"⚠️ Impossible de récupérer l'événement: {e}")
+    try:
+        interested = await get_event_interested_users(guild, event)
+    except Exception as e:
+        return await ctx.send(f"⚠️ Erreur lors de la récupération des utilisateurs intéressés: {e}")
+
+    lines = [f"📅 Intéressés pour '{event.name}' ({len(interested)}):"]
+    sample = interested[:50]
+    for u in sample:
+        lines.append(f"• {getattr(u,'display_name', getattr(u,'name', str(u)))} — {u.id}")
+    if len(interested) > len(sample):
+        lines.append(f"... et {len(interested)-len(sample)} de plus")
+
+    await ctx.send("\n".join(lines))
+
+
+@admin.command(name="simulate")
+@commands.has_permissions(administrator=True)
+async def admin_simulate(ctx, event_id: int = None):
+    """Simule la logique des rappels automatiques pour un event donné — liste qui serait pingué.
+
+    Si aucun `event_id` fourni, liste les events disponibles pour l'aider.
+    """
+    guild = ctx.guild
+    if event_id is None:
+        events = await guild.fetch_scheduled_events()
+        if not events:
+            return await ctx.send("Aucun événement prévu sur cette guild.")
+        lines = ["📅 Événements planifiés :"]
+        for e in events:
+            start = get_event_start_time(e)
+            start_str = start.strftime('%d/%m %H:%M') if start else '??'
+            lines.append(f"• {e.name} — id:{e.id} — {start_str}")
+        return await ctx.send("\n".join(lines))
+
+    try:
+        event = await guild.fetch_scheduled_event(event_id)
+    except Exception as e:
+        return await ctx.send(f"⚠️ Impossible de récupérer l'événement: {e}")
+
+    interested = await get_event_interested_users(guild, event)
+    recipients = resolve_recipients(event, interested)
+    users_to_ping = recipients.to_ping
+
+    lines = [f"🔔 Simulation pour '{event.name}':"]
+    lines.append(f"• Intéressés: {len(recipients.interested)}")
+    lines.append(f"• Déjà connectés: {recipients.connected_total}")
+    lines.append(f"• Opt-out: {len(recipients.opted_out)}")
+    lines.append(f"• À pinguer: {len(users_to_ping)} ({len(recipients.mention_batches)} message(s))")
+    if users_to_ping:
+        lines.append("Exemple (max 20):")
+        for u in users_to_ping[:20]:
+            lines.append(f"• {getattr(u,'display_name', getattr(u,'name', str(u)))} — {u.id}")
+
+    await ctx.send("\n".join(lines))
+
+
+@admin.command(name="setreminder")
+@commands.has_permissions(administrator=True)
+async def admin_setreminder(ctx, channel_id: int):
+    """Set the reminder channel for this guild. Usage: !admin setreminder <channel_id>"""
+    gid = str(ctx.guild.id)
+    # validate channel
+    ch = _get_channel_by_id(ctx.guild, channel_id)
+    if not ch or not hasattr(ch, 'send'):
+        return await ctx.send("⚠️ Salon introuvable ou non-textuel dans cette guild.")
+    perms = ch.permissions_for(ctx.guild.me)
+    if not (perms and perms.send_messages):
+        return await ctx.send("⚠️ Je n'ai pas la permission d'envoyer des messages dans ce salon.")
+
+    reminder_channels_store.set(gid, channel_id)
+    await ctx.send(f"✅ Canal de rappel configuré pour cette guild: {getattr(ch,'name', channel_id)} ({channel_id})")
+
+
+@admin.command(name="clearreminder")
+@commands.has_permissions(administrator=True)
+async def admin_clearreminder(ctx):
+    """Clear the reminder channel override for this guild."""
+    gid = str(ctx.guild.id)
+    if gid in reminder_channels:
+        reminder_channels_store.delete(gid)
+        await ctx.send("✅ Override de canal de rappel supprimé pour cette guild. La sélection par défaut sera utilisée.")
+    else:
+        await ctx.send("ℹ️ Aucun override défini pour cette guild.")
+
+
+@admin.command(name="remind")
+@commands.has_permissions(administrator=True)
+async def admin_remind(ctx, event_id: int):
+    """Force l'envoi immédiat d'un rappel pour un event (admin only). Usage: !admin remind <event_id>"""
+    
+    guild = ctx.guild
+
+    # ---- Récupération de l'événement ----
+    try:
+        event = await guild.fetch_scheduled_event(event_id)
+    except Exception as e:
+        return await ctx.send(f"⚠️ Impossible de récupérer l'événement : {e}")
+
+    # ---- Sélection du channel ----
+    channel = get_reminder_channel(guild, event)
+    if not channel or not hasattr(channel, "send"):
+        return await ctx.send(
+            f"⚠️ Aucun channel textuel disponible pour envoyer le rappel de **{event.name}**."
+        )
+
+    # ---- Récupération des participants ----
+    interested_users = await get_event_interested_users(guild, event)
+
+    # ---- Filtrer les utilisateurs : pas opt-out + pas déjà en vocal ----
+    recipients = resolve_recipients(event, interested_users)
+    users_to_ping = recipients.to_ping
+
+    if not users_to_ping:
+        return await ctx.send(
+            f"ℹ️ Aucun utilisateur à ping pour **{event.name}** "
+            "(tous déjà connectés ou opt-out)."
+        )
+
+    # ---- Embed ----
+    embed = discord.Embed(
+        title=f"⏰ Rappel : {event.name}",
+        description=f"Rappel forcé par admin.\nParticipants notifiés : **{len(users_to_ping)}**",
+        color=0x5865F2,
+        timestamp=get_event_start_time(event) or datetime.now(timezone.utc),
+    )
+
+    target_channel_name = getattr(channel, "name", None) or str(getattr(channel, "id", "N/A"))
+    embed.set_footer(text=f"Envoyé par {ctx.author} | channel : {target_channel_name}")
+
+    # ---- Envoi du message ----
+    try:
+        # Autoriser les pings d'utilisateurs
+        allowed_ping = discord.AllowedMentions(users=True)
+
+        # 2️⃣ Envoi de l’embed (sans aucun ping)
+        await channel.send(embed=embed, allowed_mentions=discord.AllowedMentions.none())
+
+        # 1️⃣ Envoi des messages texte avec les VRAIS pings (découpés à 2000 caractères)
+        for batch in recipients.mention_batches:
+            await channel.send(content=batch, allowed_mentions=allowed_ping)
+
+        return await ctx.send(
+            f"✅ Rappel forcé envoyé dans **{target_channel_name}** "
+            f"(ping de **{len(users_to_ping)}** utilisateurs)."
+        )
+
+    except Exception as e:
+        logger.error(f"Erreur envoi rappel forcé pour {event.name}: {e}")
+        return await ctx.send(f"⚠️ Erreur en envoyant le rappel forcé : {e}")
+
+
+
+@admin.command(name="debugthreads")
+@commands.has_permissions(administrator=True)
+async def admin_debugthreads(ctx):
+    """Debug les threads fermés non archivés. Usage: !admin debugthreads"""
+    guild = ctx.guild
+    # Answer from the thread index (no REST scan); build it on first use for this guild
+    threads_list = indexed_threads(guild.id)
+    if not threads_list:
+        await build_thread_index(guild)
+        threads_list = indexed_threads(guild.id)
+
+    if not threads_list:
+        return await ctx.send("Aucun post trouvé sur ce serveur.")
+
+    # One incremental audit-log pass for the whole listing (get_lock_date then reads the index)
+    await refresh_lock_index(guild)
+
+    # Sort by creation date if available (newest last)
+    def _key_created(th):
+        dt = getattr(th, 'created_at', None)
+        if dt is None:
+            return 0
+        try:
+            return dt.timestamp()
+        except Exception:
+            return 0
+
+    threads_list.sort(key=_key_created)
+
+    # Put all threads into the 'Fermés' section (user request)
+    closed_threads = threads_list
+
+    # Rows are rendered page by page: lock dates are only looked up for the pages viewed
+    async def rows():
+        for t in closed_threads:
+            created = t.created_at.strftime('%d/%m/%Y %H:%M') if getattr(t, 'created_at', None) else '?'
+
+            # Passe juste l'id, pas l'objet
+            lock_date = t.closed_at or await get_lock_date(t.id, ctx.guild)
+            locked = lock_date.strftime('%d/%m/%Y %H:%M') if lock_date else '—'
+
+            # Date programmée de suppression = date de fermeture + 1 semaine
+            scheduled_deletion = None
+            if lock_date:
+                try:
+                    scheduled_deletion = lock_date + timedelta(weeks=1)
+                except Exception:
+                    scheduled_deletion = None
+
+            scheduled_str = scheduled_deletion.strftime('%d/%m/%Y %H:%M') if scheduled_deletion else '—'
+
+            yield f"• {t.name} — id:{t.id} — créé:{created} — fermé:{locked} — suppression prévue:{scheduled_str}"
+
+    # Closed section will contain all threads; remove forum segment per user request
+    await Paginator(f"🧵 Fermés ({len(closed_threads)}):", rows(), author_id=ctx.author.id).start(ctx)
+
+
+@admin.command(name="openthreads")
+@commands.has_permissions(administrator=True)
+async def admin_openthreads(ctx):
+    """Liste uniquement les posts ouverts (non fermés ET non archivés)."""
+    guild = ctx.guild
+    if not indexed_threads(guild.id):
+        await build_thread_index(guild)
+    open_threads = [t for t in indexed_threads(guild.id) if not t.locked and not t.archived]
+
+    if not open_threads:
+        return await ctx.send("🔓 Aucun post ouvert trouvé sur ce serveur.")
+
+    # Tri par date
+    open_threads.sort(key=lambda t: t.created_at.timestamp() if t.created_at else 0)
+
+    # Message paginé
+    rows = (
+        f"• {t.name} — id:{t.id} — créé:{t.created_at.strftime('%d/%m/%Y %H:%M') if t.created_at else '?'}"
+        for t in open_threads
+    )
+    await Paginator(f"🔓 Posts ouverts ({len(open_threads)}):", rows, author_id=ctx.author.id).start(ctx)
+
+@admin.command(name="reindex")
+@commands.has_permissions(administrator=True)
+async def admin_reindex(ctx):
+    """Reconstruit l'index des posts de forum de cette guild (rescan REST complet)."""
+    msg = await ctx.send("🔄 Réindexation des forums…")
+    try:
+        count = await build_thread_index(ctx.guild)
+    except Exception as e:
+        return await msg.edit(content=f"⚠️ Erreur pendant la réindexation: {e}")
+    await msg.edit(content=f"✅ Index reconstruit : {count} posts indexés.")
+
+
+@admin.command(name="listthreads")
+@commands.has_permissions(administrator=True)
+async def admin_listthreads(ctx):
+    """Liste tous les posts de chaque forum, groupés par statut (ouvert, fermé)."""
+    # Reuse existing admin commands to ensure identical output and formatting.
+    # User requested: first show open threads, then closed threads.
+    await admin_openthreads(ctx)
+    await admin_debugthreads(ctx)
+
+
+async def setup(bot):
+    bot.add_command(admin)
@@ -0,0 +1,104 @@
+# ============ ⏱️ TÂCHES DE FOND ============
+
+import asyncio
+import sqlite3
+import time
+from discord.ext import tasks
+
+import bot as core
+from bot import (
+    METRICS_SAMPLE_INTERVAL, SHARED_POLL_INTERVAL, WORKER_ID, _interested_cache, _parse_iso, bot,
+    closed_threads_store, closing_cache, github, logger, metrics, notified_users_store,
+    purge_queue_stats, reminder_channels_store, reminder_engine, save_closing_cache, sqlite_backend,
+)
+
+
+# ---- Background task: persist the lock-date cache when it changed ----
+@tasks.loop(minutes=5)
+async def flush_closing_cache():
+    if closing_cache.dirty:
+        save_closing_cache()
+
+
+@tasks.loop(seconds=SHARED_POLL_INTERVAL)
+async def poll_shared_changes():
+    """Worker mode: apply the writes made by the other worker processes to the in-memory mirrors."""
+    stores = {store.table: store for store in (closed_threads_store, notified_users_store, reminder_channels_store)}
+    try:
+        rows = sqlite_backend.changes_since(core.shared_change_seq)
+    except sqlite3.Error as e:
+        logger.warning(f"Lecture du journal de changements impossible: {e}")
+        return
+    for seq, table, key in rows:
+        core.shared_change_seq = seq
+        store = stores.get(table)
+        if store is None:
+            continue
+        value = store.refresh(key)
+        if table == 'closed_threads':
+            if value is None:
+                closing_cache.pop(key, None)
+            else:
+                closing_cache[key] = _parse_iso(value)
+    if rows:
+        logger.info(f"[WORKERS] {len(rows)} changement(s) appliqué(s) depuis les autres workers")
+    # keep the change log short (every ~hour)
+    if poll_shared_changes.current_loop % max(1, int(3600 / SHARED_POLL_INTERVAL)) == 0:
+        sqlite_backend.prune_changes()
+
+
+@tasks.loop(seconds=METRICS_SAMPLE_INTERVAL)
+async def sample_metrics():
+    """Measure event-loop lag and copy gauges/cache stats into `metrics` (read by the HTTP thread)."""
+    started = time.monotonic()
+    await asyncio.sleep(0.1)
+    metrics.set('epitrello_event_loop_lag_seconds', max(0.0, time.monotonic() - started - 0.1))
+
+    for shard_id, latency in (getattr(bot, 'latencies', None) or [(0, bot.latency)]):
+        if latency == latency:  # NaN before the first heartbeat
+            metrics.set('epitrello_gateway_latency_seconds', latency, shard=shard_id)
+    metrics.set('epitrello_guilds', len(bot.guilds))
+    metrics.set('epitrello_purge_queue_depth', purge_queue_stats()[0])
+    metrics.set('epitrello_reminders_pending', reminder_engine.pending())
+
+    gh = github.cache.stats()
+    caches = {
+        'github': (gh['entries'], gh['hits'] + gh['revalidations'], gh['misses']),
+        'closing': (len(closing_cache), closing_cache.hits, closing_cache.misses),
+        'interested_users': (len(_interested_cache), None, None),
+    }
+    for name, (entries, hits, misses) in caches.items():
+        metrics.set('epitrello_cache_entries', entries, cache=name)
+        if hits is None:
+            continue
+        metrics.set('epitrello_cache_hits', hits, cache=name)
+        metrics.set('epitrello_cache_misses', misses, cache=name)
+        metrics.set('epitrello_cache_hit_ratio', hits / (hits + misses) if hits + misses else 0.0, cache=name)
+    metrics.last_sample = time.monotonic()
+
+
+def _background_loops():
+    loops = [flush_closing_cache, sample_metrics]
+    if WORKER_ID is not None:
+        loops.append(poll_shared_changes)
+    return loops
+
+
+async def _start_loops():
+    for loop in _background_loops():
+        if not loop.is_running():
+            loop.start()
+
+
+async def setup(bot):
+    bot.add_listener(_start_loops, 'on_ready')
+    # (re)loaded while connected: on_ready won't fire again
+    if bot.is_ready():
+        await _start_loops()
+
+
+async def teardown(bot):
+    for loop in _background_loops():
+        loop.cancel()
+    if closing_cache.dirty:
+        save_closing_cache()
@@ -0,0 +1,280 @@
+# ============ 💬 COMMANDES ============
+
+import pytz
+import discord
+from discord.ext import commands
+from datetime import datetime, timezone
+
+from bot import (
+    GITHUB_ERRORS, GITHUB_PROJECT, GITHUB_REPO, bot, forget_opt_out, github, notify_opt_out, record_opt_out,
+    reminder_engine, upcoming_occurrences,
+)
+
+
+@commands.command()
+async def repo(ctx):
+    """Affiche le lien du repo principal"""
+    await ctx.send(f"📦 Repo GitHub : https://github.com/{GITHUB_REPO}")
+
+
+@commands.command()
+async def pr(ctx, numbers: commands.Greedy[int]):
+    """Affiche une ou plusieurs Pull Requests (`!pr 12` ou `!pr 12 15 19`)"""
+    if not numbers:
+        await ctx.send("⚠️ Utilisation : `!pr <numéro> [numéro ...]`")
+        return
+
+    if len(numbers) > 1:
+        await pr_batch(ctx, numbers)
+        return
+
+    number = numbers[0]
+    try:
+        r = await github.get_item("pulls", number)
+    except GITHUB_ERRORS as exc:
+        print(f"GitHub PR request failed: {exc}")
+        await ctx.send("⚠️ Erreur lors de la requête vers GitHub. Réessaie plus tard.")
+        return
+
+    if r.status_code == 200:
+        data = r.json()
+        embed = discord.Embed(
+            title=f"PR #{number} — {data['title']}",
+            description=data.get("body", "Pas de description"),
+            color=0x2ecc71,
+            url=data["html_url"]
+        )
+        embed.add_field(name="Auteur", value=data["user"]["login"])
+        embed.add_field(name="État", value=data["state"].capitalize())
+        await ctx.send(embed=embed)
+    else:
+        await ctx.send(f"❌ PR #{number} introuvable.")
+
+
+async def pr_batch(ctx, numbers):
+    """`!pr 12 15 19`: résout toutes les PR en un seul aller-retour et les affiche dans un embed."""
+    numbers = list(dict.fromkeys(numbers))[:25]  # embeds are limited to 25 fields
+    try:
+        refs = await github.resolve_references(numbers)
+    except GITHUB_ERRORS as exc:
+        print(f"GitHub batch PR request failed: {exc}")
+        await ctx.send("⚠️ Erreur lors de la requête vers GitHub. Réessaie plus tard.")
+        return
+
+    embed = discord.Embed(title=f"Pull Requests ({len(numbers)})", color=0x2ecc71)
+    for n in numbers:
+        data = refs.get(n)
+        if not data:
+            embed.add_field(name=f"#{n}", value="❌ introuvable", inline=False)
+            continue
+        label = "PR" if data.get("kind") == "pull" else "Issue"
+        author = (data.get("user") or {}).get("login") or "?"
+        state = (data.get("state") or "?").capitalize()
+        title = (data.get("title") or "")[:200]
+        embed.add_field(
+            name=f"{label} #{n} — {title}",
+            value=f"{state} • {author} • [Lien]({data.get('html_url')})",
+            inline=False,
+        )
+    await ctx.send(embed=embed)
+
+
+@commands.command()
+async def issue(ctx, number: int):
+    """Affiche une issue GitHub"""
+    try:
+        r = await github.get_item("issues", number)
+    except GITHUB_ERRORS as exc:
+        print(f"GitHub issue request failed: {exc}")
+        await ctx.send("⚠️ Erreur lors de la requête vers GitHub. Réessaie plus tard.")
+        return
+
+    if r.status_code == 200:
+        data = r.json()
+        embed = discord.Embed(
+            title=f"Issue #{number} — {data['title']}",
+            description=data.get("body", "Pas de description"),
+            color=0xe67e22,
+            url=data["html_url"]
+        )
+        embed.add_field(name="Auteur", value=data["user"]["login"])
+        embed.add_field(name="État", value=data["state"].capitalize())
+        await ctx.send(embed=embed)
+    else:
+        await ctx.send(f"❌ Issue #{number} introuvable.")
+
+
+@commands.command()
+async def kanban(ctx):
+    """Renvoie le lien du tableau GitHub Projects"""
+    if not GITHUB_PROJECT:
+        await ctx.send("⚠️ Aucun lien Kanban configuré.")
+        return
+
+    # Accept either a full URL or a path like 'users/antoinefld/projects/3' or 'owner/repo/projects/3'
+    if isinstance(GITHUB_PROJECT, str) and GITHUB_PROJECT.startswith("http"):
+        url = GITHUB_PROJECT
+    else:
+        url = f"https://github.com/{GITHUB_PROJECT}"
+
+    try:
+        await ctx.send(f"🗂️ Kanban : {url}")
+    except discord.HTTPException as exc:
+        print(f"Failed to send kanban link: {exc}")
+        try:
+            await ctx.author.send(f"Je n'ai pas pu envoyer le lien du Kanban dans le canal. Voici le lien : {url}")
+        except Exception:
+            print("Also failed to DM the user the kanban link.")
+
+
+@commands.command()
+async def ping(ctx):
+    """Teste la latence"""
+    latency = round(bot.latency * 1000)
+    await ctx.send(f"🏓 Pong ! Latence : {latency} ms")
+
+
+@commands.command(name="help")
+async def help_command(ctx, *, topic: str = None):
+    """Affiche la liste des commandes, ou l'aide pour une commande/catégorie
+
+    Usage:
+      !help                -> liste des catégories et commandes
+      !help <command>      -> détail sur une commande
+      !help <category>     -> liste des commandes dans une catégorie
+    """
+    # Normaliser l'argument
+    if topic:
+        topic = topic.strip()
+
+    # Rassembler les commandes par catégorie (cog name). None -> 'No Category'
+    categories = {}
+    for cmd in bot.commands:
+        cog = cmd.cog_name or "No Category"
+        categories.setdefault(cog, []).append(cmd)
+
+    # Si pas d'argument, afficher un résumé similaire à l'exemple
+    if not topic:
+        lines = []
+        lines.append("EpiTrelloBot")
+        lines.append("APP")
+        lines.append("")
+        for cat, cmds in categories.items():
+            lines.append(f"{cat}:")
+            for c in cmds:
+                # short one-line description
+                desc = (c.help or "Aucune description").splitlines()[0]
+                lines.append(f"  {c.name} {desc}")
+            lines.append("")
+
+        lines.append("Type !help command for more info on a command.")
+        lines.append("You can also type !help category for more info on a category.")
+
+        # Envoyer en bloc de code pour préserver la mise en forme
+        await ctx.send("\n".join(lines))
+        return
+
+    # Chercher une commande exacte
+    cmd = bot.get_command(topic)
+    if cmd:
+        desc = cmd.help or "Aucune description"
+        signature = f"!{cmd.name} {cmd.signature}".strip()
+        reply = [f"Command: {cmd.name}", f"Usage: {signature}", f"{desc}"]
+        await ctx.send("\n".join(reply))
+        return
+
+    # Chercher une catégorie (case-insensitive)
+    match_cat = None
+    for cat in categories.keys():
+        if cat.lower() == topic.lower():
+            match_cat = cat
+            break
+
+    if match_cat:
+        lines = [f"{match_cat}:"]
+        for c in categories[match_cat]:
+            desc = (c.help or "Aucune description").splitlines()[0]
+            lines.append(f"  {c.name} {desc}")
+        await ctx.send("\n".join(lines))
+        return
+
+    await ctx.send("⚠️ Commande ou catégorie introuvable. Tapez !help pour la liste des commandes.")
+
+
+@commands.command(name="next")
+async def next_events(ctx):
+    """Affiche les 3 prochains événements planifiés sur Discord, récurrences comprises."""
+    searching_msg = await ctx.send("🔍 Je cherche les prochains événements…")
+
+    guild = ctx.guild
+    # Served from the per-guild event cache (kept current by scheduled-event gateway events)
+    if guild.id not in reminder_engine.events:
+        reminder_engine.load_guild(guild)
+    events = [
+        e for e in reminder_engine.guild_events(guild.id)
+        if e.status == discord.EventStatus.scheduled
+    ]
+    now = datetime.now(timezone.utc)
+
+    # Générer les occurrences (récurrences comprises) et garder les 3 prochaines
+    upcoming = [(e.name, dt, e.id, guild.id) for dt, e in upcoming_occurrences(events, now, 3, rules=reminder_engine.rules)]
+
+    if not upcoming:
+        await searching_msg.edit(content="📭 Aucun événement à venir.")
+        return
+
+    msg = "**🗓️ Prochains événements Discord :**\n"
+    for name, start_time, event_id, guild_id in upcoming:
+        date_str = start_time.astimezone(pytz.timezone("Europe/Paris")).strftime("%d/%m/%Y %H:%M")
+        link = f"https://discord.com/events/{guild_id}/{event_id}"
+        msg += f"• **{name}** — {date_str} | [Lien]({link})\n"
+
+    await searching_msg.edit(content=msg)
+
+
+@commands.command(name="notify")
+async def notify(ctx, option: str = None):
+    """Permet de s'inscrire ou se désinscrire des rappels d'événements."""
+    user_id = ctx.author.id
+    # État en mémoire (notify_opt_out), partagé avec bot.py
+
+    # Cas 1 : !notify seul → affiche le statut
+    # NOTE: notify_opt_out now stores users who DO NOT want notifications.
+    if option is None:
+        if user_id in notify_opt_out:
+            await ctx.send(f"� {ctx.author.mention}, tu es **désinscrit** des rappels (opt-out).")
+        else:
+            await ctx.send(f"� {ctx.author.mention}, tu es **inscrit** aux rappels par défaut.")
+        return
+
+    # Cas 2 : !notify on → (re)inscription aux rappels — enlever du opt-out
+    if option.lower() == "on":
+        if user_id not in notify_opt_out:
+            await ctx.send(f"✅ {ctx.author.mention}, tu es déjà **inscrit** aux rappels.")
+        else:
+            forget_opt_out(user_id)
+            await ctx.send(f"🔔 {ctx.author.mention}, tu es maintenant **inscrit** aux rappels.")
+        return
+
+    # Cas 3 : !notify off → désinscription (ajout au opt-out)
+    if option.lower() == "off":
+        if user_id in notify_opt_out:
+            await ctx.send(f"ℹ️ {ctx.author.mention}, tu es déjà **désinscrit** des rappels.")
+        else:
+            record_opt_out(user_id, guild_id=getattr(ctx.guild, 'id', None))
+            await ctx.send(f"❌ {ctx.author.mention}, tu es maintenant **désinscrit** des rappels.")
+        return
+
+    # Cas 4 : Mauvaise syntaxe
+    await ctx.send("⚠️ Utilisation : `!notify`, `!notify on` ou `!notify off`")
+
+
+async def setup(bot):
+    bot.add_command(repo)
+    bot.add_command(pr)
+    bot.add_command(issue)
+    bot.add_command(kanban)
+    bot.add_command(ping)
+    bot.add_command(help_command)
+    bot.add_command(next_events)
+    bot.add_command(notify)
@@ -0,0 +1,40 @@
+# ============ 🕒 RAPPELS: ÉVÉNEMENTS DISCORD PROGRAMMÉS ============
+
+import discord
+
+from bot import invalidate_interested_users, reminder_engine
+
+
+async def on_scheduled_event_create(event):
+    reminder_engine.upsert(event)
+
+
+async def on_scheduled_event_update(before, after):
+    # covers time changes, cancellations and the next occurrence of recurring events
+    reminder_engine.upsert(after)
+
+
+async def on_scheduled_event_delete(event):
+    reminder_engine.remove(event)
+    invalidate_interested_users(event.id)
+
+
+async def on_scheduled_event_user_add(event, user):
+    invalidate_interested_users(event.id)
+
+
+async def on_scheduled_event_user_remove(event, user):
+    invalidate_interested_users(event.id)
+
+
+async def on_guild_join(guild: discord.Guild):
+    reminder_engine.load_guild(guild)
+
+
+async def setup(bot):
+    bot.add_listener(on_scheduled_event_create)
+    bot.add_listener(on_scheduled_event_update)
+    bot.add_listener(on_scheduled_event_delete)
+    bot.add_listener(on_scheduled_event_user_add)
+    bot.add_listener(on_scheduled_event_user_remove)
+    bot.add_listener(on_guild_join)
@@ -0,0 +1,175 @@
+# ============ 🧵 POSTS DE FORUM: ÉVÉNEMENTS ET FERMETURE ============
+
+import asyncio
+from datetime import datetime, timezone
+import discord
+from discord.ext import commands
+
+from bot import (
+    GITHUB_ERRORS, GitHubError, _chunks_from_lines, _confirm_archived, _record_closure,
+    archive_thread, extract_references, find_thread, github, index_thread, logger,
+    send_confirmation_outside_thread, thread_index, unindex_thread,
+)
+
+
+async def on_thread_update(before: discord.Thread, after: discord.Thread):
+    if after.archived and not before.archived:
+        _confirm_archived(after)
+    if after.id in thread_index or isinstance(getattr(after, 'parent', None), discord.ForumChannel):
+        locked_now = after.locked and not before.locked
+        index_thread(after, locked_at=datetime.now(timezone.utc) if locked_now else None)
+
+
+async def on_thread_join(thread: discord.Thread):
+    # THREAD_UPDATE of an uncached thread (every archived post, e.g. unarchived by a reply or
+    # reopened/unlocked by a moderator) is dispatched as thread_join, not thread_update
+    if thread.id in thread_index or isinstance(getattr(thread, 'parent', None), discord.ForumChannel):
+        previous = thread_index.get(thread.id)
+        locked_now = thread.locked and previous is not None and not previous.get('locked')
+        index_thread(thread, locked_at=datetime.now(timezone.utc) if locked_now else None)
+
+
+async def on_raw_thread_delete(payload: discord.RawThreadDeleteEvent):
+    unindex_thread(payload.thread_id)
+
+
+async def on_thread_create(thread: discord.Thread):
+    """Lorsqu’un nouveau post est créé, vérifie s’il référence des PR/issues (`#N` dans le titre ou le message)"""
+    title = thread.name
+    print(f"Nouveau post détecté : {title}")
+    index_thread(thread)
+
+    # Le message initial d'un post de forum a le même id que le thread
+    body = None
+    starter = getattr(thread, 'starter_message', None)
+    if starter is None:
+        try:
+            starter = await thread.fetch_message(thread.id)
+        except Exception:
+            starter = None
+    if starter is not None:
+        body = getattr(starter, 'content', None)
+
+    numbers = extract_references(title, body)
+    if not numbers:
+        print("Aucun numéro trouvé dans le titre.")
+        return
+
+    try:
+        refs = await github.resolve_references(numbers)
+    except GitHubError as exc:
+        print(f"GitHub API error for {numbers}: {exc}")
+        if exc.status_code in (401, 403, 429):
+            # the client already waited for the rate limit to reset; still refused -> token issue or wait too long
+            await thread.send(f"⚠️ GitHub refuse la requête ({exc.status_code}) : rate limit prolongé ou token invalide. Vérifie ton token GitHub.")
+        else:
+            await thread.send(f"⚠️ Erreur inattendue ({exc.status_code}) depuis GitHub.")
+        return
+    except GITHUB_ERRORS as exc:
+        print(f"GitHub API request failed for {numbers}: {exc}")
+        await thread.send("⚠️ Erreur lors de la requête vers GitHub pour vérifier la PR. Réessaie plus tard.")
+        return
+
+    lines = []
+    for n in numbers:
+        data = refs.get(n)
+        if not data:
+            lines.append(f"❌ #{n} n’existe pas ou est privé(e).")
+            continue
+        label = "PR" if data.get("kind") == "pull" else "Issue"
+        state = (data.get("state") or "?").capitalize()
+        lines.append(f"🔗 **{label} #{n} trouvée !** ({state})\n👉 {data.get('html_url')}")
+
+    for chunk in _chunks_from_lines("\n".join(lines)):
+        await thread.send(chunk)
+
+
+
+async def _close_one(ctx, thread: discord.Thread):
+    """Close one thread; returns (ok, message)."""
+    # If already archived, inform and return
+    if getattr(thread, 'archived', False):
+        return False, f"ℹ️ Le post {thread.id} est déjà archivé."
+
+    # Permission check: Manage Threads is required to archive
+    try:
+        perms = thread.permissions_for(ctx.guild.me)
+    except Exception:
+        perms = None
+    if perms is not None and not getattr(perms, 'manage_threads', False):
+        return False, "❌ Je n'ai pas la permission `Manage Threads` pour archiver ce post. Vérifie mes permissions."
+
+    try:
+        archived = await archive_thread(thread)
+    except discord.Forbidden:
+        return False, "❌ Je n'ai pas la permission d'archiver ce post. Vérifie `Manage Threads` et les permissions de canal."
+    except Exception as e:
+        return False, f"❌ Erreur lors de l'archivage de {thread.id}: {e}"
+
+    if not archived:
+        logger.warning(f"Archive reported success but channel {thread.id} not archived (checked properties).")
+        return False, f"❌ Tentative d'archivage effectuée mais le post {thread.id} reste ouvert. Vérifie mes permissions et le type de thread (public/private)."
+
+    _record_closure(thread)
+    print(f"🧵 Post '{thread.name}' ({thread.id}) archivé manuellement par {ctx.author}.")
+    return True, f"✅ Post {thread.id} archivé (clos) avec succès."
+
+
+@commands.command(name="close")
+async def close_thread(ctx, post_ids: commands.Greedy[int]):
+    """Ferme (archive) un ou plusieurs posts de forum.
+
+    Usage:
+      - `!close` (dans un post) — archive le post courant
+      - `!close <post_id> [post_id ...]` (admin) — archive les posts fournis, en parallèle
+    """
+    if not post_ids:
+        # No ID: must be used inside a thread
+        if not isinstance(ctx.channel, discord.Thread):
+            await ctx.send("⚠️ Cette commande doit être utilisée dans un post de forum ou avec un ID : `!close <post_id>`.")
+            return
+        threads = [ctx.channel]
+    else:
+        # Resolve every id concurrently (cache, index, then one REST call each)
+        post_ids = list(dict.fromkeys(post_ids))
+        found = await asyncio.gather(*(find_thread(ctx.guild, pid) for pid in post_ids))
+        missing = [pid for pid, t in zip(post_ids, found) if t is None]
+        threads = [t for t in found if t is not None]
+        if len(post_ids) == 1 and missing:
+            await ctx.send(f"❌ Post {post_ids[0]} introuvable.")
+            return
+
+    results = await asyncio.gather(*(_close_one(ctx, t) for t in threads))
+
+    if len(threads) == 1 and not (post_ids and missing):
+        ok, msg = results[0]
+        if not ok:
+            await ctx.send(msg)
+            return
+        # Notify the user outside of the (now archived) thread to avoid unarchiving it
+        sent = await send_confirmation_outside_thread(ctx, threads[0], msg)
+        if not sent:
+            # last fallback: log if we couldn't send anywhere
+            logger.info(msg)
+        return
+
+    # Several posts: one summary message
+    lines = [msg for _ok, msg in results]
+    lines += [f"❌ Post {pid} introuvable." for pid in missing]
+    closed = sum(1 for ok, _msg in results if ok)
+    summary = f"🧵 {closed}/{len(post_ids)} posts archivés.\n" + "\n".join(lines)
+    closed_ids = {t.id for t, (ok, _msg) in zip(threads, results) if ok}
+    for chunk in _chunks_from_lines(summary):
+        if getattr(ctx.channel, 'id', None) in closed_ids:
+            if not await send_confirmation_outside_thread(ctx, ctx.channel, chunk):
+                logger.info(chunk)
+        else:
+            await ctx.send(chunk)
+
+
+async def setup(bot):
+    bot.add_command(close_thread)
+    bot.add_listener(on_thread_update)
+    bot.add_listener(on_thread_join)
+    bot.add_listener(on_raw_thread_delete)
+    bot.add_listener(on_thread_create)
@@ -1,54 +1,196 @@
 import subprocess
 import sys
 import time
+import queue
+import threading
+from fnmatch import fnmatch
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import os
 
 BOT_FILE = "bot.py"
+EXTENSIONS_DIR = "extensions"
 WATCH_PATH = os.path.dirname(os.path.abspath(__file__))
 
+# Glob rules on paths relative to WATCH_PATH (comma separated); excludes win over includes
+WATCH_INCLUDE = [p for p in os.getenv("WATCH_INCLUDE", f"{BOT_FILE},{EXTENSIONS_DIR}/*.py").split(",") if p]
+WATCH_EXCLUDE = [p for p in os.getenv(
+    "WATCH_EXCLUDE",
+    "*__pycache__*,.git/*,*.json,*.journal,*.tmp,*.db,*.db-wal,*.db-shm,*.swp,*~",
+).split(",") if p]
+# One editor save often fires several events: act once the tree has been quiet for this long
+WATCH_DEBOUNCE = float(os.getenv("WATCH_DEBOUNCE", "0.5"))
+# Must cover the bot's own DRAIN_TIMEOUT (in-flight commands) plus the state flush
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "30")) + 10
+READY_TIMEOUT = float(os.getenv("READY_TIMEOUT", "300"))
+
+CONTROL_PREFIX = "[CONTROL] "
+
+
+def watched(rel_path):
+    rel_path = rel_path.replace(os.sep, "/")
+    if any(fnmatch(rel_path, pattern) for pattern in WATCH_EXCLUDE):
+        return False
+    return any(fnmatch(rel_path, pattern) for pattern in WATCH_INCLUDE)
+
+
+class BotProcess:
+    """The bot.py process, driven through its stdin (`reload <ext>`, `drain`) and read back on stdout."""
+
+    def __init__(self):
+        self.process = None
+        self.replies = queue.Queue()
+        self.ready = threading.Event()
+
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        print("[WATCH] Lancement du bot...")
+        self.ready.clear()
+        self.replies = queue.Queue()
+        env = dict(os.environ, BOT_CONTROL="stdin", PYTHONUNBUFFERED="1")
+        self.process = subprocess.Popen(
+            [sys.executable, BOT_FILE], cwd=WATCH_PATH, env=env,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        )
+        threading.Thread(target=self._read, args=(self.process.stdout, self.replies), daemon=True).start()
+
+    def _read(self, stdout, replies):
+        # forward the bot output, keep the control replies for us
+        for raw in stdout:
+            line = raw.decode(errors="replace").rstrip("\n")
+            if line.startswith(CONTROL_PREFIX):
+                reply = line[len(CONTROL_PREFIX):]
+                if reply.startswith("ready"):
+                    self.ready.set()
+                replies.put(reply)
+            else:
+                print(line, flush=True)
+
+    def send(self, line):
+        try:
+            self.process.stdin.write(f"{line}\n".encode())
+            self.process.stdin.flush()
+            return True
+        except (AttributeError, BrokenPipeError, OSError):
+            return False
+
+    def stop(self):
+        """Drain (no new commands, in-flight ones finish, state flushed), then terminate if needed."""
+        if not self.alive():
+            return
+        if self.send("drain"):
+            try:
+                self.process.wait(timeout=DRAIN_TIMEOUT)
+                return
+            except subprocess.TimeoutExpired:
+                print("[WATCH] Drain trop long, arrêt forcé")
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
 
 class ReloadHandler(FileSystemEventHandler):
-    def __init__(self, start_bot_func):
+    def __init__(self, bot_process):
         super().__init__()
-        self.start_bot_func = start_bot_func
-        self.process = None
-        self.bot_path = os.path.abspath(os.path.join(WATCH_PATH, BOT_FILE))
+        self.bot = bot_process
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.apply_lock = threading.Lock()
+        self.timer = None
 
     def on_any_event(self, event):
-        if event.is_directory:
+        if event.is_directory or event.event_type not in ("modified", "created", "moved"):
             return
-        # Ne relance que si bot.py est modifié et event_type == 'modified'
-        if os.path.abspath(event.src_path) == self.bot_path and event.event_type == "modified":
-            print(f"[WATCH] Modification détectée: {event.src_path} (event: {event.event_type}). Reload...")
-            self.restart_bot()
+        # editors that save atomically produce a `moved` event onto the real file
+        path = getattr(event, "dest_path", None) or event.src_path
+        rel_path = os.path.relpath(os.path.abspath(path), WATCH_PATH)
+        if not watched(rel_path):
+            return
+        with self.lock:
+            self.pending.add(rel_path.replace(os.sep, "/"))
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(WATCH_DEBOUNCE, self.apply_changes)
+            self.timer.daemon = True
+            self.timer.start()
 
-    def restart_bot(self):
-        if self.process and self.process.poll() is None:
-            self.process.terminate()
+    def apply_changes(self):
+        with self.lock:
+            changed, self.pending = sorted(self.pending), set()
+        if not changed:
+            return
+        with self.apply_lock:
+            print(f"[WATCH] Modifications détectées: {', '.join(changed)}")
+            extensions = [
+                f"{EXTENSIONS_DIR}.{os.path.splitext(os.path.basename(p))[0]}"
+                for p in changed
+                if p.startswith(f"{EXTENSIONS_DIR}/") and p.endswith(".py") and not p.endswith("__init__.py")
+            ]
+            # bot.py (core: state, clients, caches) or anything that is not an extension → full restart
+            if len(extensions) < len(changed) or not self.bot.alive():
+                self.restart_bot()
+                return
+            for name in extensions:
+                self.reload_extension(name)
+
+    def reload_extension(self, name):
+        started = time.perf_counter()
+        if not self.bot.send(f"reload {name}"):
+            self.restart_bot()
+            return
+        deadline = started + 30
+        reply = ""
+        # skip unrelated replies (e.g. the earlier `ready`)
+        while not reply.startswith(("reloaded ", "failed ")) or reply.split()[1] != name:
             try:
-                self.process.wait(timeout=5)
-            except Exception:
-                self.process.kill()
-        self.process = self.start_bot_func()
+                reply = self.bot.replies.get(timeout=max(0.0, deadline - time.perf_counter()))
+            except queue.Empty:
+                print(f"[WATCH] Pas de réponse au rechargement de {name}")
+                return
+        downtime = (time.perf_counter() - started) * 1000
+        if reply.startswith("reloaded"):
+            print(f"[WATCH] {name} rechargée — indisponibilité {downtime:.0f} ms")
+        else:
+            print(f"[WATCH] Échec du rechargement de {name}, l'ancienne version reste active")
 
+    def restart_bot(self):
+        # downtime: from the moment commands stop being accepted to the new process being ready
+        started = time.perf_counter()
+        self.bot.stop()
+        stopped = time.perf_counter()
+        self.bot.start()
+        deadline = stopped + READY_TIMEOUT
+        # poll the process while waiting: a crash at startup (e.g. syntax error) must not
+        # keep apply_lock held for the whole READY_TIMEOUT
+        while not self.bot.ready.wait(timeout=0.5):
+            if not self.bot.alive():
+                code = self.bot.process.returncode
+                print(f"[WATCH] Le bot s'est arrêté au démarrage (code {code}), en attente d'une correction")
+                return
+            if time.perf_counter() >= deadline:
+                print(f"[WATCH] Le bot n'est pas prêt après {READY_TIMEOUT:.0f}s")
+                return
+        print(
+            f"[WATCH] Redémarrage terminé — indisponibilité {time.perf_counter() - started:.1f}s "
+            f"(drain {stopped - started:.1f}s, démarrage {time.perf_counter() - stopped:.1f}s)"
+        )
 
-def start_bot():
-    print("[WATCH] Lancement du bot...")
-    return subprocess.Popen([sys.executable, BOT_FILE])
 
 if __name__ == "__main__":
-    handler = ReloadHandler(start_bot)
+    bot_process = BotProcess()
+    handler = ReloadHandler(bot_process)
     observer = Observer()
     observer.schedule(handler, WATCH_PATH, recursive=True)
-    handler.process = start_bot()
+    bot_process.start()
     observer.start()
     try:
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
         observer.stop()
-        if handler.process:
-            handler.process.terminate()
+        bot_process.stop()
     observer.join()